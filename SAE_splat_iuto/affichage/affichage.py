@@ -298,19 +298,27 @@ class JeuGraphique(object):
 
 
 class LecteurThread(threading.Thread):
-    def __init__(self,serveur="",port=1111):
+    def __init__(self,serveur="",port=1111,options=None,taille_chunk=8192):
         super().__init__()
-        self.client=client.ClientCyber()
+        self.client=client.ClientCyber(taille_chunk=taille_chunk)
         self.client.creer_socket(serveur,port)
-        self.client.enregistrement("affichage principal","afficheur")
+        self.client.enregistrement("affichage principal","afficheur",options)
         self.ok=True
         self.verrou=threading.Lock()
         ok,_,le_jeu=self.client.prochaine_commande()
         if not ok:
             sys.exit(0)
         self.le_jeu=jeu.Jeu()
-        self.le_jeu.jeu_from_str(le_jeu)
+        self.decoder_jeu(le_jeu)
         self.change=True
+        # actions du dernier tour (options flux=tour et evenements)
+        self.evenements=[]
+
+    def decoder_jeu(self,le_jeu):
+        if self.client.binaire:
+            self.le_jeu.jeu_from_octets(le_jeu)
+        else:
+            self.le_jeu.jeu_from_str(le_jeu)
 
     def get_jeu(self):
         self.verrou.acquire()
@@ -328,7 +336,8 @@ class LecteurThread(threading.Thread):
             return
         self.verrou.acquire()    
         self.le_jeu==jeu.Jeu()
-        self.le_jeu.jeu_from_str(le_jeu)
+        self.decoder_jeu(le_jeu)
+        self.evenements=self.client.evenements
         self.change=True
         self.verrou.release()
     
@@ -346,10 +355,33 @@ if __name__ == '__main__':
     parser.add_argument("--nom_partie", dest="nom_partie", help="nom de la partie", type=str, default='Non fournie')
     parser.add_argument("--serveur", dest="serveur", help="serveur de jeu", type=str, default='localhost')
     parser.add_argument("--port", dest="port", help="port de connexion", type=int, default=1111)
+    parser.add_argument("--delta", dest="delta", help="ne recevoir que les changements entre deux états du jeu",
+                        action="store_true")
+    parser.add_argument("--binaire", dest="binaire", help="recevoir le jeu au format binaire",
+                        action="store_true")
+    parser.add_argument("--taille_chunk", dest="taille_chunk", help="nombre d'octets lus à chaque réception",
+                        type=int, default=65536)
+    parser.add_argument("--partie", dest="partie", help="partie à rejoindre sur un serveur multi-parties",
+                        type=str, default=None)
+    parser.add_argument("--flux", dest="flux", help="recevoir au plus un état par tour (tour) ou toutes les "
+                        "FLUX secondes au lieu d'un état après chaque action", type=str, default=None)
+    parser.add_argument("--evenements", dest="evenements", help="avec --flux tour, recevoir aussi les actions du tour",
+                        action="store_true")
     args = parser.parse_args()
     print("Bienvenue dans le jeu du Splat'IUT'O")
     id_joueur=1
-    lecteur=LecteurThread(args.serveur,args.port)
+    options=[]
+    if args.delta:
+        options.append(client.OPTION_DELTA)
+    if args.binaire:
+        options.append(client.OPTION_BINAIRE)
+    if args.partie is not None:
+        options.append(client.OPTION_PARTIE+"="+args.partie)
+    if args.flux is not None:
+        options.append(client.OPTION_FLUX+"="+args.flux)
+    if args.evenements:
+        options.append(client.OPTION_EVENEMENTS)
+    lecteur=LecteurThread(args.serveur,args.port,options,args.taille_chunk)
     lecteur.start()
     jg=JeuGraphique(lecteur,[],args.nom_partie)
     jg.demarrer()
@@ -0,0 +1,277 @@
+"""
+Modélisation des adversaires par le bot.
+
+Le bot ne reçoit que l'état du jeu à chaque tour: en comparant deux états consécutifs on
+retrouve pour chaque adversaire son déplacement (changement de position) et sa direction
+de peinture (celle du rayon partant de son ancienne position où le plus de cases ont pris
+sa couleur). Les dernières actions de chaque adversaire sont conservées dans un historique
+d'où l'on tire des distributions de probabilité de ses prochaines peinture et déplacement.
+
+On en déduit une fois par tour la carte des menaces, la probabilité que chaque case soit
+peinte par un adversaire au tour suivant, et les positions probables des adversaires après
+leur déplacement. Ces prédictions sont conservées dans l'historique jusqu'au tour suivant:
+toutes les fonctions du bot qui les consultent partagent le même calcul, et les rayons de
+peinture sont ceux calculés une seule fois par carte par evaluation.tables_rayons.
+"""
+from collections import deque
+
+from bot_ia import const
+from bot_ia import evaluation
+from bot_ia import inondation
+from bot_ia import plateau
+
+PEINTURES = ['X', 'N', 'E', 'S', 'O']
+DEPLACEMENTS = ['N', 'E', 'S', 'O', 'X']
+# nombre d'actions conservées pour chaque adversaire
+TAILLE_HISTORIQUE = 30
+# poids de la distribution uniforme ajoutée aux actions observées (lissage de Laplace)
+LISSAGE = 1
+
+
+def Historique(ma_couleur):
+    """Crée l'historique des adversaires vu par un joueur
+
+    Args:
+        ma_couleur (str): la couleur du joueur qui observe (il n'est pas modélisé)
+
+    Returns:
+        dict: l'historique, vide tant qu'aucun état n'a été observé
+    """
+    return {"couleur": ma_couleur, "tour": None, "couleurs": None, "joueurs": {}, "actions": {},
+            "nb_peintures": {}, "nb_deplacements": {}, "predictions": {}}
+
+
+def reinitialiser(historique):
+    """oublie tous les états et actions observés (nouvelle partie)"""
+    historique.update(Historique(historique["couleur"]))
+
+
+def ajouter_action(historique, couleur, position, peinture, deplacement):
+    """ajoute une action observée d'un adversaire en oubliant la plus ancienne si
+        l'historique de cet adversaire est plein
+
+    Args:
+        historique (dict): l'historique des adversaires
+        couleur (str): la couleur de l'adversaire
+        position (tuple): la position de l'adversaire avant son action
+        peinture (str): la direction de peinture ('X' si aucune peinture n'est visible)
+        deplacement (str): la direction du déplacement ('X' s'il n'a pas bougé)
+    """
+    actions = historique["actions"].setdefault(couleur, deque())
+    nb_peintures = historique["nb_peintures"].setdefault(couleur, dict.fromkeys(PEINTURES, 0))
+    nb_deplacements = historique["nb_deplacements"].setdefault(couleur, dict.fromkeys(DEPLACEMENTS, 0))
+    if len(actions) == TAILLE_HISTORIQUE:
+        _, ancienne_peinture, ancien_deplacement = actions.popleft()
+        nb_peintures[ancienne_peinture] -= 1
+        nb_deplacements[ancien_deplacement] -= 1
+    actions.append((position, peinture, deplacement))
+    nb_peintures[peinture] += 1
+    nb_deplacements[deplacement] += 1
+
+
+def deplacement_observe(depart, arrivee):
+    """retourne la direction du déplacement entre deux positions consécutives, 'X' si le
+        joueur n'a pas bougé et None si les positions ne sont pas voisines"""
+    for direction in DEPLACEMENTS:
+        d_lig, d_col = plateau.INC_DIRECTION[direction]
+        if (depart[0] + d_lig, depart[1] + d_col) == arrivee:
+            return direction
+    return None
+
+
+def peinture_observee(tables, anciennes, couleurs, depart, couleur, transperce):
+    """retourne la direction de peinture d'un joueur: celle du rayon partant de sa position
+        où le plus de cases ont pris sa couleur. Une peinture ne changeant que la case du
+        joueur ou aucune case (cases déjà de sa couleur) n'est pas visible et donne 'X'
+
+    Args:
+        tables (dict): les rayons de la carte (voir evaluation.tables_rayons)
+        anciennes (bytes): la couleur (code de la lettre) de chaque case à l'état précédent
+        couleurs (bytes): la couleur de chaque case à l'état actuel
+        depart (tuple): la position du joueur à l'état précédent
+        couleur (str): la couleur du joueur
+        transperce (bool): si True sa peinture traversait les murs
+
+    Returns:
+        str: la direction de peinture
+    """
+    code = ord(couleur)
+    distance_max = tables["distance_max"]
+    base = (depart[0] * tables["nb_colonnes"] + depart[1]) * 4
+    meilleure = 'X'
+    meilleur_nb = 0
+    for num_dir, direction in enumerate(evaluation.DIRECTIONS):
+        rayon = tables["cases"][base + num_dir]
+        fin = distance_max if transperce else min(distance_max, tables["libres"][base + num_dir])
+        # la case du joueur est commune à tous les rayons: elle n'indique pas la direction
+        nb = sum(1 for ind in rayon[1:fin] if couleurs[ind] == code and anciennes[ind] != code)
+        if nb > meilleur_nb:
+            meilleure = direction
+            meilleur_nb = nb
+    return meilleure
+
+
+def observer(historique, carac_jeu, le_plateau, les_joueurs):
+    """met à jour l'historique avec un nouvel état du jeu. Si l'état précédent observé est
+        celui du tour précédent, l'action de chaque adversaire est déduite des deux états;
+        sinon (nouvelle partie ou tour manqué) l'historique est réinitialisé
+
+    Args:
+        historique (dict): l'historique des adversaires
+        carac_jeu (dict): les caractéristiques du jeu
+        le_plateau (dict): le plateau actuel
+        les_joueurs (dict): les joueurs indexés par leur couleur
+    """
+    tour = carac_jeu["duree_actuelle"]
+    if historique["tour"] is not None and tour == historique["tour"]:
+        return
+    if historique["tour"] is None or tour != historique["tour"] + 1:
+        reinitialiser(historique)
+    couleurs = evaluation.tableaux_plateau(le_plateau)[0]
+    if historique["couleurs"] is not None and len(historique["couleurs"]) == len(couleurs):
+        tables = evaluation.tables_rayons(le_plateau, carac_jeu["distance_max"])
+        for couleur, ancien in historique["joueurs"].items():
+            if couleur not in les_joueurs:
+                continue
+            deplacement = deplacement_observe(ancien["position"], les_joueurs[couleur]["position"])
+            if deplacement is None:
+                continue
+            peinture = peinture_observee(tables, historique["couleurs"], couleurs, ancien["position"], couleur,
+                                         ancien["objet"] == const.PISTOLET)
+            ajouter_action(historique, couleur, ancien["position"], peinture, deplacement)
+    historique["tour"] = tour
+    historique["couleurs"] = bytes(couleurs)
+    historique["joueurs"] = {couleur: dict(le_joueur) for couleur, le_joueur in les_joueurs.items()
+                             if couleur != historique["couleur"]}
+    historique["predictions"] = {}
+
+
+def distribution(comptes, actions):
+    """retourne les probabilités des actions à partir de leur nombre d'occurrences, lissées
+        par une distribution uniforme
+
+    Args:
+        comptes (dict): le nombre d'occurrences de chaque action (None si aucune observation)
+        actions (list): les actions possibles
+
+    Returns:
+        dict: la probabilité de chaque action
+    """
+    if comptes is None:
+        return {action: 1 / len(actions) for action in actions}
+    total = sum(comptes.values()) + LISSAGE * len(actions)
+    return {action: (comptes[action] + LISSAGE) / total for action in actions}
+
+
+def distribution_peintures(historique, couleur):
+    """retourne la probabilité de chaque direction de peinture ('X' compris) d'un adversaire"""
+    return distribution(historique["nb_peintures"].get(couleur), PEINTURES)
+
+
+def distribution_deplacements(historique, couleur):
+    """retourne la probabilité de chaque déplacement ('X' pour rester sur place) d'un adversaire"""
+    return distribution(historique["nb_deplacements"].get(couleur), DEPLACEMENTS)
+
+
+def predire(historique, le_plateau, distance_max):
+    """calcule les prédictions du prochain tour à partir du dernier état observé
+
+    Args:
+        historique (dict): l'historique des adversaires
+        le_plateau (dict): le plateau du dernier état observé
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        dict: les prédictions: "menaces", la probabilité que chaque case (par indice) soit
+            peinte par un adversaire, et "positions", pour chaque adversaire un dictionnaire
+            {indice de case: probabilité qu'il s'y trouve après son déplacement}
+    """
+    tables = evaluation.tables_rayons(le_plateau, distance_max)
+    voisins = inondation.moteur_inondation(le_plateau)["voisins"]
+    nb_colonnes = le_plateau["nb_colonnes"]
+    # probabilité que chaque case ne soit peinte par aucun adversaire
+    epargnees = [1.0] * (le_plateau["nb_lignes"] * nb_colonnes)
+    positions = {}
+    for couleur, le_joueur in historique["joueurs"].items():
+        lig, col = le_joueur["position"]
+        depart = lig * nb_colonnes + col
+        # chaque case peinte coûte au moins 1: la réserve limite la longueur des rayons
+        longueur = min(distance_max, le_joueur["reserve"])
+        if longueur > 0:
+            probas = distribution_peintures(historique, couleur)
+            transperce = le_joueur["objet"] == const.PISTOLET
+            cases_dir = {}
+            for num_dir, direction in enumerate(evaluation.DIRECTIONS):
+                num = depart * 4 + num_dir
+                fin = longueur if transperce else min(longueur, tables["libres"][num])
+                cases_dir[direction] = tables["cases"][num][:fin]
+            if le_joueur["objet"] == const.BOMBE:
+                # la bombe peint dans les quatre directions quelle que soit la première
+                toutes = set().union(*cases_dir.values())
+                cases_dir = {direction: toutes for direction in cases_dir}
+            peintes = {}
+            for direction, cases in cases_dir.items():
+                for ind in cases:
+                    peintes[ind] = peintes.get(ind, 0) + probas[direction]
+            for ind, proba in peintes.items():
+                epargnees[ind] *= 1 - min(proba, 1)
+        probas = distribution_deplacements(historique, couleur)
+        ouvertes = dict((direction, ind) for ind, direction in voisins[depart])
+        arrivees = {}
+        for direction, proba in probas.items():
+            # un déplacement vers un mur laisse le joueur sur place
+            arrivee = ouvertes.get(direction, depart)
+            arrivees[arrivee] = arrivees.get(arrivee, 0) + proba
+        positions[couleur] = arrivees
+    return {"menaces": [1 - proba for proba in epargnees], "positions": positions}
+
+
+def predictions(historique, le_plateau, distance_max):
+    """retourne les prédictions du prochain tour (voir predire), calculées une seule fois
+        par état observé et par portée
+
+    Args:
+        historique (dict): l'historique des adversaires
+        le_plateau (dict): le plateau du dernier état observé
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        dict: les prédictions
+    """
+    if distance_max not in historique["predictions"]:
+        historique["predictions"][distance_max] = predire(historique, le_plateau, distance_max)
+    return historique["predictions"][distance_max]
+
+
+def menace(historique, le_plateau, distance_max, pos):
+    """retourne la probabilité que la case pos soit peinte par un adversaire au prochain tour"""
+    menaces = predictions(historique, le_plateau, distance_max)["menaces"]
+    return menaces[pos[0] * le_plateau["nb_colonnes"] + pos[1]]
+
+
+def presence_attendue(historique, le_plateau, distance_max, cases):
+    """retourne le nombre moyen d'adversaires sans bouclier présents sur des cases quand
+        notre action est exécutée. L'ordre des joueurs étant tiré au hasard à chaque tour,
+        chaque adversaire a une chance sur deux d'avoir déjà joué (et de s'être déplacé)
+
+    Args:
+        historique (dict): l'historique des adversaires
+        le_plateau (dict): le plateau du dernier état observé
+        distance_max (int): la portée de la peinture
+        cases (iterable): les indices des cases considérées
+
+    Returns:
+        float: le nombre moyen d'adversaires sur ces cases
+    """
+    positions = predictions(historique, le_plateau, distance_max)["positions"]
+    cases = set(cases)
+    nb_colonnes = le_plateau["nb_colonnes"]
+    res = 0
+    for couleur, le_joueur in historique["joueurs"].items():
+        if le_joueur["objet"] == const.BOUCLIER:
+            continue
+        lig, col = le_joueur["position"]
+        avant = 1 if lig * nb_colonnes + col in cases else 0
+        apres = sum(proba for ind, proba in positions[couleur].items() if ind in cases)
+        res += (avant + apres) / 2
+    return res
@@ -19,13 +19,182 @@ Module de gestion des communications entre les clients et le serveur
 """
 import socket
 import random
+import struct
+
+SEPARATEUR_JEU = "-"*20+"\n"
+OPTION_DELTA = "delta"
+OPTION_BINAIRE = "binaire"
+# option partie=nom: partie rejointe sur un serveur hébergeant plusieurs parties
+OPTION_PARTIE = "partie"
+# option flux=tour ou flux=durée (afficheurs): au plus un état par tour ou par durée en
+# secondes au lieu d'un état après l'action de chaque joueur
+OPTION_FLUX = "flux"
+FLUX_TOUR = "tour"
+# option evenements (avec flux=tour): les actions du tour dans leur ordre d'exécution
+# sont envoyées juste avant l'état de fin de tour, une ligne couleur;actions par action
+OPTION_EVENEMENTS = "evenements"
+
+# format binaire: chaque trame est précédée de sa longueur. Un état du jeu est codé par
+# les 9 caractéristiques du jeu, les dimensions du plateau, la grille (un octet par case,
+# même caractère que dans la version texte), la position des joueurs, celle des objets
+# puis un enregistrement de taille fixe par joueur (le nom est tronqué à 32 octets)
+ENTETE_TRAME = struct.Struct("!I")
+PARAMS_JEU = struct.Struct("!9i")
+DIMENSIONS = struct.Struct("!HH")
+NOMBRE = struct.Struct("!H")
+POSITION_JOUEUR = struct.Struct("!cHH")
+POSITION_OBJET = struct.Struct("!BHH")
+JOUEUR = struct.Struct("!ciiiBHHH32s")
+
+
+def options_from_str(chaine, separateur=","):
+    """transforme la liste d'options envoyée lors de l'enregistrement en dictionnaire.
+        une option est soit un simple mot (ex: delta) soit de la forme cle=valeur
+    """
+    options = {}
+    for option in chaine.split(separateur):
+        if option != "":
+            cle, _, valeur = option.partition("=")
+            options[cle] = valeur
+    return options
+
+
+def options_2_str(options, separateur=","):
+    """transforme un dictionnaire (ou une liste) d'options en chaine pour l'enregistrement"""
+    if isinstance(options, dict):
+        options = [cle if valeur == "" else cle+"="+str(valeur) for cle, valeur in options.items()]
+    return separateur.join(options)
+
+
+def evenements_2_str(evenements, separateur=";"):
+    """transforme une liste de couples (couleur, actions) en chaine"""
+    return "\n".join(couleur+separateur+actions for couleur, actions in evenements)
+
+
+def evenements_from_str(chaine, separateur=";"):
+    """transforme la chaine produite par evenements_2_str en liste de couples (couleur, actions)"""
+    return [tuple(ligne.split(separateur, 1)) for ligne in chaine.split("\n") if ligne != ""]
+
+
+def delta_jeu(ancien, nouveau):
+    """calcule la différence entre deux états du jeu produits par Jeu.jeu_2_str.
+        Le delta a la même structure qu'un jeu complet sauf que la partie plateau
+        commence par le nombre de cases modifiées suivi d'une ligne lig;col;car par case
+        au lieu des dimensions et de la grille. Les positions des joueurs, les objets
+        et les caractéristiques des joueurs sont recopiés tels quels.
+        Retourne None si le delta n'est pas calculable (dimensions différentes)
+    """
+    param, plateau, joueurs = nouveau.split(SEPARATEUR_JEU)
+    _, ancien_plateau, _ = ancien.split(SEPARATEUR_JEU)
+    lignes = plateau.split("\n")
+    anciennes_lignes = ancien_plateau.split("\n")
+    if lignes[0] != anciennes_lignes[0]:
+        return None
+    nb_lig = int(lignes[0].split(";")[0])
+    cases = []
+    for lig in range(1, nb_lig+1):
+        ligne = lignes[lig]
+        ancienne = anciennes_lignes[lig]
+        if ligne != ancienne:
+            if len(ligne) != len(ancienne):
+                return None
+            for col in range(len(ligne)):
+                if ligne[col] != ancienne[col]:
+                    cases.append(str(lig-1)+";"+str(col)+";"+ligne[col]+"\n")
+    return param+SEPARATEUR_JEU+str(len(cases))+"\n"+"".join(cases)+\
+        "\n".join(lignes[nb_lig+1:])+SEPARATEUR_JEU+joueurs
+
+
+def appliquer_delta(ancien, delta):
+    """reconstruit l'état complet du jeu à partir de l'état précédent et d'un delta
+        calculé par delta_jeu
+    """
+    param, plateau_delta, joueurs = delta.split(SEPARATEUR_JEU)
+    _, ancien_plateau, _ = ancien.split(SEPARATEUR_JEU)
+    anciennes_lignes = ancien_plateau.split("\n")
+    nb_lig = int(anciennes_lignes[0].split(";")[0])
+    grille = anciennes_lignes[1:nb_lig+1]
+    lignes_delta = plateau_delta.split("\n")
+    nb_cases = int(lignes_delta[0])
+    lignes_modifiees = {}
+    for ind in range(1, nb_cases+1):
+        lig, col, car = lignes_delta[ind].split(";", 2)
+        lig = int(lig)
+        if lig not in lignes_modifiees:
+            lignes_modifiees[lig] = list(grille[lig])
+        lignes_modifiees[lig][int(col)] = car
+    for lig, ligne in lignes_modifiees.items():
+        grille[lig] = "".join(ligne)
+    return param+SEPARATEUR_JEU+anciennes_lignes[0]+"\n"+"".join(ligne+"\n" for ligne in grille)+\
+        "\n".join(lignes_delta[nb_cases+1:])+SEPARATEUR_JEU+joueurs
+
+
+def encoder_jeu(carac_jeu, nb_lignes, nb_colonnes, grille, pos_joueurs, pos_objets, joueurs):
+    """code un état du jeu au format binaire.
+        carac_jeu est la liste des 9 caractéristiques du jeu (dans l'ordre de Jeu.jeu_2_str),
+        grille contient un octet par case, pos_joueurs une liste de (joueur,lig,col),
+        pos_objets une liste de (objet,lig,col) et joueurs une liste de
+        (couleur,reserve,surface,points,objet,duree_objet,lig,col,nom)
+    """
+    morceaux = [PARAMS_JEU.pack(*carac_jeu), DIMENSIONS.pack(nb_lignes, nb_colonnes), grille,
+                NOMBRE.pack(len(pos_joueurs))]
+    for joueur, lig, col in pos_joueurs:
+        morceaux.append(POSITION_JOUEUR.pack(joueur.encode(), lig, col))
+    morceaux.append(NOMBRE.pack(len(pos_objets)))
+    for objet, lig, col in pos_objets:
+        morceaux.append(POSITION_OBJET.pack(objet, lig, col))
+    morceaux.append(NOMBRE.pack(len(joueurs)))
+    for couleur, reserve, surface, points, objet, duree_objet, lig, col, nom in joueurs:
+        morceaux.append(JOUEUR.pack(couleur.encode(), reserve, surface, points, objet, duree_objet,
+                                    lig, col, nom.encode("utf-8")))
+    return b"".join(morceaux)
+
+
+def decoder_jeu(trame):
+    """décode un état du jeu codé par encoder_jeu sans recopier la grille.
+        Retourne un dictionnaire dont les clés sont carac_jeu, nb_lignes, nb_colonnes,
+        grille (une memoryview), pos_joueurs, pos_objets et joueurs
+    """
+    trame = memoryview(trame)
+    carac_jeu = PARAMS_JEU.unpack_from(trame, 0)
+    ind = PARAMS_JEU.size
+    nb_lignes, nb_colonnes = DIMENSIONS.unpack_from(trame, ind)
+    ind += DIMENSIONS.size
+    grille = trame[ind:ind+nb_lignes*nb_colonnes]
+    ind += nb_lignes*nb_colonnes
+    pos_joueurs = []
+    nb, = NOMBRE.unpack_from(trame, ind)
+    ind += NOMBRE.size
+    for joueur, lig, col in POSITION_JOUEUR.iter_unpack(trame[ind:ind+nb*POSITION_JOUEUR.size]):
+        pos_joueurs.append((joueur.decode(), lig, col))
+    ind += nb*POSITION_JOUEUR.size
+    nb, = NOMBRE.unpack_from(trame, ind)
+    ind += NOMBRE.size
+    pos_objets = list(POSITION_OBJET.iter_unpack(trame[ind:ind+nb*POSITION_OBJET.size]))
+    ind += nb*POSITION_OBJET.size
+    joueurs = []
+    nb, = NOMBRE.unpack_from(trame, ind)
+    ind += NOMBRE.size
+    for couleur, reserve, surface, points, objet, duree_objet, lig, col, nom in \
+            JOUEUR.iter_unpack(trame[ind:ind+nb*JOUEUR.size]):
+        joueurs.append((couleur.decode(), reserve, surface, points, objet, duree_objet, lig, col,
+                        nom.rstrip(b"\0").decode("utf-8", "ignore")))
+    return {"carac_jeu": carac_jeu, "nb_lignes": nb_lignes, "nb_colonnes": nb_colonnes,
+            "grille": grille, "pos_joueurs": pos_joueurs, "pos_objets": pos_objets, "joueurs": joueurs}
+
 
 class Client():
     def __init__(self, fin_de_message="\0", taille_chunk=8192):
         self.taille_chunk = taille_chunk
         self.fin_de_message = fin_de_message
+        self.fin_octets = fin_de_message.encode()
         self.id_client = random.randint(1, 1000)
-        self.reserve = ''
+        # tampon de réception: les octets reçus mais pas encore lus sont entre debut et fin
+        self.tampon = bytearray(taille_chunk)
+        self.debut = 0
+        self.fin = 0
+        # True quand les messages sont des trames binaires précédées de leur longueur
+        self.binaire = False
 
     def creer_socket(self, ip="", port=1111):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -38,41 +207,103 @@ class Client():
         print("["+str(self.id_client)+"] =>", msg, complement)
 
     def reception(self):
-        # on vérifie que la réserve ne contient pas déjà le message
-        ind_0 = self.reserve.find(self.fin_de_message)
-        if ind_0 != -1:
-            msg = self.reserve[:ind_0]
-            self.reserve = self.reserve[ind_0+1:]
-        else:  # si la réserve ne contient pas le message complet on recopie la réserve dans le message
-            msg = self.reserve
-            self.reserve = ''
-            ok = False
-            while not ok:  # on lit sur la socket jusqu'à obtenir un message contenant le caractère '\0'
-                try:
-                    msg_brut = self.socket.recv(self.taille_chunk)
-                except OSError as exc:
-                    self.afficher_msg("probleme de timeout")
-                    return ""
-                if len(msg_brut) == 0:
-                    self.afficher_msg("le serveur semble déconnecté")
-                    return ""
-                msg_comp = msg_brut.decode("utf-8")
-                ind_0 = msg_comp.find(self.fin_de_message)
-                if ind_0 != -1:  # le message recu contient un caractère '\0'
-                    ok = True
-                    # on met tout ce qui est avant le '\0' dans le message
-                    msg += msg_comp[:ind_0]
-                    # et le reste dans la réserve
-                    self.reserve = msg_comp[ind_0+1:]
-                else:
-                    msg += msg_comp
-        return msg
+        if self.binaire:
+            return self.reception_octets().decode("utf-8")
+        # on cherche la fin de message directement dans le tampon et on ne décode
+        # que le message complet
+        recherche = self.debut
+        while True:
+            ind_0 = self.tampon.find(self.fin_octets, recherche, self.fin)
+            if ind_0 != -1:
+                with memoryview(self.tampon) as vue:
+                    msg = str(vue[self.debut:ind_0], "utf-8")
+                self.debut = ind_0+len(self.fin_octets)
+                return msg
+            # inutile de réexaminer ce qui a déjà été parcouru
+            deja_vu = max(self.fin-self.debut-len(self.fin_octets)+1, 0)
+            try:
+                nb = self.remplir_tampon()
+            except OSError as exc:
+                self.afficher_msg("probleme de timeout")
+                return ""
+            if nb == 0:
+                self.afficher_msg("le serveur semble déconnecté")
+                return ""
+            recherche = self.debut+deja_vu
+
+    def remplir_tampon(self):
+        # lit au plus taille_chunk octets sur la socket directement à la fin du tampon.
+        # Le tampon est recompacté quand il est vide et agrandi quand il est plein
+        if self.debut == self.fin:
+            self.debut = self.fin = 0
+        if len(self.tampon)-self.fin < self.taille_chunk:
+            del self.tampon[:self.debut]
+            self.fin -= self.debut
+            self.debut = 0
+            if len(self.tampon)-self.fin < self.taille_chunk:
+                self.tampon.extend(bytes(max(self.taille_chunk, len(self.tampon))))
+        with memoryview(self.tampon) as vue:
+            nb = self.socket.recv_into(vue[self.fin:], self.taille_chunk)
+        self.fin += nb
+        return nb
+
+    def recevoir_exactement(self, taille):
+        # lit exactement taille octets: ceux déjà présents dans le tampon de réception
+        # puis le reste directement depuis la socket dans le tableau retourné
+        tampon = bytearray(taille)
+        vue = memoryview(tampon)
+        recu = min(taille, self.fin-self.debut)
+        with memoryview(self.tampon) as vue_tampon:
+            vue[:recu] = vue_tampon[self.debut:self.debut+recu]
+        self.debut += recu
+        while recu < taille:
+            try:
+                nb = self.socket.recv_into(vue[recu:], min(taille-recu, self.taille_chunk))
+            except OSError as exc:
+                self.afficher_msg("probleme de timeout")
+                return None
+            if nb == 0:
+                self.afficher_msg("le serveur semble déconnecté")
+                return None
+            recu += nb
+        return tampon
+
+    def reception_octets(self):
+        # lecture d'une trame binaire: sa longueur sur 4 octets puis son contenu
+        entete = self.recevoir_exactement(ENTETE_TRAME.size)
+        if entete is None:
+            return bytearray()
+        trame = self.recevoir_exactement(ENTETE_TRAME.unpack(entete)[0])
+        if trame is None:
+            return bytearray()
+        return trame
+
+    def envoi_octets(self, *morceaux):
+        # envoi d'une trame binaire formée par la concaténation des morceaux
+        taille = sum(len(morceau) for morceau in morceaux)
+        self.socket.sendall(b"".join((ENTETE_TRAME.pack(taille),)+morceaux))
+
+    def envoi_corps(self, entete, corps):
+        # envoi d'un message dont le corps est déjà encodé (et partagé entre plusieurs clients)
+        if self.binaire:
+            self.envoi_octets(entete.encode(), corps)
+            return
+        try:
+            self.socket.sendall(b"".join((entete.encode(), corps, self.fin_octets)))
+        except OSError as exc:
+            self.afficher_msg("le serveur semble planté")
+            raise RuntimeError("Serveur inaccessible") from exc
 
     def envoi(self, msg):
+        if self.binaire:
+            self.envoi_octets(msg.encode())
+            return
         # envoi d'un message auquel on ajoute le caractère '\0' pour repérer les fins de message
-        if self.socket.send((msg+'\0').encode()) == 0:
+        try:
+            self.socket.sendall((msg+self.fin_de_message).encode())
+        except OSError as exc:
             self.afficher_msg("le serveur semble planté")
-            raise RuntimeError("Serveur inaccessible")
+            raise RuntimeError("Serveur inaccessible") from exc
 
     def fermer(self):
         self.socket.close()
@@ -89,15 +320,28 @@ class ClientCyber(Client):
         self.type_client = None
         self.nom_client = None
         self.separateur = separateur
+        self.options = {}
+        # dernier état complet du jeu envoyé ou reçu (sert de référence aux deltas)
+        self.dernier_jeu = None
+        # actions du dernier tour reçues avec l'option evenements
+        self.evenements = []
 
 
-    def enregistrement(self, nom_client, type_client):
+    def enregistrement(self, nom_client, type_client, options=None):
         self.nom_client = nom_client.replace(
             self.separateur, "_", -1).replace("\n", "_")
         self.type_client = type_client
-        self.envoi(type_client+self.separateur+self.nom_client)
+        msg = type_client+self.separateur+self.nom_client
+        if options:
+            self.options = options_from_str(options_2_str(options))
+            msg += self.separateur+options_2_str(options)
+        self.envoi(msg)
+        # après l'enregistrement, les messages suivants utilisent le format binaire
+        self.binaire = OPTION_BINAIRE in self.options
 
     def prochaine_commande(self):
+        if self.binaire:
+            return self.prochaine_commande_binaire()
         msg = self.reception()
         if msg is None:
             self.afficher_msg("Le serveur semble déconnecté")
@@ -113,28 +357,92 @@ class ClientCyber(Client):
             return False, 0, True
         try:
             cmd, num_joueur = commande.split(self.separateur)
-            if cmd != 'jeu':
+            if cmd != 'jeu' and cmd != 'delta' and cmd != 'evenements':
                 raise Exception()
         except:
             self.afficher_msg("commande jeu mal formée", commande)
             return False, 0, False
+        if cmd == 'evenements':
+            # les actions du tour précèdent l'état de fin de tour
+            self.evenements = evenements_from_str(msg[fin_entete+1:], self.separateur)
+            return self.prochaine_commande()
         le_jeu = None
         try:
             le_jeu = msg[fin_entete+1:]
+            if cmd == 'delta':
+                le_jeu = appliquer_delta(self.dernier_jeu, le_jeu)
+            if OPTION_DELTA in self.options:
+                self.dernier_jeu = le_jeu
         except Exception as ex:
             print(ex)
             self.afficher_msg("le jeu n'est pas correctement encodé")
             return False, num_joueur, False
         return True, num_joueur, le_jeu
 
+    def prochaine_commande_binaire(self):
+        # même traitement que prochaine_commande mais le jeu retourné est la memoryview
+        # de l'état codé en binaire (voir decoder_jeu)
+        trame = self.reception_octets()
+        fin_entete = trame.find(b"\n")
+        commande = trame[:fin_entete].decode("utf-8")
+        if commande == "quit":
+            self.afficher_msg("le jeu se termine")
+            return False, 0, True
+        if commande == "refused":
+            self.afficher_msg("la connection a été refusée")
+            return False, 0, True
+        try:
+            cmd, num_joueur = commande.split(self.separateur)
+            if cmd != 'jeu' and cmd != 'evenements':
+                raise Exception()
+        except:
+            self.afficher_msg("commande jeu mal formée", commande)
+            return False, 0, False
+        if cmd == 'evenements':
+            self.evenements = evenements_from_str(trame[fin_entete+1:].decode("utf-8"), self.separateur)
+            return self.prochaine_commande_binaire()
+        return True, num_joueur, memoryview(trame)[fin_entete+1:]
+
     def envoyer_quit(self):
         self.envoi("quit\n")
 
     def envoyer_refus(self):
         self.envoi("refused\n")
 
-    def envoyer_jeu(self, jeu_str, num_joueur):
-        self.envoi("jeu"+self.separateur+str(num_joueur)+'\n'+jeu_str)
+    def envoyer_jeu(self, jeu_str, num_joueur, cache_deltas=None, jeu_octets=None):
+        """envoie l'état du jeu. Si le client a demandé l'option delta et a déjà reçu
+            un état complet, seul le delta par rapport au dernier état envoyé est transmis.
+            cache_deltas est un dictionnaire partagé entre les clients recevant le même état
+            afin de ne calculer et n'encoder chaque delta qu'une fois: {ancien_jeu: delta encodé},
+            la clé None donnant l'état complet encodé.
+            jeu_octets est l'état codé par encoder_jeu, envoyé aux clients en mode binaire
+        """
+        if self.binaire:
+            self.envoi_corps("jeu"+self.separateur+str(num_joueur)+'\n', jeu_octets)
+            return
+        if cache_deltas is None:
+            cache_deltas = {}
+        if None not in cache_deltas:
+            cache_deltas[None] = jeu_str.encode()
+        if OPTION_DELTA not in self.options:
+            self.envoi_corps("jeu"+self.separateur+str(num_joueur)+'\n', cache_deltas[None])
+            return
+        delta = None
+        if self.dernier_jeu is not None:
+            if self.dernier_jeu not in cache_deltas:
+                delta = delta_jeu(self.dernier_jeu, jeu_str)
+                cache_deltas[self.dernier_jeu] = None if delta is None else delta.encode()
+            delta = cache_deltas[self.dernier_jeu]
+        if delta is not None and len(delta) < len(cache_deltas[None]):
+            self.envoi_corps("delta"+self.separateur+str(num_joueur)+'\n', delta)
+        else:
+            self.envoi_corps("jeu"+self.separateur+str(num_joueur)+'\n', cache_deltas[None])
+        self.dernier_jeu = jeu_str
+
+    def envoyer_evenements(self, evenements, num_joueur):
+        # evenements est la liste des couples (couleur, actions) du tour
+        self.envoi("evenements"+self.separateur+str(num_joueur)+'\n'
+                   + evenements_2_str(evenements, self.separateur))
 
     def envoyer_commande_client(self, commande):
         self.envoi(commande)
@@ -143,6 +451,11 @@ class ClientCyber(Client):
         return self.reception()
 
     def recevoir_enregistrement(self):
-        msg = self.reception()
-        type_client, nom_client = msg.split(self.separateur)
+        return self.lire_enregistrement(self.reception())
+
+    def lire_enregistrement(self, msg):
+        type_client, nom_client, *options = msg.split(self.separateur, 2)
+        if options:
+            self.options = options_from_str(options[0])
+        self.binaire = OPTION_BINAIRE in self.options
         return type_client, nom_client
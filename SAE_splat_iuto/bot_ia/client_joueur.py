@@ -21,17 +21,32 @@ Module contenant l'implémentation de l'IA et le programme principal du joueur
 import argparse
 import random
 
+from bot_ia import adversaires
 from bot_ia import case
 from bot_ia import client
 from bot_ia import const
+from bot_ia import distances
+from bot_ia import evaluation
+from bot_ia import exposition
 from bot_ia import inondation
 from bot_ia import joueur
+from bot_ia import planificateur
 from bot_ia import plateau
+from bot_ia import plateau_compact
+from bot_ia import rayons
 
 
 VIDE = ' '
 RIEN = 'X'
 DIRS_ORDRE = ("N", "E", "S", "O")
+# temps de réflexion par tour du planificateur en secondes (None pour l'IA réactive seule)
+BUDGET = None
+# historique des adversaires de chaque couleur jouée par ce programme
+HISTORIQUES = {}
+# probabilité d'être repeinte au-delà de laquelle une case de notre couleur n'est pas sûre
+SEUIL_MENACE = 0.5
+# nombre de cases que l'on accepte de parcourir en plus pour une zone hors de portée des adversaires
+DETOUR_ABRI = 2
 
 
 def distance_max_plateau(le_plateau):
@@ -81,6 +96,22 @@ def innondation_direction(resultat):
     return direction if direction else None
 
 
+def direction_trouvee(resultats, nom):
+    """Extrait la première direction à prendre pour une requête de inondation.inondation_multiple.
+
+    Args:
+        resultats (dict): Le dictionnaire retourné par inondation_multiple.
+        nom (str): Le nom de la requête.
+
+    Returns:
+        str | None: La direction vers la case trouvée, ou None si rien n'a été trouvé
+            ou si la case trouvée est celle de départ.
+    """
+    if nom not in resultats:
+        return None
+    return resultats[nom][2]
+
+
 def random_direction_from_voisins(voisins):
     """Choisit une direction disponible parmi les voisins de manière aléatoire.
 
@@ -125,6 +156,34 @@ def a_voisin_de_couleur(voisins, couleur):
     return None
 
 
+def voisin_de_couleur_sur(le_plateau, pos, voisins, couleur, menaces=None):
+    """Cherche le voisin de la couleur spécifiée le moins menacé d'être repeint.
+
+    Args:
+        le_plateau (dict): Le plateau de jeu.
+        pos (tuple[int, int]): La position actuelle.
+        voisins (dict): Dictionnaire des voisins accessibles {direction: couleur}.
+        couleur (str): La couleur recherchée.
+        menaces (list, optional): La probabilité que chaque case soit repeinte par un
+            adversaire. Sans menaces on retourne le premier voisin trouvé.
+
+    Returns:
+        str | None: La direction du voisin choisi, ou None.
+    """
+    if menaces is None:
+        return a_voisin_de_couleur(voisins, couleur)
+    meilleure = None
+    menace_min = None
+    for d in DIRS_ORDRE:
+        if voisins.get(d) == couleur:
+            d_lig, d_col = plateau.INC_DIRECTION[d]
+            menace = menaces[(pos[0] + d_lig) * le_plateau["nb_colonnes"] + pos[1] + d_col]
+            if menace_min is None or menace < menace_min:
+                meilleure = d
+                menace_min = menace
+    return meilleure
+
+
 def direction_vers_couleur(le_plateau, pos, distance_max, couleur):
     """Cherche le chemin le plus court vers une case d'une certaine couleur.
 
@@ -137,7 +196,7 @@ def direction_vers_couleur(le_plateau, pos, distance_max, couleur):
     Returns:
         str | None: La direction à prendre, ou None si introuvable.
     """
-    res = inondation.Innondation(le_plateau, pos, distance_max, recherche='C', C_cherche=couleur, arret_premier=True)
+    res = inondation.Inondation(le_plateau, pos, distance_max, recherche='C', C_cherche=couleur, arret_premier=True)
     return innondation_direction(res)
 
 
@@ -153,40 +212,54 @@ def direction_vers_objet(le_plateau, pos, distance_max, objet):
     Returns:
         str | None: La direction à prendre, ou None si introuvable.
     """
-    res = inondation.Innondation(le_plateau, pos, distance_max, recherche='O', O_cherche=objet, arret_premier=True)
-    return innondation_direction(res)
+    table = distances.table_distances(le_plateau)
+    res = distances.plus_proche(table, pos, distances.positions_objets(le_plateau, objet), distance_max)
+    return res[2] if res is not None else None
 
 
-def direction_vers_securite(le_plateau, pos, distance_max, couleur):
+def direction_vers_securite(le_plateau, pos, distance_max, couleur, menaces=None, carte_exposition=None):
     """Cherche une zone de recharge sûre d'au moins 2 cases pour y faire des allers retours.
     
-    Cette fonction scanne toutes les cases de notre couleur et sélectionne la plus proche
-    qui possède elle-même un voisin de notre couleur.
+    Une seule inondation cherche à la fois la plus proche case de notre couleur qui possède
+    elle-même un voisin de notre couleur et, à défaut, la plus proche case de notre couleur.
+    Si les menaces sont fournies, une zone dont aucune des deux cases ne risque d'être
+    repeinte au prochain tour est préférée, et avant tout une zone hors de portée de tous
+    les adversaires si la carte d'exposition est fournie.
 
     Args:
         le_plateau (dict): Le plateau de jeu.
         pos (tuple[int, int]): La position de départ.
         distance_max (int): La distance maximale de recherche.
         couleur (str): La couleur recherchée (celle du joueur).
+        menaces (list, optional): La probabilité que chaque case soit repeinte par un
+            adversaire (voir adversaires.predictions).
+        carte_exposition (bytearray, optional): Le nombre d'adversaires pouvant peindre
+            chaque case (voir exposition.carte_exposition).
 
     Returns:
         str | None: La direction vers cette zone, ou None (dans ce cas on va sur une case seule).
     """
-    res = inondation.Innondation(le_plateau, pos, distance_max, recherche='C', C_cherche=couleur, arret_premier=False)
-    
-    if not res:
-        return None
-
-    candidats_tries = sorted(res.keys(), key=lambda x: x[0])
-
-    for dist, pos_candidat in candidats_tries:
-        voisins_candidat = plateau.directions_possibles(le_plateau, pos_candidat)
-        
-        if a_voisin_de_couleur(voisins_candidat, couleur):
-            return res[(dist, pos_candidat)].get('Direction')
-
-    premier_candidat = candidats_tries[0]
-    return res[premier_candidat].get('Direction')
+    est_de_couleur = inondation.test_couleur(le_plateau, couleur)
+    voisins = inondation.moteur_inondation(le_plateau)["voisins"]
+    depart = pos[0] * le_plateau["nb_colonnes"] + pos[1]
+    requetes = {
+        "zone": (lambda ind: ind != depart and est_de_couleur(ind)
+                 and any(est_de_couleur(ind_voisin) for ind_voisin, _ in voisins[ind]), distance_max),
+        "case": (lambda ind: ind != depart and est_de_couleur(ind), distance_max)}
+    if menaces is not None:
+        est_sure = lambda ind: est_de_couleur(ind) and menaces[ind] < SEUIL_MENACE
+        requetes["zone_sure"] = (lambda ind: ind != depart and est_sure(ind)
+                                 and any(est_sure(ind_voisin) for ind_voisin, _ in voisins[ind]), distance_max)
+    if carte_exposition is not None:
+        est_abritee = lambda ind: est_de_couleur(ind) and carte_exposition[ind] == 0
+        requetes["zone_abritee"] = (lambda ind: ind != depart and est_abritee(ind)
+                                    and any(est_abritee(ind_voisin) for ind_voisin, _ in voisins[ind]),
+                                    distance_max)
+    res = inondation.inondation_multiple(le_plateau, pos, requetes)
+    if "zone_abritee" in res and "zone" in res and res["zone_abritee"][0] > res["zone"][0] + DETOUR_ABRI:
+        del res["zone_abritee"]
+    return (direction_trouvee(res, "zone_abritee") or direction_trouvee(res, "zone_sure")
+            or direction_trouvee(res, "zone") or direction_trouvee(res, "case"))
 
 
 def meilleure_direction_locale(voisins, ma_couleur):
@@ -227,7 +300,7 @@ def tir_sur_case_non_ami(voisins, ma_couleur):
     return RIEN
 
 
-def deplacement_peinture_zero(notre_IA, le_plateau, distance_max, reserve):
+def deplacement_peinture_zero(notre_IA, le_plateau, distance_max, reserve, menaces=None, carte_exposition=None):
     """Gère la stratégie de survie lorsque la réserve de peinture est basse.
     
     Cherche à rejoindre ou rester dans un endroit sûr.
@@ -237,6 +310,8 @@ def deplacement_peinture_zero(notre_IA, le_plateau, distance_max, reserve):
         le_plateau (dict): Le plateau.
         distance_max (int): Portée de recherche.
         reserve (int): Niveau de réserve actuel.
+        menaces (list, optional): La probabilité que chaque case soit repeinte par un adversaire.
+        carte_exposition (bytearray, optional): Le nombre d'adversaires pouvant peindre chaque case.
 
     Returns:
         tuple[str, str]: (Direction déplacement, Direction tir).
@@ -246,7 +321,7 @@ def deplacement_peinture_zero(notre_IA, le_plateau, distance_max, reserve):
     voisins = plateau.directions_possibles(le_plateau, ma_pos)
 
     if case_couleur(le_plateau, ma_pos) == ma_couleur:
-        d_pair = a_voisin_de_couleur(voisins, ma_couleur)
+        d_pair = voisin_de_couleur_sur(le_plateau, ma_pos, voisins, ma_couleur, menaces)
         if d_pair:
             return d_pair, RIEN
 
@@ -255,7 +330,7 @@ def deplacement_peinture_zero(notre_IA, le_plateau, distance_max, reserve):
         tir = direction if reserve > 0 and voisins.get(direction) != ma_couleur else RIEN
         return direction, tir
 
-    direction = direction_vers_securite(le_plateau, ma_pos, distance_max, ma_couleur)
+    direction = direction_vers_securite(le_plateau, ma_pos, distance_max, ma_couleur, menaces, carte_exposition)
     if direction:
         tir = direction if reserve > 0 and voisins.get(direction) != ma_couleur else RIEN
         return direction, tir
@@ -306,8 +381,9 @@ def deplacement_vers_objet(notre_IA, le_plateau, distance_max):
     ma_pos = joueur.get_pos(notre_IA)
     ma_coul = joueur.get_couleur(notre_IA)
     
-    resultat = inondation.Innondation(le_plateau, ma_pos, distance_max, recherche='O', arret_premier=True)
-    direction = innondation_direction(resultat)
+    table = distances.table_distances(le_plateau)
+    resultat = distances.plus_proche(table, ma_pos, distances.positions_objets(le_plateau), distance_max)
+    direction = resultat[2] if resultat is not None else None
     if direction:
         dir_tir = RIEN
         couleur_voisin = get_voisin_safe(le_plateau, ma_pos, direction)
@@ -337,14 +413,11 @@ def deplacement_vers_autre(notre_IA, le_plateau, distance_max):
     if not voisins_possibles:
         return RIEN, RIEN
 
-    direction = direction_vers_couleur(le_plateau, ma_pos, distance_max//5, VIDE)
-    
-    if not direction:
-        res_ennemi = inondation.Innondation(le_plateau, ma_pos, distance_max, recherche='A', C_cherche=ma_couleur, arret_premier=True)
-        direction = innondation_direction(res_ennemi)
-        
-    if not direction:
-        direction = direction_vers_couleur(le_plateau, ma_pos, distance_max, ma_couleur)
+    res = inondation.inondation_multiple(le_plateau, ma_pos, {
+        "vide": (inondation.test_couleur(le_plateau, VIDE), distance_max//5),
+        "ennemi": (inondation.test_autre_couleur(le_plateau, ma_couleur), distance_max),
+        "ami": (inondation.test_couleur(le_plateau, ma_couleur), distance_max)})
+    direction = direction_trouvee(res, "vide") or direction_trouvee(res, "ennemi") or direction_trouvee(res, "ami")
 
     if direction:
         d_lig, d_col = plateau.INC_DIRECTION[direction]
@@ -362,12 +435,18 @@ def deplacement_vers_autre(notre_IA, le_plateau, distance_max):
     return direction, tir
 
 
-def direction_tir_ennemi(notre_IA, le_plateau):
+def direction_tir_ennemi(notre_IA, le_plateau, historique=None, distance_max=const.PORTEE_PEINTURE):
     """Cherche la meilleure direction pour tirer sur un ennemi.
 
+    Sans historique on compte les joueurs à portée dans chaque direction. Avec l'historique
+    des adversaires on compte le nombre moyen d'adversaires sans bouclier qui seront sur
+    les cases peintes, compte tenu de leurs déplacements probables.
+
     Args:
         notre_IA (dict): Le joueur.
         le_plateau (dict): Le plateau.
+        historique (dict, optional): L'historique des adversaires (voir adversaires.py).
+        distance_max (int, optional): La portée de la peinture.
 
     Returns:
         str: La meilleure direction pour tirer sur un ennemi.
@@ -375,8 +454,22 @@ def direction_tir_ennemi(notre_IA, le_plateau):
     ma_pos = joueur.get_pos(notre_IA)
     meilleure_dir = RIEN
     max_ennemis = 0
+    if historique is not None:
+        tables = evaluation.tables_rayons(le_plateau, distance_max)
+        base = (ma_pos[0] * le_plateau["nb_colonnes"] + ma_pos[1]) * 4
+        transperce = joueur.get_objet(notre_IA) == const.PISTOLET
+        for num_dir, direction in enumerate(evaluation.DIRECTIONS):
+            fin = distance_max if transperce else min(distance_max, tables["libres"][base + num_dir])
+            nb = adversaires.presence_attendue(historique, le_plateau, distance_max,
+                                               tables["cases"][base + num_dir][:fin])
+            if nb > max_ennemis:
+                max_ennemis = nb
+                meilleure_dir = direction
+        return meilleure_dir
+    evaluations = evaluation.evaluer_peintures(le_plateau, ma_pos, joueur.get_couleur(notre_IA),
+                                               joueur.get_reserve(notre_IA), distance_max)
     for direction in "NESO":
-        nb = plateau.nb_joueurs_direction(le_plateau, ma_pos, direction, const.PORTEE_PEINTURE)
+        nb = evaluations[direction]["nb_joueurs_portee"]
         if nb > max_ennemis:
             max_ennemis = nb
             meilleure_dir = direction
@@ -395,15 +488,10 @@ def tirer_sur_mur(notre_IA, le_plateau):
     if joueur.get_objet(notre_IA) != const.PISTOLET:
         return None
     portee = 5
-    ma_lig, ma_col = joueur.get_pos(notre_IA) 
-    directions = plateau.INC_DIRECTION
-    for sens, (d_lig, d_col) in directions.items():
-        if sens == RIEN: continue
-        for i in range(1, portee + 1):
-            cible = (ma_lig + d_lig * i, ma_col + d_col * i)
-            if not plateau.est_sur_plateau(le_plateau, cible): break
-            la_case = plateau.get_case(le_plateau, cible) 
-            if case.est_mur(la_case): return sens 
+    table = plateau.get_rayons(le_plateau)
+    for sens in rayons.DIRECTIONS:
+        distance = rayons.distance_mur(table, joueur.get_pos(notre_IA), sens)
+        if distance is not None and distance <= portee: return sens
     return None
 
 
@@ -427,6 +515,64 @@ def mon_IA(ma_couleur, carac_jeu, le_plateau, les_joueurs):
         str: une chaine de deux caractères en majuscules indiquant la direction de peinture
             et la direction de déplacement
     """
+    historique = observer_tour(ma_couleur, carac_jeu, le_plateau, les_joueurs)
+    if BUDGET is not None:
+        action, _ = planificateur.planifier(ma_couleur, carac_jeu, le_plateau, les_joueurs, BUDGET)
+        if action is not None:
+            return action
+    return action_reactive(historique, ma_couleur, carac_jeu, le_plateau, les_joueurs)
+
+
+def observer_tour(ma_couleur, carac_jeu, le_plateau, les_joueurs):
+    """Met à jour l'historique des adversaires du joueur avec l'état du tour. C'est le seul
+    point d'observation: il est appelé une fois par tour par chaque point d'entrée
+    (mon_IA, mon_IA_reactive, mon_IA_planifiee).
+
+    Args:
+        ma_couleur (str): La couleur du joueur.
+        carac_jeu (dict): Les caractéristiques du jeu.
+        le_plateau (dict): Le plateau actuel.
+        les_joueurs (dict): Les joueurs indexés par leur couleur.
+
+    Returns:
+        dict: L'historique des adversaires du joueur.
+    """
+    historique = HISTORIQUES.setdefault(ma_couleur, adversaires.Historique(ma_couleur))
+    adversaires.observer(historique, carac_jeu, le_plateau, les_joueurs)
+    return historique
+
+
+def mon_IA_reactive(ma_couleur, carac_jeu, le_plateau, les_joueurs):
+    """Partie réactive de mon_IA (sans planificateur), utilisable seule par serveur.simulation.
+
+    Args:
+        ma_couleur (str): La couleur du joueur.
+        carac_jeu (dict): Les caractéristiques du jeu.
+        le_plateau (dict): Le plateau actuel.
+        les_joueurs (dict): Les joueurs indexés par leur couleur.
+
+    Returns:
+        str: L'action choisie.
+    """
+    historique = observer_tour(ma_couleur, carac_jeu, le_plateau, les_joueurs)
+    return action_reactive(historique, ma_couleur, carac_jeu, le_plateau, les_joueurs)
+
+
+def action_reactive(historique, ma_couleur, carac_jeu, le_plateau, les_joueurs):
+    """Choisit l'action sans planificateur à partir d'un historique déjà mis à jour pour ce
+    tour (voir observer_tour), utilisée aussi quand le planificateur n'a pas de réponse
+    dans le temps imparti.
+
+    Args:
+        historique (dict): L'historique des adversaires, déjà observé ce tour.
+        ma_couleur (str): La couleur du joueur.
+        carac_jeu (dict): Les caractéristiques du jeu.
+        le_plateau (dict): Le plateau actuel.
+        les_joueurs (dict): Les joueurs indexés par leur couleur.
+
+    Returns:
+        str: L'action choisie.
+    """
     notre_IA = les_joueurs[ma_couleur]
     deplacement = RIEN
     tir = RIEN
@@ -436,16 +582,20 @@ def mon_IA(ma_couleur, carac_jeu, le_plateau, les_joueurs):
 
     ma_pos = joueur.get_pos(notre_IA)
     voisins = plateau.directions_possibles(le_plateau, ma_pos)
+    distance_max = carac_jeu["distance_max"]
+    menaces = adversaires.predictions(historique, le_plateau, distance_max)["menaces"]
+    carte_exposition = exposition.carte_exposition(le_plateau, les_joueurs, ma_couleur, distance_max)
 
     if case_couleur(le_plateau, ma_pos) == ma_couleur:
-        d_allie = a_voisin_de_couleur(voisins, ma_couleur)
+        d_allie = voisin_de_couleur_sur(le_plateau, ma_pos, voisins, ma_couleur, menaces)
         
         if d_allie:
             if reserve < 4:
                 return RIEN + d_allie
 
     if case_couleur(le_plateau, ma_pos) != ma_couleur:
-        direction = direction_vers_securite(le_plateau, ma_pos, distance_max_plateau(le_plateau), ma_couleur)
+        direction = direction_vers_securite(le_plateau, ma_pos, distance_max_plateau(le_plateau), ma_couleur,
+                                            menaces, carte_exposition)
         if direction:
             deplacement = direction
             tir = direction if reserve > 0 else RIEN
@@ -454,7 +604,8 @@ def mon_IA(ma_couleur, carac_jeu, le_plateau, les_joueurs):
             tir = tir_sur_case_non_ami(voisins, ma_couleur) if reserve > 0 else RIEN
 
     elif 0 <= reserve < 2:
-        deplacement, tir = deplacement_peinture_zero(notre_IA, le_plateau, distance_max_plateau(le_plateau), reserve)
+        deplacement, tir = deplacement_peinture_zero(notre_IA, le_plateau, distance_max_plateau(le_plateau), reserve,
+                                                      menaces, carte_exposition)
             
     elif reserve < 0:
         deplacement, tir = deplacement_peinture_negative(notre_IA, le_plateau, distance_max_plateau(le_plateau))
@@ -474,7 +625,7 @@ def mon_IA(ma_couleur, carac_jeu, le_plateau, les_joueurs):
              deplacement, tir = deplacement_vers_autre(notre_IA, le_plateau, distance_max_plateau(le_plateau))
 
         if tir == RIEN:
-            tir_ennemi = direction_tir_ennemi(notre_IA, le_plateau)
+            tir_ennemi = direction_tir_ennemi(notre_IA, le_plateau, historique, distance_max)
             if tir_ennemi != RIEN:
                 tir = tir_ennemi
             else:
@@ -485,6 +636,27 @@ def mon_IA(ma_couleur, carac_jeu, le_plateau, les_joueurs):
 
 
 
+def mon_IA_planifiee(ma_couleur, carac_jeu, le_plateau, les_joueurs):
+    """Variante de mon_IA utilisant toujours le planificateur (avec BUDGET s'il est fourni,
+    sinon le budget par défaut du planificateur), utilisable par serveur.simulation.
+
+    Args:
+        ma_couleur (str): La couleur du joueur.
+        carac_jeu (dict): Les caractéristiques du jeu.
+        le_plateau (dict): Le plateau actuel.
+        les_joueurs (dict): Les joueurs indexés par leur couleur.
+
+    Returns:
+        str: L'action choisie.
+    """
+    historique = observer_tour(ma_couleur, carac_jeu, le_plateau, les_joueurs)
+    action, _ = planificateur.planifier(ma_couleur, carac_jeu, le_plateau, les_joueurs, BUDGET)
+    if action is None:
+        # le budget est déjà consommé: pas de seconde planification
+        return action_reactive(historique, ma_couleur, carac_jeu, le_plateau, les_joueurs)
+    return action
+
+
 if __name__=="__main__":
     noms_caracteristiques=["duree_actuelle","duree_totale","reserve_initiale","duree_obj","penalite","bonus_touche",
             "bonus_recharge","bonus_objet","distance_max"]
@@ -492,21 +664,61 @@ if __name__=="__main__":
     parser.add_argument("--equipe", dest="nom_equipe", help="nom de l'équipe", type=str, default='Non fournie')
     parser.add_argument("--serveur", dest="serveur", help="serveur de jeu", type=str, default='localhost')
     parser.add_argument("--port", dest="port", help="port de connexion", type=int, default=1111)
+    parser.add_argument("--compact", dest="compact", help="stocke le plateau dans des tableaux d'octets",
+                        action="store_true")
+    parser.add_argument("--delta", dest="delta", help="ne recevoir que les changements entre deux états du jeu",
+                        action="store_true")
+    parser.add_argument("--binaire", dest="binaire", help="recevoir le jeu au format binaire (plateau compact)",
+                        action="store_true")
+    parser.add_argument("--taille_chunk", dest="taille_chunk", help="nombre d'octets lus à chaque réception",
+                        type=int, default=8192)
+    parser.add_argument("--cache_distances", dest="cache_distances", help="répertoire où sauver les tables de distances "
+                        "des cartes d'au plus %d cases accessibles (calculées à la demande sinon)" % distances.TAILLE_MAX,
+                        type=str, default=None)
+    parser.add_argument("--partie", dest="partie", help="partie à rejoindre sur un serveur multi-parties",
+                        type=str, default=None)
+    parser.add_argument("--budget", dest="budget", help="temps de réflexion par tour en secondes (active le planificateur)",
+                        type=float, default=None)
     
     args = parser.parse_args()
-    le_client=client.ClientCyber()
+    distances.REPERTOIRE_CACHE=args.cache_distances
+    BUDGET=args.budget
+    options=[]
+    if args.delta:
+        options.append(client.OPTION_DELTA)
+    if args.binaire:
+        options.append(client.OPTION_BINAIRE)
+    if args.partie is not None:
+        options.append(client.OPTION_PARTIE+"="+args.partie)
+    le_client=client.ClientCyber(taille_chunk=args.taille_chunk)
     le_client.creer_socket(args.serveur,args.port)
-    le_client.enregistrement(args.nom_equipe,"joueur")
+    le_client.enregistrement(args.nom_equipe,"joueur",options)
     ok=True
+    le_plateau=None
     while ok:
         ok,id_joueur,le_jeu=le_client.prochaine_commande()
-        if ok:
+        if ok and args.binaire:
+            etat=client.decoder_jeu(le_jeu)
+            joueurs={}
+            for couleur,reserve,surface,points,objet,duree_objet,lig,col,nom in etat["joueurs"]:
+                joueurs[couleur]=joueur.Joueur(couleur,nom,reserve,surface,points,(lig,col),objet,duree_objet)
+            le_plateau=plateau_compact.plateau_from_octets(etat["nb_lignes"],etat["nb_colonnes"],etat["grille"],
+                                                           etat["pos_joueurs"],etat["pos_objets"],le_plateau)
+            carac_jeu=dict(zip(noms_caracteristiques,etat["carac_jeu"]))
+            actions_joueur=mon_IA(id_joueur,carac_jeu,le_plateau,joueurs)
+            le_client.envoyer_commande_client(actions_joueur)
+        elif ok:
             val_carac_jeu,etat_plateau,les_joueurs=le_jeu.split("--------------------\n")
             joueurs={}
             for ligne in les_joueurs[:-1].split('\n'):
                 lejoueur=joueur.joueur_from_str(ligne)
                 joueurs[joueur.get_couleur(lejoueur)]=lejoueur
-            le_plateau=plateau.Plateau(etat_plateau)
+            # le plateau est conservé d'un tour à l'autre et seules les cases modifiées sont mises à jour
+            if le_plateau is None or plateau.maj_plateau(le_plateau,etat_plateau) is None:
+                if args.compact:
+                    le_plateau=plateau_compact.Plateau(etat_plateau)
+                else:
+                    le_plateau=plateau.Plateau(etat_plateau)
             val_carac=val_carac_jeu.split(";")
             carac_jeu={}
             for i in range(len(noms_caracteristiques)):
@@ -0,0 +1,360 @@
+"""
+Module de calcul des distances entre les cases d'une carte.
+
+Les murs ne changent jamais pendant une partie (seule leur peinture change): depuis une
+case de départ on calcule une fois pour toutes la distance, la direction du premier
+déplacement et le rang de chaque case d'arrivée dans le parcours en largeur partant de
+la case de départ (les voisins étant explorés dans l'ordre N, E, S, O comme dans
+inondation.py). La case la plus proche parmi des candidats s'obtient alors par simple
+lecture de ces tables, et c'est la même que celle que trouverait l'inondation.
+
+Chaque ligne de la table (les distances depuis une case de départ) est calculée la première
+fois qu'on en a besoin, dans des tableaux compacts (array 'H' et 'B'), et conservée en
+mémoire dans la limite de MEMOIRE_MAX octets par carte. Seules les tables des NB_CARTES_MAX
+dernières cartes rencontrées sont gardées. Si un répertoire de cache est fourni, la table complète des cartes d'au plus
+TAILLE_MAX cases accessibles est calculée d'un coup et sauvegardée sur disque, sous un nom
+dépendant uniquement des murs de la carte.
+"""
+import hashlib
+import os
+import sys
+from array import array
+from collections import deque
+
+from bot_ia import const
+from bot_ia import plateau
+from bot_ia import plateau_compact
+
+# nombre maximum de cases accessibles pour lequel la table complète est sauvée sur disque
+# (5 octets par paire de cases: 5 Mo et moins d'une seconde de calcul pour 1000 cases)
+TAILLE_MAX = 1000
+# mémoire (en octets) occupée au plus par les lignes conservées de la table d'une carte
+MEMOIRE_MAX = 32 * 1024 * 1024
+INFINI = 0xFFFF
+AUCUNE_DIRECTION = 0xFF
+DIRECTIONS = [direction for direction in plateau.INC_DIRECTION if direction != 'X']
+
+# répertoire où les tables sont sauvegardées (None pour ne pas utiliser de cache disque)
+REPERTOIRE_CACHE = None
+# nombre de cartes dont la table est gardée en mémoire (une partie se joue sur une seule carte)
+NB_CARTES_MAX = 1
+# tables déjà calculées, par clé des murs, de la moins récemment utilisée à la plus récente
+TABLES_CALCULEES = {}
+
+
+def murs_plateau(le_plateau):
+    """retourne les murs du plateau sous la forme d'un octet par case (1 pour un mur)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+
+    Returns:
+        bytes: les murs du plateau
+    """
+    if plateau_compact.est_compact(le_plateau):
+        return bytes(le_plateau["murs"])
+    return bytes(1 if la_case["mur"] else 0 for la_case in le_plateau["les_valeurs"])
+
+
+def cle_murs(nb_lignes, nb_colonnes, murs):
+    """retourne une clé identifiant une carte par ses dimensions et ses murs
+
+    Args:
+        nb_lignes (int): le nombre de lignes de la carte
+        nb_colonnes (int): le nombre de colonnes de la carte
+        murs (bytes): un octet par case, 1 pour un mur
+
+    Returns:
+        str: l'empreinte sha1 de la carte
+    """
+    empreinte = hashlib.sha1(("%d;%d;%s;" % (nb_lignes, nb_colonnes, sys.byteorder)).encode())
+    empreinte.update(murs)
+    return empreinte.hexdigest()
+
+
+def preparer_table(nb_lignes, nb_colonnes, murs):
+    """prépare la table des distances d'une carte: numéros et voisins des cases accessibles,
+        les lignes de la table (une par case de départ) étant calculées à la demande
+
+    Args:
+        nb_lignes (int): le nombre de lignes de la carte
+        nb_colonnes (int): le nombre de colonnes de la carte
+        murs (bytes): un octet par case, 1 pour un mur
+
+    Returns:
+        dict: la table (voir table_distances) sans aucune ligne calculée
+    """
+    cases = [ind for ind in range(nb_lignes * nb_colonnes) if not murs[ind]]
+    nb_cases = len(cases)
+    numeros = [-1] * (nb_lignes * nb_colonnes)
+    for num, ind in enumerate(cases):
+        numeros[ind] = num
+    voisins = []
+    for ind in cases:
+        lig, col = divmod(ind, nb_colonnes)
+        voisins_case = []
+        for code, direction in enumerate(DIRECTIONS):
+            d_lig, d_col = plateau.INC_DIRECTION[direction]
+            if 0 <= lig + d_lig < nb_lignes and 0 <= col + d_col < nb_colonnes:
+                num_voisin = numeros[(lig + d_lig) * nb_colonnes + col + d_col]
+                if num_voisin != -1:
+                    voisins_case.append((num_voisin, code))
+        voisins.append(voisins_case)
+    return {"nb_colonnes": nb_colonnes, "nb_cases": nb_cases, "numeros": numeros, "voisins": voisins,
+            "lignes": {}, "nb_lignes_max": max(1, MEMOIRE_MAX // (5 * max(1, nb_cases)))}
+
+
+def calculer_ligne(table, depart):
+    """calcule par un parcours en largeur les distances depuis une case accessible
+
+    Args:
+        table (dict): la table des distances de la carte
+        depart (int): le numéro de la case de départ
+
+    Returns:
+        tuple: les tableaux distances, rangs et directions indexés par le numéro de la case d'arrivée
+    """
+    nb_cases = table["nb_cases"]
+    voisins = table["voisins"]
+    distances = array('H', [INFINI]) * nb_cases
+    rangs = array('H', [INFINI]) * nb_cases
+    directions = array('B', [AUCUNE_DIRECTION]) * nb_cases
+    distances[depart] = 0
+    rangs[depart] = 0
+    rang = 1
+    file = deque([depart])
+    while file:
+        num = file.popleft()
+        distance = distances[num] + 1
+        premiere = directions[num]
+        for num_voisin, code in voisins[num]:
+            if distances[num_voisin] == INFINI:
+                distances[num_voisin] = distance
+                rangs[num_voisin] = rang
+                directions[num_voisin] = code if num == depart else premiere
+                rang += 1
+                file.append(num_voisin)
+    return distances, rangs, directions
+
+
+def ligne(table, depart):
+    """retourne la ligne de la table pour une case de départ, calculée à sa première demande.
+        Au delà de nb_lignes_max lignes conservées, la plus ancienne est oubliée
+
+    Args:
+        table (dict): la table des distances de la carte
+        depart (int): le numéro de la case de départ
+
+    Returns:
+        tuple: les tableaux distances, rangs et directions (voir calculer_ligne)
+    """
+    lignes = table["lignes"]
+    if depart not in lignes:
+        if len(lignes) >= table["nb_lignes_max"]:
+            del lignes[next(iter(lignes))]
+        lignes[depart] = calculer_ligne(table, depart)
+    return lignes[depart]
+
+
+def calculer_table(nb_lignes, nb_colonnes, murs):
+    """calcule toutes les lignes de la table des distances d'une carte
+
+    Args:
+        nb_lignes (int): le nombre de lignes de la carte
+        nb_colonnes (int): le nombre de colonnes de la carte
+        murs (bytes): un octet par case, 1 pour un mur
+
+    Returns:
+        dict: la table (voir table_distances)
+    """
+    table = preparer_table(nb_lignes, nb_colonnes, murs)
+    for depart in range(table["nb_cases"]):
+        ligne(table, depart)
+    return table
+
+
+def sauver_table(table, nom_fic):
+    """sauvegarde les lignes d'une table complète dans un fichier binaire
+
+    Args:
+        table (dict): la table à sauvegarder
+        nom_fic (str): le nom du fichier
+    """
+    with open(nom_fic + ".tmp", "wb") as fic:
+        for num_tableau in range(3):
+            for depart in range(table["nb_cases"]):
+                table["lignes"][depart][num_tableau].tofile(fic)
+    os.replace(nom_fic + ".tmp", nom_fic)
+
+
+def charger_table(nb_lignes, nb_colonnes, murs, nom_fic):
+    """recharge une table sauvegardée par sauver_table
+
+    Args:
+        nb_lignes (int): le nombre de lignes de la carte
+        nb_colonnes (int): le nombre de colonnes de la carte
+        murs (bytes): un octet par case, 1 pour un mur
+        nom_fic (str): le nom du fichier
+
+    Returns:
+        dict: la table ou None si le fichier est absent ou incomplet
+    """
+    table = preparer_table(nb_lignes, nb_colonnes, murs)
+    nb_cases = table["nb_cases"]
+    tableaux = [array('H'), array('H'), array('B')]
+    try:
+        with open(nom_fic, "rb") as fic:
+            for tableau in tableaux:
+                tableau.fromfile(fic, nb_cases * nb_cases)
+    except (OSError, EOFError):
+        return None
+    for depart in range(nb_cases):
+        table["lignes"][depart] = tuple(tableau[depart * nb_cases:(depart + 1) * nb_cases]
+                                        for tableau in tableaux)
+    return table
+
+
+def table_distances(le_plateau, repertoire_cache=None):
+    """retourne la table des distances de la carte du plateau. Elle n'est créée
+        qu'une fois par carte: elle est conservée dans le plateau (clé "distances"),
+        en mémoire pour les plateaux suivants ayant les mêmes murs (pour les NB_CARTES_MAX
+        dernières cartes seulement), et complète dans le
+        répertoire de cache s'il est fourni (par défaut REPERTOIRE_CACHE) et que la carte
+        a au plus TAILLE_MAX cases accessibles
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        repertoire_cache (str, optional): le répertoire des tables sauvegardées
+
+    Returns:
+        dict: la table avec les clés nb_colonnes, nb_cases, numeros (numéro de chaque case
+            accessible, -1 pour un mur), voisins et lignes (les lignes déjà calculées par numéro
+            de départ, voir ligne)
+    """
+    if "distances" in le_plateau:
+        return le_plateau["distances"]
+    nb_lignes = le_plateau["nb_lignes"]
+    nb_colonnes = le_plateau["nb_colonnes"]
+    murs = murs_plateau(le_plateau)
+    cle = cle_murs(nb_lignes, nb_colonnes, murs)
+    if cle in TABLES_CALCULEES:
+        # la carte redevient la plus récente
+        TABLES_CALCULEES[cle] = TABLES_CALCULEES.pop(cle)
+    else:
+        if repertoire_cache is None:
+            repertoire_cache = REPERTOIRE_CACHE
+        table = None
+        if repertoire_cache is not None and len(murs) - murs.count(1) <= TAILLE_MAX:
+            nom_fic = os.path.join(repertoire_cache, cle + ".dist")
+            table = charger_table(nb_lignes, nb_colonnes, murs, nom_fic)
+            if table is None:
+                table = calculer_table(nb_lignes, nb_colonnes, murs)
+                os.makedirs(repertoire_cache, exist_ok=True)
+                sauver_table(table, nom_fic)
+        if table is None:
+            table = preparer_table(nb_lignes, nb_colonnes, murs)
+        TABLES_CALCULEES[cle] = table
+        while len(TABLES_CALCULEES) > NB_CARTES_MAX:
+            del TABLES_CALCULEES[next(iter(TABLES_CALCULEES))]
+    le_plateau["distances"] = TABLES_CALCULEES[cle]
+    return le_plateau["distances"]
+
+
+def distance(table, depart, arrivee):
+    """retourne la longueur du plus court chemin entre deux positions
+
+    Args:
+        table (dict): la table des distances de la carte
+        depart (tuple): la position de départ (lig,col)
+        arrivee (tuple): la position d'arrivée (lig,col)
+
+    Returns:
+        int: la distance ou None si l'arrivée n'est pas accessible depuis le départ
+    """
+    num_depart = table["numeros"][depart[0] * table["nb_colonnes"] + depart[1]]
+    num_arrivee = table["numeros"][arrivee[0] * table["nb_colonnes"] + arrivee[1]]
+    if num_depart == -1 or num_arrivee == -1:
+        return None
+    res = ligne(table, num_depart)[0][num_arrivee]
+    return None if res == INFINI else res
+
+
+def direction(table, depart, arrivee):
+    """retourne la direction du premier déplacement d'un plus court chemin
+
+    Args:
+        table (dict): la table des distances de la carte
+        depart (tuple): la position de départ (lig,col)
+        arrivee (tuple): la position d'arrivée (lig,col)
+
+    Returns:
+        str: la direction ('N', 'E', 'S' ou 'O') ou None si l'arrivée est inaccessible
+            ou égale au départ
+    """
+    num_depart = table["numeros"][depart[0] * table["nb_colonnes"] + depart[1]]
+    num_arrivee = table["numeros"][arrivee[0] * table["nb_colonnes"] + arrivee[1]]
+    if num_depart == -1 or num_arrivee == -1:
+        return None
+    code = ligne(table, num_depart)[2][num_arrivee]
+    return None if code == AUCUNE_DIRECTION else DIRECTIONS[code]
+
+
+def plus_proche(table, depart, candidats, distance_max=None):
+    """cherche parmi les candidats la position la plus proche du départ. En cas
+        d'égalité c'est la première atteinte par l'inondation partant du départ
+
+    Args:
+        table (dict): la table des distances de la carte
+        depart (tuple): la position de départ (lig,col)
+        candidats (iterable): les positions (lig,col) candidates
+        distance_max (int, optional): la distance au delà de laquelle les candidats sont ignorés
+
+    Returns:
+        tuple: un triplet (distance, position, direction) ou None si aucun candidat n'est
+            accessible. La direction est None si le départ est lui-même un candidat
+    """
+    numeros = table["numeros"]
+    nb_colonnes = table["nb_colonnes"]
+    num_depart = numeros[depart[0] * nb_colonnes + depart[1]]
+    if num_depart == -1:
+        return None
+    distances, rangs, _ = ligne(table, num_depart)
+    if distance_max is None or distance_max >= INFINI:
+        distance_max = INFINI - 1
+    meilleur = None
+    meilleur_rang = INFINI
+    for pos in candidats:
+        num = numeros[pos[0] * nb_colonnes + pos[1]]
+        if num != -1 and distances[num] <= distance_max and rangs[num] < meilleur_rang:
+            meilleur = pos
+            meilleur_rang = rangs[num]
+    if meilleur is None:
+        return None
+    return distance(table, depart, meilleur), meilleur, direction(table, depart, meilleur)
+
+
+def positions_objets(le_plateau, objet=None):
+    """retourne les positions des objets posés sur le plateau
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        objet (int, optional): si fourni, seules les positions de cet objet sont retournées
+
+    Returns:
+        list: la liste des positions (lig,col)
+    """
+    nb_colonnes = le_plateau["nb_colonnes"]
+    res = []
+    if plateau_compact.est_compact(le_plateau):
+        objets = le_plateau["objets"]
+        for num in range(1, const.NB_OBJETS + 1):
+            if objet is None or objet == num:
+                ind = objets.find(num)
+                while ind != -1:
+                    res.append(divmod(ind, nb_colonnes))
+                    ind = objets.find(num, ind + 1)
+        return res
+    for ind, la_case in enumerate(le_plateau["les_valeurs"]):
+        if la_case["objet"] != const.AUCUN and (objet is None or la_case["objet"] == objet):
+            res.append(divmod(ind, nb_colonnes))
+    return res
@@ -0,0 +1,231 @@
+"""
+Évaluation simultanée de toutes les directions de peinture.
+
+Pour chaque tireur (position, couleur, réserve, pistolet ou non) et chaque direction
+'N', 'E', 'S', 'O' on calcule ce que donnerait plateau.peindre(..., simul=True): coût,
+nombre de cases et de murs repeints, joueurs touchés, ainsi que le nombre de joueurs
+à portée comme plateau.nb_joueurs_direction.
+
+Les rayons partant de chaque case sont calculés une fois par carte et par portée
+(ils ne dépendent que des murs) et conservés dans le plateau sous la clé "evaluation".
+Si numpy est installé et que les tireurs sont nombreux, tous les tireurs et toutes les
+directions sont évalués en une seule opération sur des tableaux; sinon on parcourt les
+mêmes rayons en Python pur.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from bot_ia import const
+from bot_ia import plateau
+from bot_ia import plateau_compact
+from bot_ia import rayons
+
+DIRECTIONS = ['N', 'E', 'S', 'O']
+# nombre de tireurs à partir duquel le calcul par numpy est plus rapide que la boucle Python
+SEUIL_NUMPY = 32
+# nombre de bits à 1 de chaque octet (nombre de joueurs d'un masque)
+NB_BITS = bytes(bin(masque).count('1') for masque in range(256))
+# joueurs de chaque masque
+JOUEURS_MASQUE = [tuple(plateau_compact.joueurs_du_masque(masque)) for masque in range(256)]
+
+
+def tables_rayons(le_plateau, distance_max):
+    """retourne les rayons de la carte pour une portée donnée, calculés une seule fois
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        dict: pour chaque case et chaque direction, "cases" donne les indices des distance_max+1
+            cases du rayon partant de la case (la case elle-même comprise) qui sont sur le
+            plateau, et "libres" le nombre de ces cases précédant le premier mur
+    """
+    caches = le_plateau.setdefault("evaluation", {})
+    if distance_max in caches:
+        return caches[distance_max]
+    nb_lignes = le_plateau["nb_lignes"]
+    nb_colonnes = le_plateau["nb_colonnes"]
+    if plateau_compact.est_compact(le_plateau):
+        murs = [mur == 1 for mur in le_plateau["murs"]]
+    else:
+        murs = [la_case["mur"] for la_case in le_plateau["les_valeurs"]]
+    # les rayons de la carte (voir rayons.py) coupés à la portée
+    table = plateau.get_rayons(le_plateau)
+    cases = [rayons.cases_rayon(table, num, distance_max + 1) for num in range(len(table["longueurs"]))]
+    libres = [min(nb_libres, len(rayon)) for nb_libres, rayon in zip(table["libres"], cases)]
+    tables = {"distance_max": distance_max, "nb_colonnes": nb_colonnes, "cases": cases,
+              "libres": libres, "murs": murs}
+    if numpy is not None:
+        # rayons complétés par une case fictive (indice nb_cases) hors du plateau
+        nb_cases = nb_lignes * nb_colonnes
+        tab_cases = numpy.full((nb_cases * 4, distance_max + 1), nb_cases, dtype=numpy.intp)
+        for num, rayon in enumerate(cases):
+            tab_cases[num, :len(rayon)] = rayon
+        rangs = numpy.arange(distance_max + 1)
+        tables["tab_cases"] = tab_cases.reshape(nb_cases, 4, distance_max + 1)
+        tables["tab_libres"] = (rangs < numpy.array(libres)[:, None]).reshape(nb_cases, 4, distance_max + 1)
+        tables["tab_sur_plateau"] = (rangs < numpy.array([len(rayon) for rayon in cases])[:, None]).reshape(
+            nb_cases, 4, distance_max + 1)
+        tables["tab_murs"] = numpy.array(murs + [True], dtype=bool)
+    caches[distance_max] = tables
+    return tables
+
+
+def tableaux_plateau(le_plateau):
+    """retourne les couleurs (code de la lettre) et les masques des joueurs présents de
+        chaque case, directement les tableaux d'un plateau compact
+
+    Args:
+        le_plateau (dict): le plateau considéré
+
+    Returns:
+        tuple: deux suites d'octets (couleurs, masques des joueurs)
+    """
+    if plateau_compact.est_compact(le_plateau):
+        return le_plateau["couleurs"], le_plateau["joueurs"]
+    couleurs = bytearray()
+    masques = bytearray()
+    for la_case in le_plateau["les_valeurs"]:
+        couleurs.append(ord(la_case["couleur"]))
+        masque = 0
+        for joueur in la_case["joueurs_presents"]:
+            masque |= plateau_compact.bit_joueur(joueur)
+        masques.append(masque)
+    return couleurs, masques
+
+
+def resultat(cout, nb_repeintes, nb_murs_repeints, masque_touches, nb_joueurs_portee):
+    return {"cout": cout, "nb_repeintes": nb_repeintes, "nb_murs_repeints": nb_murs_repeints,
+            "joueurs_touches": set(JOUEURS_MASQUE[masque_touches]),
+            "nb_joueurs_portee": nb_joueurs_portee}
+
+
+def evaluer_python(tables, couleurs, masques, tireurs):
+    """version Python pure de evaluer_tireurs (mêmes paramètres et résultat)"""
+    distance_max = tables["distance_max"]
+    murs = tables["murs"]
+    res = []
+    for (lig, col), couleur, reserve, transperce in tireurs:
+        code = ord(couleur)
+        base = (lig * tables["nb_colonnes"] + col) * 4
+        evaluation = {}
+        for num_dir, direction in enumerate(DIRECTIONS):
+            num = base + num_dir
+            rayon = tables["cases"][num]
+            libres = tables["libres"][num]
+            cout = nb_repeintes = nb_murs = masque_touches = 0
+            for ind in rayon[:distance_max] if transperce else rayon[:min(libres, distance_max)]:
+                coul = couleurs[ind]
+                cout_case = 1 if coul == code or coul == 32 else 2
+                if cout + cout_case > reserve:
+                    break
+                cout += cout_case
+                if coul != code:
+                    nb_repeintes += 1
+                    if murs[ind]:
+                        nb_murs += 1
+                masque_touches |= masques[ind]
+            portee = sum(NB_BITS[masques[ind]] for ind in rayon[:libres])
+            evaluation[direction] = resultat(cout, nb_repeintes, nb_murs, masque_touches, portee)
+        res.append(evaluation)
+    return res
+
+
+def evaluer_numpy(tables, couleurs, masques, tireurs):
+    """version vectorisée de evaluer_tireurs (mêmes paramètres et résultat)"""
+    distance_max = tables["distance_max"]
+    nb_colonnes = tables["nb_colonnes"]
+    couleurs = numpy.append(numpy.frombuffer(bytes(couleurs), dtype=numpy.uint8), numpy.uint8(32))
+    masques = numpy.append(numpy.frombuffer(bytes(masques), dtype=numpy.uint8), numpy.uint8(0))
+    indices = numpy.array([lig * nb_colonnes + col for (lig, col), _, _, _ in tireurs], dtype=numpy.intp)
+    codes = numpy.array([ord(couleur) for _, couleur, _, _ in tireurs], dtype=numpy.uint8)[:, None, None]
+    reserves = numpy.array([reserve for _, _, reserve, _ in tireurs])[:, None, None]
+    transperce = numpy.array([transperce for _, _, _, transperce in tireurs], dtype=bool)[:, None, None]
+
+    cases = tables["tab_cases"][indices]
+    libres = tables["tab_libres"][indices]
+    rayons = cases[:, :, :distance_max]
+    valides = numpy.where(transperce, tables["tab_sur_plateau"][indices][:, :, :distance_max],
+                          libres[:, :, :distance_max])
+    coul = couleurs[rayons]
+    a_nous = coul == codes
+    couts = numpy.where(a_nous | (coul == 32), 1, 2) * valides
+    # les couts étant positifs, les cases payées forment un préfixe de chaque rayon
+    peintes = valides & (numpy.cumsum(couts, axis=2) <= reserves)
+    repeintes = peintes & ~a_nous
+    cout = (couts * peintes).sum(axis=2)
+    nb_repeintes = repeintes.sum(axis=2)
+    nb_murs = (repeintes & tables["tab_murs"][rayons]).sum(axis=2)
+    touches = numpy.bitwise_or.reduce(masques[rayons] * peintes, axis=2)
+    portee = (numpy.frombuffer(NB_BITS, dtype=numpy.uint8)[masques[cases]] * libres).sum(axis=2)
+
+    res = []
+    for couts_t, repeintes_t, murs_t, touches_t, portee_t in zip(cout.tolist(), nb_repeintes.tolist(),
+                                                                 nb_murs.tolist(), touches.tolist(),
+                                                                 portee.tolist()):
+        res.append({direction: resultat(couts_t[num_dir], repeintes_t[num_dir], murs_t[num_dir],
+                                        touches_t[num_dir], portee_t[num_dir])
+                    for num_dir, direction in enumerate(DIRECTIONS)})
+    return res
+
+
+def evaluer_tireurs(le_plateau, tireurs, distance_max):
+    """évalue les quatre directions de peinture de plusieurs tireurs à la fois
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        tireurs (list): une liste de quadruplets (position, couleur, réserve, transperce) où
+            transperce indique si la peinture traverse les murs (pistolet)
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        list: pour chaque tireur un dictionnaire {direction: évaluation} où l'évaluation
+            contient les clés "cout", "nb_repeintes", "nb_murs_repeints" et "joueurs_touches"
+            (comme plateau.peindre avec simul=True) et "nb_joueurs_portee" (comme
+            plateau.nb_joueurs_direction)
+    """
+    if not tireurs:
+        return []
+    tables = tables_rayons(le_plateau, distance_max)
+    couleurs, masques = tableaux_plateau(le_plateau)
+    if numpy is not None and len(tireurs) >= SEUIL_NUMPY:
+        return evaluer_numpy(tables, couleurs, masques, tireurs)
+    return evaluer_python(tables, couleurs, masques, tireurs)
+
+
+def evaluer_peintures(le_plateau, pos, couleur, reserve, distance_max, transperce=False):
+    """évalue les quatre directions de peinture depuis une position (voir evaluer_tireurs)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        pos (tuple): la position du tireur
+        couleur (str): la couleur du tireur
+        reserve (int): la réserve de peinture du tireur
+        distance_max (int): la portée de la peinture
+        transperce (bool, optional): si True la peinture traverse les murs
+
+    Returns:
+        dict: l'évaluation de chaque direction
+    """
+    return evaluer_tireurs(le_plateau, [(pos, couleur, reserve, transperce)], distance_max)[0]
+
+
+def evaluer_joueurs(le_plateau, les_joueurs, distance_max):
+    """évalue les quatre directions de peinture de tous les joueurs avec leur réserve
+        et leur objet (le pistolet traverse les murs)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        les_joueurs (dict): les joueurs indexés par leur couleur
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        dict: {couleur: {direction: évaluation}} (voir evaluer_tireurs)
+    """
+    couleurs = list(les_joueurs)
+    tireurs = [(les_joueurs[coul]["position"], coul, les_joueurs[coul]["reserve"],
+                les_joueurs[coul]["objet"] == const.PISTOLET) for coul in couleurs]
+    return dict(zip(couleurs, evaluer_tireurs(le_plateau, tireurs, distance_max)))
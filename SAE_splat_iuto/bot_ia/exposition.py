@@ -0,0 +1,97 @@
+"""
+Carte d'exposition du plateau aux tirs des adversaires.
+
+Pour chaque case on compte les adversaires qui peuvent la peindre à leur prochain tir
+depuis leur position actuelle: la case est dans l'un de leurs rayons de peinture, arrêté
+par le premier mur sauf pour un joueur qui tient le pistolet, et à portée de leur réserve
+(chaque case peinte coûtant au moins 1). La carte est un tableau d'octets indexé par
+lig * nb_colonnes + col: une fois construite, savoir si une case est exposée ne coûte
+qu'une lecture, au lieu de parcourir les rayons comme plateau.nb_joueurs_direction.
+
+La carte est calculée une fois par tour: elle est conservée dans le plateau (clé
+"exposition") avec les positions, objets et réserves des adversaires dont elle dépend,
+et n'est recalculée que si l'un d'eux a changé. Les rayons sont ceux calculés une seule
+fois par carte par evaluation.tables_rayons.
+"""
+from bot_ia import const
+from bot_ia import evaluation
+
+
+def tireurs_adverses(les_joueurs, ma_couleur, distance_max):
+    """retourne pour chaque adversaire pouvant peindre sa position, la longueur de ses
+        rayons et s'il transperce les murs
+
+    Args:
+        les_joueurs (dict): les joueurs indexés par leur couleur
+        ma_couleur (str): la couleur de notre joueur
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        tuple: les triplets (position, longueur, transperce) triés par couleur
+    """
+    res = []
+    for couleur in sorted(les_joueurs):
+        le_joueur = les_joueurs[couleur]
+        longueur = min(distance_max, le_joueur["reserve"])
+        if couleur != ma_couleur and longueur > 0:
+            res.append((le_joueur["position"], longueur, le_joueur["objet"] == const.PISTOLET))
+    return tuple(res)
+
+
+def calculer_exposition(le_plateau, tireurs, distance_max):
+    """calcule la carte d'exposition pour des tireurs donnés
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        tireurs (tuple): les triplets (position, longueur, transperce) (voir tireurs_adverses)
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        bytearray: le nombre de tireurs pouvant peindre chaque case
+    """
+    tables = evaluation.tables_rayons(le_plateau, distance_max)
+    nb_colonnes = le_plateau["nb_colonnes"]
+    carte = bytearray(le_plateau["nb_lignes"] * nb_colonnes)
+    for (lig, col), longueur, transperce in tireurs:
+        base = (lig * nb_colonnes + col) * 4
+        atteintes = set()
+        for num in range(base, base + 4):
+            fin = longueur if transperce else min(longueur, tables["libres"][num])
+            atteintes.update(tables["cases"][num][:fin])
+        for ind in atteintes:
+            carte[ind] += 1
+    return carte
+
+
+def carte_exposition(le_plateau, les_joueurs, ma_couleur, distance_max):
+    """retourne la carte d'exposition aux adversaires, calculée une seule fois par état
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        les_joueurs (dict): les joueurs indexés par leur couleur
+        ma_couleur (str): la couleur de notre joueur
+        distance_max (int): la portée de la peinture
+
+    Returns:
+        bytearray: le nombre d'adversaires pouvant peindre chaque case (par indice)
+    """
+    cle = (distance_max, tireurs_adverses(les_joueurs, ma_couleur, distance_max))
+    cache = le_plateau.get("exposition")
+    if cache is None or cache[0] != cle:
+        cache = (cle, calculer_exposition(le_plateau, cle[1], distance_max))
+        le_plateau["exposition"] = cache
+    return cache[1]
+
+
+def est_exposee(carte, le_plateau, pos):
+    """indique si une case peut être peinte par un adversaire à son prochain tir
+
+    Args:
+        carte (bytearray): la carte d'exposition
+        le_plateau (dict): le plateau considéré
+        pos (tuple): la position de la case
+
+    Returns:
+        bool: True si au moins un adversaire peut peindre la case
+    """
+    return carte[pos[0] * le_plateau["nb_colonnes"] + pos[1]] > 0
@@ -1,6 +1,74 @@
+from collections import deque
+
 from bot_ia import const
 from bot_ia import plateau
-from bot_ia import case
+from bot_ia import plateau_compact
+
+# ordre dans lequel les voisins d'une case sont explorés
+DIRECTIONS = [direction for direction in plateau.INC_DIRECTION if direction != 'X']
+
+
+def moteur_inondation(le_plateau):
+    """retourne les tables utilisées par l'inondation, calculées une seule fois par plateau:
+        pour chaque indice de case (lig * nb_colonnes + col) la liste des couples
+        (indice du voisin, direction) des voisins qui ne sont pas des murs, et un tableau
+        de marques réutilisé d'une inondation à l'autre pour repérer les cases visitées.
+        Les tables sont conservées dans le plateau (clé "inondation") et supprimées par
+        plateau.set_case puisque les murs peuvent alors changer
+
+    Args:
+        le_plateau (dict): le plateau considéré
+
+    Returns:
+        dict: les tables de l'inondation (clés "voisins", "marques" et "marque")
+    """
+    moteur = le_plateau.get("inondation")
+    if moteur is not None:
+        return moteur
+    nb_lignes = le_plateau["nb_lignes"]
+    nb_cols = le_plateau["nb_colonnes"]
+    if plateau_compact.est_compact(le_plateau):
+        murs = [mur == 1 for mur in le_plateau["murs"]]
+    else:
+        murs = [la_case["mur"] for la_case in le_plateau["les_valeurs"]]
+    voisins = []
+    for lig in range(nb_lignes):
+        for col in range(nb_cols):
+            voisins_case = []
+            for direction in DIRECTIONS:
+                d_lig, d_col = plateau.INC_DIRECTION[direction]
+                lig_v = lig + d_lig
+                col_v = col + d_col
+                if 0 <= lig_v < nb_lignes and 0 <= col_v < nb_cols and not murs[lig_v * nb_cols + col_v]:
+                    voisins_case.append((lig_v * nb_cols + col_v, direction))
+            voisins.append(tuple(voisins_case))
+    moteur = {"voisins": voisins, "marques": [0] * (nb_lignes * nb_cols), "marque": 0}
+    le_plateau["inondation"] = moteur
+    return moteur
+
+
+def lecteurs_cases(le_plateau):
+    """retourne trois fonctions donnant à partir de l'indice d'une case sa couleur,
+        son objet et l'ensemble des joueurs présents, sans construire de vue de case
+        pour un plateau compact
+
+    Args:
+        le_plateau (dict): le plateau considéré
+
+    Returns:
+        tuple: les fonctions (couleur, objet, joueurs)
+    """
+    if plateau_compact.est_compact(le_plateau):
+        couleurs = le_plateau["couleurs"]
+        objets = le_plateau["objets"]
+        masques = le_plateau["joueurs"]
+        ensembles = plateau_compact.ENSEMBLES_JOUEURS
+        return (lambda ind: chr(couleurs[ind]), objets.__getitem__,
+                lambda ind: ensembles[masques[ind]])
+    valeurs = le_plateau["les_valeurs"]
+    return (lambda ind: valeurs[ind]["couleur"], lambda ind: valeurs[ind]["objet"],
+            lambda ind: valeurs[ind]["joueurs_presents"])
+
 
 def Inondation(le_plateau, pos, distance_max, recherche=None, C_cherche=None, O_cherche=None, arret_premier=True):
     """
@@ -11,86 +79,197 @@ def Inondation(le_plateau, pos, distance_max, recherche=None, C_cherche=None, O_
         recherche (str): 'J' (Joueurs), 'O' (Objets), 'C' (Couleur), None (Tout).
         C_cherche (str): Si spécifié, ne retient que cette couleur.
         O_cherche (int): Si spécifié, ne retient que cet objet.
-        arret_premier (bool): Si True, s'arrête dès la première trouvaille. 
+        arret_premier (bool): Si True, s'arrête dès la première trouvaille.
                               Si False, scanne tout le rayon.
     Returns:
         dict: {(distance, pos): {'Objet': ..., 'Couleur': ..., 'Direction': ...}}
     """
     dico_distances = {}
-    
-    if plateau.est_sur_plateau(le_plateau, pos):
-        visitee = {pos}
-        queue = [(pos, 0, None)]
-        recherche_found = False
-        
-        nb_lignes = le_plateau["nb_lignes"]
-        nb_cols = le_plateau["nb_colonnes"]
-        valeurs = le_plateau["les_valeurs"]
-
-        cherche_tout = recherche is None
-        cherche_j = cherche_tout or ('J' in recherche)
-        cherche_o = cherche_tout or ('O' in recherche)
-        cherche_c = cherche_tout or ('C' in recherche)
-        
-        while queue and (not arret_premier or not recherche_found):
-
-            pos_actuelle, distance, premiere_direction = queue.pop(0)
-
-            if distance <= distance_max:
-                idx_actuelle = pos_actuelle[0] * nb_cols + pos_actuelle[1]
-                la_case = valeurs[idx_actuelle]
-                infos_case = {}
-                
-                trouve_ici = False
-
-                if cherche_j:
-                    joueurs_case = case.get_joueurs(la_case)
-                    if joueurs_case:
-                        infos_case['Joueur'] = joueurs_case
-                        if recherche == 'J': trouve_ici = True
-
-                if cherche_o:
-                    objet = case.get_objet(la_case)
-                    if objet != const.AUCUN and (O_cherche is None or objet == O_cherche):
-                        infos_case['Objet'] = objet
-                        if recherche == 'O': trouve_ici = True
-
-                if cherche_c:
-                    coul = case.get_couleur(la_case)
-                    if C_cherche is None:
-                        if coul != ' ':
-                            infos_case['Couleur'] = coul
-                            if recherche == 'C': trouve_ici = True
-                    else:
-                        if coul == C_cherche:
-                            infos_case['Couleur'] = coul
-                            if recherche == 'C': trouve_ici = True
-
-                if recherche == 'A':
-                    coul = case.get_couleur(la_case)
-                    if coul != C_cherche:
-                        infos_case['Couleur'] = coul
-                        trouve_ici = True
-
-                if trouve_ici:
-                    recherche_found = True
-
-                if infos_case and distance > 0:
-                    infos_case['Direction'] = premiere_direction
-                    dico_distances[(distance, pos_actuelle)] = infos_case
-
-                if distance < distance_max and (not arret_premier or not recherche_found):
-                    for dir_nom, (d_lig, d_col) in plateau.INC_DIRECTION.items():
-                        if dir_nom != 'X':
-                            voisin_pos = (pos_actuelle[0] + d_lig, pos_actuelle[1] + d_col)
-                            
-                            if 0 <= voisin_pos[0] < nb_lignes and 0 <= voisin_pos[1] < nb_cols:
-                                idx_voisin = voisin_pos[0] * nb_cols + voisin_pos[1]
-                                case_voisin = valeurs[idx_voisin]
-                                
-                                if not case_voisin["mur"] and voisin_pos not in visitee:
-                                    visitee.add(voisin_pos)
-                                    next_dir = dir_nom if distance == 0 else premiere_direction
-                                    queue.append((voisin_pos, distance + 1, next_dir))
-                        
-    return dico_distances
\ No newline at end of file
+    if not plateau.est_sur_plateau(le_plateau, pos):
+        return dico_distances
+
+    nb_cols = le_plateau["nb_colonnes"]
+    moteur = moteur_inondation(le_plateau)
+    voisins = moteur["voisins"]
+    marques = moteur["marques"]
+    moteur["marque"] += 1
+    marque = moteur["marque"]
+    get_couleur, get_objet, get_joueurs = lecteurs_cases(le_plateau)
+
+    cherche_tout = recherche is None
+    cherche_j = cherche_tout or ('J' in recherche)
+    cherche_o = cherche_tout or ('O' in recherche)
+    cherche_c = cherche_tout or ('C' in recherche)
+
+    depart = pos[0] * nb_cols + pos[1]
+    marques[depart] = marque
+    file = deque([(depart, 0, None)])
+    recherche_found = False
+
+    while file and (not arret_premier or not recherche_found):
+        ind, distance, premiere_direction = file.popleft()
+        infos_case = {}
+        trouve_ici = False
+
+        if cherche_j:
+            joueurs_case = get_joueurs(ind)
+            if joueurs_case:
+                infos_case['Joueur'] = joueurs_case
+                if recherche == 'J': trouve_ici = True
+
+        if cherche_o:
+            objet = get_objet(ind)
+            if objet != const.AUCUN and (O_cherche is None or objet == O_cherche):
+                infos_case['Objet'] = objet
+                if recherche == 'O': trouve_ici = True
+
+        if cherche_c:
+            coul = get_couleur(ind)
+            if C_cherche is None:
+                if coul != ' ':
+                    infos_case['Couleur'] = coul
+                    if recherche == 'C': trouve_ici = True
+            elif coul == C_cherche:
+                infos_case['Couleur'] = coul
+                if recherche == 'C': trouve_ici = True
+
+        if recherche == 'A':
+            coul = get_couleur(ind)
+            if coul != C_cherche:
+                infos_case['Couleur'] = coul
+                trouve_ici = True
+
+        if trouve_ici:
+            recherche_found = True
+
+        if infos_case and distance > 0:
+            infos_case['Direction'] = premiere_direction
+            dico_distances[(distance, divmod(ind, nb_cols))] = infos_case
+
+        if distance < distance_max and (not arret_premier or not recherche_found):
+            for ind_voisin, direction in voisins[ind]:
+                if marques[ind_voisin] != marque:
+                    marques[ind_voisin] = marque
+                    file.append((ind_voisin, distance + 1, direction if distance == 0 else premiere_direction))
+
+    return dico_distances
+
+
+def test_couleur(le_plateau, couleur=None):
+    """retourne un test indiquant si la case d'indice donné est de la couleur cherchée
+        (comme recherche='C' et C_cherche=couleur pour Inondation)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        couleur (str, optional): la couleur cherchée, None pour toute case peinte
+
+    Returns:
+        function: le test à utiliser dans les requêtes de inondation_multiple
+    """
+    get_couleur = lecteurs_cases(le_plateau)[0]
+    if couleur is None:
+        return lambda ind: get_couleur(ind) != ' '
+    return lambda ind: get_couleur(ind) == couleur
+
+
+def test_autre_couleur(le_plateau, couleur):
+    """retourne un test indiquant si la case d'indice donné n'est pas de la couleur donnée
+        (comme recherche='A' et C_cherche=couleur pour Inondation)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        couleur (str): la couleur à éviter
+
+    Returns:
+        function: le test à utiliser dans les requêtes de inondation_multiple
+    """
+    get_couleur = lecteurs_cases(le_plateau)[0]
+    return lambda ind: get_couleur(ind) != couleur
+
+
+def test_objet(le_plateau, objet=None):
+    """retourne un test indiquant si la case d'indice donné contient l'objet cherché
+        (comme recherche='O' et O_cherche=objet pour Inondation)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        objet (int, optional): l'objet cherché, None pour n'importe quel objet
+
+    Returns:
+        function: le test à utiliser dans les requêtes de inondation_multiple
+    """
+    get_objet = lecteurs_cases(le_plateau)[1]
+    if objet is None:
+        return lambda ind: get_objet(ind) != const.AUCUN
+    return lambda ind: get_objet(ind) == objet
+
+
+def test_joueur(le_plateau):
+    """retourne un test indiquant si au moins un joueur se trouve sur la case d'indice donné
+        (comme recherche='J' pour Inondation)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+
+    Returns:
+        function: le test à utiliser dans les requêtes de inondation_multiple
+    """
+    get_joueurs = lecteurs_cases(le_plateau)[2]
+    return lambda ind: len(get_joueurs(ind)) > 0
+
+
+def inondation_multiple(le_plateau, pos, requetes):
+    """Inondation unique répondant à plusieurs recherches depuis la même position:
+        pour chaque requête on obtient la première case trouvée, c'est-à-dire celle que
+        retournerait une Inondation avec arret_premier=True et le même filtre.
+        L'exploration s'arrête dès que toutes les requêtes ont trouvé leur case
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        pos (tuple): la position de départ (lig,col)
+        requetes (dict): un dictionnaire {nom: (test, distance_max)} où test est une fonction
+            prenant l'indice d'une case (lig * nb_colonnes + col) et retournant un booléen
+            (voir test_couleur, test_autre_couleur, test_objet et test_joueur)
+
+    Returns:
+        dict: un dictionnaire {nom: (distance, pos, direction)} pour chaque requête ayant trouvé
+            une case. La direction est celle du premier déplacement, None si la case trouvée
+            est celle de départ
+    """
+    resultats = {}
+    if not plateau.est_sur_plateau(le_plateau, pos) or not requetes:
+        return resultats
+
+    nb_cols = le_plateau["nb_colonnes"]
+    moteur = moteur_inondation(le_plateau)
+    voisins = moteur["voisins"]
+    marques = moteur["marques"]
+    moteur["marque"] += 1
+    marque = moteur["marque"]
+
+    restantes = dict(requetes)
+    portee = max(distance_max for _, distance_max in restantes.values())
+    depart = pos[0] * nb_cols + pos[1]
+    marques[depart] = marque
+    file = deque([(depart, 0, None)])
+
+    while file:
+        ind, distance, premiere_direction = file.popleft()
+        if distance > portee:
+            break
+        trouvees = [nom for nom, (test, distance_max) in restantes.items() if distance <= distance_max and test(ind)]
+        if trouvees:
+            for nom in trouvees:
+                resultats[nom] = (distance, divmod(ind, nb_cols), premiere_direction)
+                del restantes[nom]
+            if not restantes:
+                break
+            portee = max(distance_max for _, distance_max in restantes.values())
+
+        if distance < portee:
+            for ind_voisin, direction in voisins[ind]:
+                if marques[ind_voisin] != marque:
+                    marques[ind_voisin] = marque
+                    file.append((ind_voisin, distance + 1, direction if distance == 0 else premiere_direction))
+
+    return resultats
@@ -0,0 +1,272 @@
+"""
+Module de simulation réversible d'un tour de jeu sur le plateau du bot.
+
+Un journal applique des modifications au plateau (plateau classique ou compact) et
+aux joueurs (dictionnaires du module joueur) en mémorisant l'ancienne valeur de
+chaque champ modifié. annuler revient ensuite à une position antérieure du journal
+en ne défaisant que les modifications enregistrées depuis: on peut ainsi explorer
+des suites de tours sans jamais copier le plateau.
+
+jouer_tour applique un tour complet d'un joueur (peinture, déplacement, ramassage
+d'objet, réserve, surface et points) avec les règles de Jeu.executer_actions du serveur.
+"""
+from bot_ia import const
+from bot_ia import inondation
+from bot_ia import plateau
+from bot_ia import plateau_compact
+from bot_ia import rayons
+
+
+def Journal(le_plateau):
+    """Crée un journal vide pour le plateau donné
+
+    Args:
+        le_plateau (dict): le plateau (classique ou compact) sur lequel on simule
+
+    Returns:
+        dict: le journal, contenant les fonctions de lecture et d'écriture des cases
+            (par indice lig * nb_colonnes + col) et la liste des modifications
+    """
+    get_couleur, get_objet, get_joueurs = inondation.lecteurs_cases(le_plateau)
+    journal = {"plateau": le_plateau, "nb_lignes": le_plateau["nb_lignes"],
+               "nb_colonnes": le_plateau["nb_colonnes"], "couleur": get_couleur, "objet": get_objet,
+               "joueurs": get_joueurs, "rayons": plateau.get_rayons(le_plateau), "modifs": []}
+    if plateau_compact.est_compact(le_plateau):
+        murs = le_plateau["murs"]
+        couleurs = le_plateau["couleurs"]
+        objets = le_plateau["objets"]
+        masques = le_plateau["joueurs"]
+
+        def ecrire_couleur(ind, couleur):
+            couleurs[ind] = ord(couleur)
+
+        def ecrire_objet(ind, objet):
+            objets[ind] = objet
+
+        bits = {chr(ord('A') + num): plateau_compact.bit_joueur(chr(ord('A') + num)) for num in range(8)}
+
+        def deplacer(joueur, indices):
+            masques[indices[0]] &= ~bits[joueur]
+            masques[indices[1]] |= bits[joueur]
+
+        journal["mur"] = lambda ind: murs[ind] == 1
+        journal["joueurs"] = lambda ind: plateau_compact.joueurs_du_masque(masques[ind]) if masques[ind] else ()
+    else:
+        valeurs = le_plateau["les_valeurs"]
+
+        def ecrire_couleur(ind, couleur):
+            valeurs[ind]["couleur"] = couleur
+
+        def ecrire_objet(ind, objet):
+            valeurs[ind]["objet"] = objet
+
+        def deplacer(joueur, indices):
+            valeurs[indices[0]]["joueurs_presents"].discard(joueur)
+            valeurs[indices[1]]["joueurs_presents"].add(joueur)
+
+        journal["mur"] = lambda ind: valeurs[ind]["mur"]
+    journal["ecrire_couleur"] = ecrire_couleur
+    journal["ecrire_objet"] = ecrire_objet
+    journal["deplacer"] = deplacer
+    return journal
+
+
+def position(journal):
+    """retourne la position actuelle du journal, à passer à annuler pour revenir à cet état
+
+    Args:
+        journal (dict): le journal
+
+    Returns:
+        int: le nombre de modifications enregistrées
+    """
+    return len(journal["modifs"])
+
+
+def annuler(journal, position_journal=0):
+    """défait les modifications enregistrées depuis la position donnée, en ordre inverse
+
+    Args:
+        journal (dict): le journal
+        position_journal (int, optional): la position à laquelle revenir (0 pour l'état initial)
+    """
+    modifs = journal["modifs"]
+    for _ in range(len(modifs) - position_journal):
+        fonction, cle, valeur = modifs.pop()
+        fonction(cle, valeur)
+
+
+def peindre_case(journal, ind, couleur):
+    """change la couleur de la case d'indice ind"""
+    journal["modifs"].append((journal["ecrire_couleur"], ind, journal["couleur"](ind)))
+    journal["ecrire_couleur"](ind, couleur)
+
+
+def enlever_objet(journal, ind):
+    """enlève l'objet de la case d'indice ind et le retourne"""
+    objet = journal["objet"](ind)
+    if objet != const.AUCUN:
+        journal["modifs"].append((journal["ecrire_objet"], ind, objet))
+        journal["ecrire_objet"](ind, const.AUCUN)
+    return objet
+
+
+def deplacer_joueur(journal, joueur, ind_depart, ind_arrivee):
+    """déplace un joueur d'une case à une autre"""
+    journal["modifs"].append((journal["deplacer"], joueur, (ind_arrivee, ind_depart)))
+    journal["deplacer"](joueur, (ind_depart, ind_arrivee))
+
+
+def modifier_joueur(journal, le_joueur, cle, valeur):
+    """change la valeur d'un champ d'un joueur (voir joueur.Joueur)"""
+    journal["modifs"].append((le_joueur.__setitem__, cle, le_joueur[cle]))
+    le_joueur[cle] = valeur
+
+
+def sauver_joueur(journal, le_joueur):
+    """enregistre tous les champs d'un joueur: ils seront rétablis par annuler et
+        peuvent être modifiés directement jusque là"""
+    journal["modifs"].append((dict.update, le_joueur, dict(le_joueur)))
+
+
+def modifie_reserve(journal, le_joueur, quantite):
+    """ajoute quantite à la réserve du joueur sans dépasser la capacité du réservoir
+        (comme Joueur.modifie_reserve du serveur)"""
+    modifier_joueur(journal, le_joueur, "reserve", min(le_joueur["reserve"] + quantite, const.CAPACITE_RESERVOIR))
+
+
+def peindre(journal, les_joueurs, couleur, pos, direction, reserve, debut, distance_max, transperce=False):
+    """peint dans une direction comme Plateau.peindre du serveur, en mettant à jour
+        la surface des joueurs dont les cases sont repeintes
+
+    Args:
+        journal (dict): le journal
+        les_joueurs (dict): les joueurs indexés par leur couleur
+        couleur (str): la couleur du joueur qui peint
+        pos (tuple): la position du tireur
+        direction (str): la direction du tir ('N', 'E', 'S' ou 'O')
+        reserve (int): la réserve disponible pour ce tir
+        debut (bool): si True la case du tireur est peinte
+        distance_max (int): la portée du tir
+        transperce (bool, optional): si True le tir traverse (et peint) les murs
+
+    Returns:
+        tuple: le coût du tir, la liste des joueurs touchés, le nombre de cases gagnées
+            et le nombre de cases reprises à une autre couleur
+    """
+    get_couleur = journal["couleur"]
+    get_joueurs = journal["joueurs"]
+    ecrire_couleur = journal["ecrire_couleur"]
+    modifs = journal["modifs"]
+    couts = ' ' + couleur
+    cout_peinture = 0
+    touches = []
+    gagnees = 0
+    reprises = 0
+    for ind in rayons.rayon(journal["rayons"], pos, direction, distance_max, debut, transperce):
+        coul = get_couleur(ind)
+        cout = 1 if coul in couts else 2
+        if cout_peinture + cout > reserve:
+            break
+        if coul != couleur:
+            gagnees += 1
+            if coul != ' ':
+                reprises += 1
+                if coul in les_joueurs:
+                    modifier_joueur(journal, les_joueurs[coul], "surface", les_joueurs[coul]["surface"] - 1)
+            modifs.append((ecrire_couleur, ind, coul))
+            ecrire_couleur(ind, couleur)
+        cout_peinture += cout
+        touches.extend(get_joueurs(ind))
+    if gagnees:
+        modifier_joueur(journal, les_joueurs[couleur], "surface", les_joueurs[couleur]["surface"] + gagnees)
+    return cout_peinture, touches, gagnees, reprises
+
+
+def jouer_tour(journal, les_joueurs, couleur, action, carac_jeu):
+    """applique l'action d'un joueur (peinture puis déplacement) avec les règles de
+        Jeu.executer_actions du serveur puis ajoute sa surface à ses points
+
+    Args:
+        journal (dict): le journal
+        les_joueurs (dict): les joueurs indexés par leur couleur
+        couleur (str): la couleur du joueur qui joue
+        action (str): deux caractères, la direction de peinture ('X' pour ne pas peindre)
+            et la direction de déplacement
+        carac_jeu (dict): les caractéristiques du jeu
+
+    Returns:
+        dict: le bilan du tour: coût de la peinture ("cout"), joueurs touchés ("touches"),
+            cases gagnées ("gagnees") et reprises à une autre couleur ("reprises")
+    """
+    le_joueur = les_joueurs[couleur]
+    sauver_joueur(journal, le_joueur)
+    bilan = {"cout": 0, "touches": [], "gagnees": 0, "reprises": 0}
+    if len(action) != 2:
+        le_joueur["reserve"] = min(le_joueur["reserve"] + 2 * carac_jeu["penalite"], const.CAPACITE_RESERVOIR)
+        return bilan
+    # le joueur étant sauvegardé, ses champs sont modifiés directement
+    reserve = le_joueur["reserve"]
+    peinture, deplacement = action
+    pos = le_joueur["position"]
+    if peinture not in 'XNSOE':
+        reserve += carac_jeu["penalite"]
+    elif peinture != 'X':
+        distance_max = carac_jeu["distance_max"]
+        if le_joueur["objet"] == const.BOMBE:
+            # comme sur le serveur la peinture de la bombe n'est pas retirée de la réserve
+            reserve_bombe = reserve
+            ind_dir = 'NESO'.index(peinture)
+            for num in range(4):
+                cout, touches, gagnees, reprises = peindre(journal, les_joueurs, couleur, pos,
+                                                           'NESO'[(ind_dir + num) % 4], reserve_bombe, num == 0,
+                                                           distance_max)
+                reserve_bombe -= cout
+                bilan["cout"] += cout
+                bilan["touches"].extend(touches)
+                bilan["gagnees"] += gagnees
+                bilan["reprises"] += reprises
+        else:
+            cout, touches, gagnees, reprises = peindre(journal, les_joueurs, couleur, pos, peinture,
+                                                       reserve, True, distance_max,
+                                                       le_joueur["objet"] == const.PISTOLET)
+            reserve -= cout
+            bilan.update(cout=cout, touches=touches, gagnees=gagnees, reprises=reprises)
+        for coul_j in bilan["touches"]:
+            if coul_j != couleur and coul_j in les_joueurs:
+                joueur_touche = les_joueurs[coul_j]
+                if joueur_touche["objet"] != const.BOUCLIER:
+                    vol = min(carac_jeu["bonus_touche"], max(joueur_touche["reserve"], 0))
+                    reserve = min(reserve + vol, const.CAPACITE_RESERVOIR)
+                    modifie_reserve(journal, joueur_touche, -vol)
+
+    nb_colonnes = journal["nb_colonnes"]
+    d_lig, d_col = plateau.INC_DIRECTION.get(deplacement, (0, 0))
+    lig, col = pos[0] + d_lig, pos[1] + d_col
+    ind = lig * nb_colonnes + col
+    if deplacement not in "NESO" or not (0 <= lig < journal["nb_lignes"] and 0 <= col < nb_colonnes) \
+            or journal["mur"](ind):
+        reserve += carac_jeu["penalite"]
+    else:
+        deplacer_joueur(journal, couleur, pos[0] * nb_colonnes + pos[1], ind)
+        le_joueur["position"] = (lig, col)
+        # comme sur le serveur arriver sur une case vide ou adverse coûte une pénalité
+        if journal["couleur"](ind) == couleur:
+            reserve = min(reserve + carac_jeu["bonus_recharge"], const.CAPACITE_RESERVOIR)
+        else:
+            reserve += carac_jeu["penalite"]
+        objet = enlever_objet(journal, ind)
+        if objet != const.AUCUN:
+            if objet == const.BIDON:
+                reserve = const.CAPACITE_RESERVOIR
+            else:
+                le_joueur["objet"] = objet
+                le_joueur["duree_objet"] = carac_jeu["duree_obj"]
+            reserve = min(reserve + carac_jeu["bonus_objet"], const.CAPACITE_RESERVOIR)
+    le_joueur["reserve"] = reserve
+    if le_joueur["objet"] != const.AUCUN:
+        le_joueur["duree_objet"] -= 1
+        if le_joueur["duree_objet"] == 0:
+            le_joueur["objet"] = const.AUCUN
+    le_joueur["points"] += le_joueur["surface"]
+    return bilan
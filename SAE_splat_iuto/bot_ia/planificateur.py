@@ -0,0 +1,164 @@
+"""
+Planificateur « anytime » pour le bot.
+
+On cherche la meilleure suite d'actions (direction de peinture × déplacement) sur
+quelques tours en simulant nos propres actions avec les règles du serveur, les
+adversaires étant supposés immobiles. La recherche est relancée avec une profondeur
+augmentée de un tant que le budget de temps n'est pas épuisé: on retourne la première
+action de la meilleure suite trouvée par la dernière recherche terminée, ce qui permet
+de répondre à temps quel que soit le budget.
+
+Chaque tour est appliqué au plateau et aux joueurs reçus avec un journal (voir
+journal.py) puis défait avant d'essayer l'action suivante: le plateau n'est jamais
+copié et il est rendu intact à la fin de la recherche.
+
+Exemple: python -m serveur.simulation --ia bot_ia.client_joueur:mon_IA_planifiee --ia bot_ia.client_joueur
+"""
+import time
+from collections import deque
+
+from bot_ia import inondation
+from bot_ia import journal
+
+PEINTURES = ['X', 'N', 'E', 'S', 'O']
+DEPLACEMENTS = ['N', 'E', 'S', 'O']
+
+# temps de réflexion par tour en secondes (doit rester inférieur au délai du serveur)
+BUDGET = 0.1
+PROFONDEUR_MAX = 6
+# valeur d'une unité de réserve en fin de suite et d'une case reprise à un adversaire
+COEF_RESERVE = 0.5
+COEF_ADVERSAIRE = 0.5
+# pénalité par case de distance entre la fin de la suite et la plus proche case à peindre
+COEF_ELOIGNEMENT = 1
+
+
+def distances_a_peindre(le_plateau, le_journal, ma_couleur):
+    """calcule pour chaque case la distance à la plus proche case accessible qui n'est
+        pas de notre couleur (parcours en largeur partant de toutes ces cases à la fois)
+
+    Args:
+        le_plateau (dict): le plateau considéré
+        le_journal (dict): le journal du plateau (pour ses fonctions de lecture)
+        ma_couleur (str): la couleur de notre joueur
+
+    Returns:
+        list: la distance de chaque case (par indice), None pour les cases non atteintes
+    """
+    voisins = inondation.moteur_inondation(le_plateau)["voisins"]
+    res = [None] * len(voisins)
+    file = deque()
+    for ind in range(len(voisins)):
+        if not le_journal["mur"](ind) and le_journal["couleur"](ind) != ma_couleur:
+            res[ind] = 0
+            file.append(ind)
+    while file:
+        ind = file.popleft()
+        for ind_voisin, _ in voisins[ind]:
+            if res[ind_voisin] is None:
+                res[ind_voisin] = res[ind] + 1
+                file.append(ind_voisin)
+    return res
+
+
+def valeur_finale(recherche):
+    """valeur donnée à l'état atteint en fin de suite (en plus des points accumulés):
+        la réserve restante et l'éloignement des cases à peindre"""
+    moi = recherche["joueurs"][recherche["couleur"]]
+    valeur = COEF_RESERVE * moi["reserve"]
+    pos = moi["position"]
+    eloignement = recherche["a_peindre"][pos[0] * recherche["journal"]["nb_colonnes"] + pos[1]]
+    if eloignement is not None:
+        valeur -= COEF_ELOIGNEMENT * eloignement
+    return valeur
+
+
+def explorer(recherche, profondeur):
+    """parcours en profondeur des suites d'actions à partir de l'état courant du plateau
+        et des joueurs, qui est rétabli avant de retourner
+
+    Args:
+        recherche (dict): les paramètres de la recherche (journal, couleur, caractéristiques,
+            joueurs, distances aux cases à peindre, directions ouvertes de chaque case et
+            heure limite). recherche["interrompue"]
+            passe à True si le temps est écoulé
+        profondeur (int): le nombre de tours restant à simuler
+
+    Returns:
+        tuple: la valeur de la meilleure suite et sa première action (None si profondeur vaut 0)
+    """
+    if profondeur == 0:
+        return valeur_finale(recherche), None
+    if time.perf_counter() > recherche["limite"]:
+        recherche["interrompue"] = True
+        return 0, None
+    le_journal = recherche["journal"]
+    moi = recherche["joueurs"][recherche["couleur"]]
+    pos = moi["position"]
+    ouvertes = recherche["ouvertes"][pos[0] * le_journal["nb_colonnes"] + pos[1]]
+    meilleure_valeur = None
+    meilleure_action = None
+    for peinture in PEINTURES:
+        bloque_essaye = False
+        for deplacement in DEPLACEMENTS:
+            if deplacement not in ouvertes:
+                # tous les déplacements vers un mur mènent au même état
+                if bloque_essaye:
+                    continue
+                bloque_essaye = True
+            position = journal.position(le_journal)
+            points = moi["points"]
+            bilan = journal.jouer_tour(le_journal, recherche["joueurs"], recherche["couleur"],
+                                       peinture + deplacement, recherche["carac_jeu"])
+            if peinture != 'X' and bilan["cout"] == 0 and not bilan["touches"]:
+                # cette peinture ne fait rien: elle équivaut à 'X'
+                journal.annuler(le_journal, position)
+                break
+            # chaque case gagnée rapporte un point par tour restant
+            valeur = moi["points"] - points + COEF_ADVERSAIRE * bilan["reprises"] * profondeur
+            valeur_suite, _ = explorer(recherche, profondeur - 1)
+            journal.annuler(le_journal, position)
+            if recherche["interrompue"]:
+                return 0, None
+            valeur += valeur_suite
+            if meilleure_valeur is None or valeur > meilleure_valeur:
+                meilleure_valeur = valeur
+                meilleure_action = peinture + deplacement
+    return meilleure_valeur, meilleure_action
+
+
+def planifier(ma_couleur, carac_jeu, le_plateau, les_joueurs, budget=None):
+    """cherche par approfondissement itératif la meilleure action dans le temps imparti
+
+    Args:
+        ma_couleur (str): la couleur de notre joueur
+        carac_jeu (dict): les caractéristiques du jeu
+        le_plateau (dict): le plateau actuel
+        les_joueurs (dict): les joueurs indexés par leur couleur
+        budget (float, optional): le temps de réflexion en secondes (par défaut BUDGET)
+
+    Returns:
+        tuple: l'action (chaine de deux caractères) de la meilleure suite trouvée, ou None,
+            et la profondeur de la dernière recherche terminée
+    """
+    if budget is None:
+        budget = BUDGET
+    limite = time.perf_counter() + budget
+    le_journal = journal.Journal(le_plateau)
+    recherche = {"journal": le_journal, "couleur": ma_couleur, "carac_jeu": carac_jeu, "joueurs": les_joueurs,
+                 "a_peindre": distances_a_peindre(le_plateau, le_journal, ma_couleur),
+                 "ouvertes": [{direction for _, direction in voisins_case}
+                              for voisins_case in inondation.moteur_inondation(le_plateau)["voisins"]],
+                 "limite": limite,
+                 "interrompue": False}
+    profondeur_max = min(PROFONDEUR_MAX, max(1, carac_jeu["duree_totale"] - carac_jeu["duree_actuelle"]))
+    meilleure_action = None
+    profondeur_atteinte = 0
+    for profondeur in range(1, profondeur_max + 1):
+        _, action = explorer(recherche, profondeur)
+        if recherche["interrompue"]:
+            break
+        meilleure_action = action
+        profondeur_atteinte = profondeur
+    return meilleure_action, profondeur_atteinte
+
@@ -19,6 +19,7 @@ module de gestion du plateau de jeu
 """
 from bot_ia import const
 from bot_ia import case
+from bot_ia import rayons
 
 # dictionnaire permettant d'associer une direction et la position relative
 # de la case qui se trouve dans cette direction
@@ -30,6 +31,10 @@ INC_DIRECTION = {
     'X': (0, 0)
     }
 
+# clés des tables calculées à partir des murs et conservées dans le plateau
+# (voir rayons.py, inondation.py, distances.py, evaluation.py et exposition.py)
+CACHES_MURS = ("rayons", "inondation", "distances", "evaluation", "exposition")
+
 
 def get_nb_lignes(plateau):
     """retourne le nombre de lignes du plateau
@@ -67,6 +72,25 @@ def get_case(plateau, pos):
     """
     return plateau["les_valeurs"][pos[0] * plateau['nb_colonnes'] + pos[1]]
 
+def get_rayons(plateau):
+    """retourne la table des rayons de peinture du plateau (voir rayons.py), calculée
+        une seule fois par carte et conservée dans le plateau (clé "rayons")
+
+    Args:
+        plateau (dict): le plateau considéré
+
+    Returns:
+        dict: la table des rayons
+    """
+    if "rayons" not in plateau:
+        if "murs" in plateau:
+            murs = [mur == 1 for mur in plateau["murs"]]
+        else:
+            murs = [la_case["mur"] for la_case in plateau["les_valeurs"]]
+        plateau["rayons"] = rayons.calculer_rayons(plateau["nb_lignes"], plateau["nb_colonnes"], murs)
+    return plateau["rayons"]
+
+
 def poser_joueur(plateau, joueur, pos):
     """pose un joueur en position pos sur le plateau
 
@@ -88,6 +112,47 @@ def poser_objet(plateau, objet, pos):
     """
     case.poser_objet(get_case(plateau, pos), objet)
 
+def joueurs_objets_from_lignes(les_lignes, ind):
+    """Lit la partie d'une description de plateau qui donne la position des joueurs
+        puis celle des objets (voir sujet)
+
+    Args:
+        les_lignes (list): les lignes de la chaine décrivant le plateau
+        ind (int): l'indice de la ligne contenant le nombre de joueurs
+
+    Returns:
+        tuple: un dictionnaire {joueur: position} et un dictionnaire {position: objet}
+    """
+    pos_joueurs = {}
+    nb_joueurs = int(les_lignes[ind])
+    for ind in range(ind+1, ind+nb_joueurs+1):
+        numj, lignej, colj = les_lignes[ind].split(";")
+        pos_joueurs[numj] = (int(lignej), int(colj))
+    ind += 1
+    pos_objets = {}
+    nb_objets = int(les_lignes[ind])
+    for ind in range(ind+1, ind+nb_objets+1):
+        numo, ligneo, colo = les_lignes[ind].split(";")
+        pos_objets[(int(ligneo), int(colo))] = int(numo)
+    return pos_joueurs, pos_objets
+
+
+def memoriser_etat(plateau, les_lignes, pos_joueurs, pos_objets):
+    """Mémorise dans le plateau la description à partir de laquelle il a été construit
+        afin de pouvoir le mettre à jour incrémentalement avec maj_plateau
+
+    Args:
+        plateau (dict): le plateau considéré
+        les_lignes (list): les lignes de la chaine décrivant le plateau
+        pos_joueurs (dict): un dictionnaire {joueur: position}
+        pos_objets (dict): un dictionnaire {position: objet}
+    """
+    plateau["lignes"] = les_lignes[1:plateau["nb_lignes"]+1]
+    plateau["pos_joueurs"] = pos_joueurs
+    plateau["pos_objets"] = pos_objets
+    plateau["cases_modifiees"] = None
+
+
 def plateau_from_str(la_chaine):
     """Construit un plateau à partir d'une chaine de caractère contenant les informations
         sur le contenu du plateau (voir sujet)
@@ -114,16 +179,12 @@ def plateau_from_str(la_chaine):
                 plateau["les_valeurs"].append(case.Case(True, car.upper()))
             else:
                 plateau["les_valeurs"].append(case.Case(False, car))
-    ind += 1
-    nb_joueurs = int(les_lignes[ind])
-    for ind in range(ind+1, ind+nb_joueurs+1):
-        numj, lignej, colj = les_lignes[ind].split(";")
-        poser_joueur(plateau, numj, (int(lignej), int(colj)))
-    ind += 1
-    nb_objets = int(les_lignes[ind])
-    for ind in range(ind+1, ind+nb_objets+1):
-        numo, ligneo, colo = les_lignes[ind].split(";")
-        poser_objet(plateau, int(numo), (int(ligneo), int(colo)))
+    pos_joueurs, pos_objets = joueurs_objets_from_lignes(les_lignes, nb_lig+1)
+    for numj, pos in pos_joueurs.items():
+        poser_joueur(plateau, numj, pos)
+    for pos, numo in pos_objets.items():
+        poser_objet(plateau, numo, pos)
+    memoriser_etat(plateau, les_lignes, pos_joueurs, pos_objets)
     return plateau
 
 
@@ -152,8 +213,91 @@ def set_case(plateau, pos, une_case):
         une_case (dict): la nouvelle case
     """
     plateau["les_valeurs"][pos[0] * plateau['nb_colonnes'] + pos[1]] = une_case
+    # les murs ont pu changer: les tables qui en dépendent sont à recalculer
+    for cle in CACHES_MURS:
+        plateau.pop(cle, None)
 
 
+def maj_plateau(plateau, la_chaine):
+    """Met à jour un plateau construit par plateau_from_str (ou par plateau_compact)
+        avec la description du nouvel état du jeu en ne modifiant que les cases qui
+        ont changé (couleur, joueurs présents, objet). Les positions des cases modifiées
+        sont ensuite disponibles avec get_cases_modifiees
+
+    Args:
+        plateau (dict): le plateau à mettre à jour
+        la_chaine (str): la chaine de caractères décrivant le nouvel état du plateau
+
+    Returns:
+        set: l'ensemble des positions (lig,col) des cases modifiées ou None si le plateau
+            ne peut pas être mis à jour (dimensions différentes), il faut alors le reconstruire
+    """
+    les_lignes = la_chaine.split("\n")
+    nb_lig, nb_col = les_lignes[0].split(";")
+    nb_lig = int(nb_lig)
+    nb_col = int(nb_col)
+    if "lignes" not in plateau or nb_lig != plateau["nb_lignes"] or nb_col != plateau["nb_colonnes"]:
+        return None
+    modifiees = set()
+    anciennes_lignes = plateau["lignes"]
+    for lig in range(nb_lig):
+        ligne = les_lignes[lig+1]
+        ancienne = anciennes_lignes[lig]
+        if ligne == ancienne:
+            continue
+        for col in range(nb_col):
+            car = ligne[col]
+            if car == ancienne[col]:
+                continue
+            pos = (lig, col)
+            modifiees.add(pos)
+            mur = car == '#' or car.islower()
+            couleur = ' ' if car == '#' else car.upper()
+            la_case = get_case(plateau, pos)
+            if mur != case.est_mur(la_case):
+                set_case(plateau, pos, case.Case(mur, couleur, case.get_objet(la_case),
+                                                 set(case.get_joueurs(la_case))))
+            elif couleur == ' ':
+                case.laver(la_case)
+            else:
+                case.peindre(la_case, couleur)
+        anciennes_lignes[lig] = ligne
+    pos_joueurs, pos_objets = joueurs_objets_from_lignes(les_lignes, nb_lig+1)
+    anciens_joueurs = plateau["pos_joueurs"]
+    for numj, pos in anciens_joueurs.items():
+        if pos_joueurs.get(numj) != pos:
+            enlever_joueur(plateau, numj, pos)
+            modifiees.add(pos)
+    for numj, pos in pos_joueurs.items():
+        if anciens_joueurs.get(numj) != pos:
+            poser_joueur(plateau, numj, pos)
+            modifiees.add(pos)
+    anciens_objets = plateau["pos_objets"]
+    for pos in anciens_objets:
+        if pos not in pos_objets:
+            prendre_objet(plateau, pos)
+            modifiees.add(pos)
+    for pos, numo in pos_objets.items():
+        if anciens_objets.get(pos) != numo:
+            poser_objet(plateau, numo, pos)
+            modifiees.add(pos)
+    plateau["pos_joueurs"] = pos_joueurs
+    plateau["pos_objets"] = pos_objets
+    plateau["cases_modifiees"] = modifiees
+    return modifiees
+
+
+def get_cases_modifiees(plateau):
+    """retourne les positions des cases modifiées lors du dernier appel à maj_plateau
+
+    Args:
+        plateau (dict): le plateau considéré
+
+    Returns:
+        set: l'ensemble des positions (lig,col) des cases qui ont changé depuis l'état
+            précédent ou None si le plateau vient d'être construit (toutes les cases sont nouvelles)
+    """
+    return plateau.get("cases_modifiees")
 
 
 def enlever_joueur(plateau, joueur, pos):
@@ -262,26 +406,11 @@ def peindre(plateau, pos, direction, couleur, reserve, distance_max, peindre_mur
     """
     res = {"cout": 0, "nb_repeintes": 0,
            "nb_murs_repeints": 0, "joueurs_touches": set()}
-    if direction == 'N':
-        inc = (-1, 0)
-    elif direction == 'S':
-        inc = (1, 0)
-    elif direction == 'O':
-        inc = (0, -1)
-    elif direction == 'E':
-        inc = (0, 1)
-    else:
+    if direction not in rayons.NUM_DIRECTION:
         return res
-    pos_actuelle = pos
-
-    distance = 0
-    while 0 <= pos_actuelle[0] < plateau["nb_lignes"] and\
-            0 <= pos_actuelle[1] < plateau["nb_colonnes"] and\
-            distance < distance_max:
-        distance += 1
-        la_case = get_case(plateau, pos_actuelle)
-        if case.est_mur(la_case) and not peindre_murs:
-            return res
+    les_valeurs = plateau["les_valeurs"]
+    for ind in rayons.rayon(get_rayons(plateau), pos, direction, distance_max, transperce=peindre_murs):
+        la_case = les_valeurs[ind]
         coul_case = case.get_couleur(la_case)
         change_coul = 0
         if coul_case == couleur:
@@ -300,7 +429,6 @@ def peindre(plateau, pos, direction, couleur, reserve, distance_max, peindre_mur
             res["nb_murs_repeints"] += change_coul
         res["cout"] += cout
         res["joueurs_touches"] = res["joueurs_touches"].union(nouv_touches)
-        pos_actuelle = (pos_actuelle[0]+inc[0], pos_actuelle[1]+inc[1])
     return res
 
 
@@ -330,6 +458,19 @@ def surfaces_peintes(plateau, nb_joueurs):
             valeurs le nombre de cases peintes par le joueur
     """
     dico = {}
+    if "murs" in plateau:
+        # plateau compact: on compte directement les octets des tableaux
+        couleurs = plateau["couleurs"]
+        for num in range(ord('A'), ord('Z')+1):
+            nb = couleurs.count(num)
+            if nb > 0:
+                dico[chr(num)] = nb
+        if len(dico) < nb_joueurs:
+            for masque in set(plateau["joueurs"]):
+                for num in range(8):
+                    if masque & (1 << num) and chr(ord('A') + num) not in dico:
+                        dico[chr(ord('A') + num)] = 0
+        return dico
     for caseActuelle in plateau['les_valeurs']:
         if case.get_couleur(caseActuelle) != ' ':
             dico[case.get_couleur(caseActuelle)] = dico.get(case.get_couleur(caseActuelle), 0) + 1
@@ -359,6 +500,17 @@ def directions_possibles(plateau,pos):
     dico = dict()
     l, c = pos
 
+    if "murs" in plateau:
+        # plateau compact (voir plateau_compact.py): lecture directe des tableaux
+        nb_lignes, nb_colonnes = plateau["nb_lignes"], plateau["nb_colonnes"]
+        murs, couleurs = plateau["murs"], plateau["couleurs"]
+        for dicti, (nl, nc) in INC_DIRECTION.items():
+            if dicti != 'X' and 0 <= l + nl < nb_lignes and 0 <= c + nc < nb_colonnes:
+                ind = (l + nl) * nb_colonnes + c + nc
+                if not murs[ind]:
+                    dico[dicti] = chr(couleurs[ind])
+        return dico
+
     for dicti, (nl, nc) in INC_DIRECTION.items():
         if dicti == 'X': #On retire X des possibilité
             continue
@@ -384,17 +536,20 @@ def nb_joueurs_direction(plateau, pos, direction, distance_max):
     Returns:
         int: le nombre de joueurs à portée de peinture (ou qui risque de nous peindre)
     """
-    nb_joueurs_portee = 0
-
-    nb_joueurs_portee += case.get_nb_joueurs(get_case(plateau, pos))
-
-    NvPos = (pos[0] + INC_DIRECTION[direction][0], pos[1] + INC_DIRECTION[direction][1])
-    i = 0
-    while i < distance_max and est_sur_plateau(plateau, NvPos) and case.est_mur(get_case(plateau, NvPos))==False and direction is not 'X':
-            case_actuelle = get_case(plateau, NvPos)
-            nb_joueurs_portee += case.get_nb_joueurs(case_actuelle)
-            NvPos = (NvPos[0] + INC_DIRECTION[direction][0], NvPos[1] + INC_DIRECTION[direction][1])
-            i += 1
+    if "murs" in plateau:
+        # plateau compact: on compte les bits des masques de joueurs
+        joueurs = plateau["joueurs"]
+        nb_joueurs_portee = bin(joueurs[pos[0] * plateau["nb_colonnes"] + pos[1]]).count('1')
+        if direction in rayons.NUM_DIRECTION:
+            for ind in rayons.rayon(get_rayons(plateau), pos, direction, distance_max, debut=False):
+                nb_joueurs_portee += bin(joueurs[ind]).count('1')
+        return nb_joueurs_portee
+    nb_joueurs_portee = case.get_nb_joueurs(get_case(plateau, pos))
+    if direction not in rayons.NUM_DIRECTION:
+        return nb_joueurs_portee
+    les_valeurs = plateau["les_valeurs"]
+    for ind in rayons.rayon(get_rayons(plateau), pos, direction, distance_max, debut=False):
+        nb_joueurs_portee += case.get_nb_joueurs(les_valeurs[ind])
     return nb_joueurs_portee
     
 
@@ -418,6 +573,8 @@ def distances_objets_joueurs(plateau, pos, distance_max):
     if not est_sur_plateau(plateau, pos):
         return dico_distances
 
+    # plateau compact: les objets et les joueurs sont lus directement dans les tableaux
+    compact = "murs" in plateau
     visitee = set()
     queue = [(pos, 0)]
     visitee.add(pos)
@@ -429,12 +586,18 @@ def distances_objets_joueurs(plateau, pos, distance_max):
         
         # Si on ne dépasse pas la distance max
         if distance <= distance_max:
-            # Récupérer la case actuelle
-            la_case = get_case(plateau, pos_actuelle)
-            
-            # Enregistrer les joueurs et objets
-            objet = case.get_objet(la_case)
-            joueurs = case.get_joueurs(la_case)
+            if compact:
+                ind = pos_actuelle[0] * plateau["nb_colonnes"] + pos_actuelle[1]
+                objet = plateau["objets"][ind]
+                masque = plateau["joueurs"][ind]
+                joueurs = [chr(ord('A') + num) for num in range(8) if masque & (1 << num)] if masque else ()
+            else:
+                # Récupérer la case actuelle
+                la_case = get_case(plateau, pos_actuelle)
+
+                # Enregistrer les joueurs et objets
+                objet = case.get_objet(la_case)
+                joueurs = case.get_joueurs(la_case)
             
             if objet != const.AUCUN or len(joueurs) > 0:
                 if distance not in dico_distances:
@@ -0,0 +1,349 @@
+"""
+Projet Splat'IUT'O
+
+Licence pédagogique — usage académique uniquement
+Copyright (c) 2026 Limet Sébastien / IUT'O, Université d'Orléans
+
+Ce code est fourni exclusivement dans un cadre pédagogique.
+Les étudiants sont autorisés à l’utiliser et le modifier uniquement
+pour les besoins du projet évalué dans le cadre de la SAE1.02 du BUT Informatique d'Orléans.
+
+Toute diffusion, publication ou réutilisation en dehors de ce cadre,
+notamment sur des plateformes publiques, est interdite sans
+autorisation écrite préalable de l’auteur.
+
+Tous droits réservés.
+
+Module de gestion d'un plateau compact.
+
+Le plateau compact stocke les murs, les couleurs, les objets et les joueurs présents
+dans des tableaux d'octets (bytearray) indexés par lig * nb_colonnes + col au lieu
+de construire un dictionnaire et un ensemble par case.
+La clé "les_valeurs" donne une vue sur ces tableaux qui se comporte comme la liste
+de cases du plateau classique: toutes les fonctions des modules plateau et case
+s'utilisent donc sans modification sur un plateau compact. Les vues des cases ne
+contiennent que leur indice: elles sont créées à chaque lecture et ne sont pas
+conservées par le plateau. Les fonctions les plus appelées (plateau.directions_possibles,
+plateau.nb_joueurs_direction, plateau.distances_objets_joueurs, plateau.surfaces_peintes,
+inondation.lecteurs_cases) lisent directement les tableaux.
+"""
+from collections.abc import MutableMapping, MutableSet, Sequence
+
+from bot_ia import plateau as plateau_dict
+
+# tables de traduction d'une ligne du plan vers les tableaux murs et couleurs
+TRAD_MURS = bytes(1 if car == ord('#') or ord('a') <= car <= ord('z') else 0 for car in range(256))
+TRAD_COULEURS = bytes(ord(' ') if car == ord('#') else
+                      car - 32 if ord('a') <= car <= ord('z') else car for car in range(256))
+
+CLES_CASE = ("mur", "couleur", "objet", "joueurs_presents")
+
+
+def bit_joueur(joueur):
+    """retourne le bit représentant un joueur dans le masque des joueurs présents
+
+    Args:
+        joueur (str): la lettre représentant le joueur ('A' à 'H')
+
+    Returns:
+        int: le masque ne contenant que ce joueur
+    """
+    return 1 << (ord(joueur) - ord('A'))
+
+
+def joueurs_du_masque(masque):
+    """retourne la liste des joueurs contenus dans un masque
+
+    Args:
+        masque (int): un masque de joueurs (bit i pour la lettre chr(ord('A')+i))
+
+    Returns:
+        list: la liste des lettres des joueurs présents dans le masque
+    """
+    res = []
+    num = 0
+    while masque:
+        if masque & 1:
+            res.append(chr(ord('A') + num))
+        masque >>= 1
+        num += 1
+    return res
+
+
+# ensemble (non modifiable) des joueurs de chaque masque
+ENSEMBLES_JOUEURS = tuple(frozenset(joueurs_du_masque(masque)) for masque in range(256))
+
+
+class JoueursCompacts(MutableSet):
+    """Vue ensembliste sur les joueurs présents sur une case d'un plateau compact"""
+
+    def __init__(self, plateau, indice):
+        self.joueurs = plateau["joueurs"]
+        self.indice = indice
+
+    def __contains__(self, joueur):
+        return isinstance(joueur, str) and len(joueur) == 1 and \
+            'A' <= joueur <= 'H' and self.joueurs[self.indice] & bit_joueur(joueur) != 0
+
+    def __iter__(self):
+        return iter(joueurs_du_masque(self.joueurs[self.indice]))
+
+    def __len__(self):
+        return bin(self.joueurs[self.indice]).count('1')
+
+    def __repr__(self):
+        return repr(set(self))
+
+    def add(self, joueur):
+        self.joueurs[self.indice] |= bit_joueur(joueur)
+
+    def discard(self, joueur):
+        if joueur in self:
+            self.joueurs[self.indice] &= ~bit_joueur(joueur) & 0xFF
+
+
+class CaseCompacte(MutableMapping):
+    """Vue d'une case d'un plateau compact avec les clés d'une case (voir case.py)"""
+
+    def __init__(self, plateau, indice):
+        self.plateau = plateau
+        self.indice = indice
+
+    def __getitem__(self, cle):
+        if cle == "mur":
+            return self.plateau["murs"][self.indice] == 1
+        if cle == "couleur":
+            return chr(self.plateau["couleurs"][self.indice])
+        if cle == "objet":
+            return self.plateau["objets"][self.indice]
+        if cle == "joueurs_presents":
+            return JoueursCompacts(self.plateau, self.indice)
+        raise KeyError(cle)
+
+    def __setitem__(self, cle, valeur):
+        if cle == "mur":
+            self.plateau["murs"][self.indice] = 1 if valeur else 0
+        elif cle == "couleur":
+            self.plateau["couleurs"][self.indice] = ord(valeur)
+        elif cle == "objet":
+            self.plateau["objets"][self.indice] = valeur
+        elif cle == "joueurs_presents":
+            masque = 0
+            for joueur in valeur:
+                masque |= bit_joueur(joueur)
+            self.plateau["joueurs"][self.indice] = masque
+        else:
+            raise KeyError(cle)
+
+    def __delitem__(self, cle):
+        raise KeyError("impossible de supprimer la clé " + str(cle) + " d'une case")
+
+    def __iter__(self):
+        return iter(CLES_CASE)
+
+    def __len__(self):
+        return len(CLES_CASE)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ValeursCompactes(Sequence):
+    """Vue sur l'ensemble des cases d'un plateau compact (remplace la liste les_valeurs)"""
+
+    def __init__(self, plateau):
+        self.plateau = plateau
+
+    def __len__(self):
+        return len(self.plateau["murs"])
+
+    def __getitem__(self, indice):
+        if not 0 <= indice < len(self.plateau["murs"]):
+            raise IndexError("indice de case hors du plateau")
+        return CaseCompacte(self.plateau, indice)
+
+    def __setitem__(self, indice, une_case):
+        self[indice].update(une_case)
+
+    def __iter__(self):
+        for indice in range(len(self.plateau["murs"])):
+            yield CaseCompacte(self.plateau, indice)
+
+
+def est_compact(plateau):
+    """indique si le plateau est un plateau compact
+
+    Args:
+        plateau (dict): le plateau considéré
+
+    Returns:
+        bool: True si le plateau est stocké sous forme de tableaux, False sinon
+    """
+    return "murs" in plateau
+
+
+def indice(plateau, pos):
+    """retourne l'indice dans les tableaux du plateau de la case en position pos
+
+    Args:
+        plateau (dict): le plateau considéré
+        pos (tuple): une paire (lig,col) de deux int
+
+    Returns:
+        int: l'indice lig * nb_colonnes + col
+    """
+    return pos[0] * plateau["nb_colonnes"] + pos[1]
+
+
+def plateau_vide(nb_lignes, nb_colonnes):
+    """Crée un plateau compact sans mur, sans peinture, sans objet ni joueur
+
+    Args:
+        nb_lignes (int): le nombre de lignes du plateau
+        nb_colonnes (int): le nombre de colonnes du plateau
+
+    Returns:
+        dict: le plateau compact
+    """
+    nb_cases = nb_lignes * nb_colonnes
+    plateau = {"nb_lignes": nb_lignes, "nb_colonnes": nb_colonnes,
+               "murs": bytearray(nb_cases),
+               "couleurs": bytearray(b' ' * nb_cases),
+               "objets": bytearray(nb_cases),
+               "joueurs": bytearray(nb_cases)}
+    plateau["les_valeurs"] = ValeursCompactes(plateau)
+    return plateau
+
+
+def plateau_from_str(la_chaine):
+    """Construit un plateau compact à partir d'une chaine de caractère contenant
+        les informations sur le contenu du plateau (même format que plateau.plateau_from_str)
+
+    Args:
+        la_chaine (str): la chaine de caractères décrivant le plateau
+
+    Returns:
+        dict: le plateau compact correspondant à la chaine
+    """
+    les_lignes = la_chaine.split("\n")
+    nb_lig, nb_col = les_lignes[0].split(";")
+    nb_lig = int(nb_lig)
+    nb_col = int(nb_col)
+    plateau = plateau_vide(nb_lig, nb_col)
+    grille = "".join(les_lignes[1:nb_lig+1]).encode("latin-1")
+    plateau["murs"][:] = grille.translate(TRAD_MURS)
+    plateau["couleurs"][:] = grille.translate(TRAD_COULEURS)
+    pos_joueurs, pos_objets = plateau_dict.joueurs_objets_from_lignes(les_lignes, nb_lig+1)
+    joueurs = plateau["joueurs"]
+    for numj, pos in pos_joueurs.items():
+        joueurs[pos[0] * nb_col + pos[1]] |= bit_joueur(numj)
+    objets = plateau["objets"]
+    for pos, numo in pos_objets.items():
+        objets[pos[0] * nb_col + pos[1]] = numo
+    plateau_dict.memoriser_etat(plateau, les_lignes, pos_joueurs, pos_objets)
+    return plateau
+
+
+def cases_differentes(ancien, nouveau):
+    """retourne les positions des cases qui diffèrent entre deux plateaux compacts
+        de mêmes dimensions. Seules les lignes différentes sont examinées case par case
+
+    Args:
+        ancien (dict): le plateau compact de l'état précédent
+        nouveau (dict): le plateau compact de l'état actuel
+
+    Returns:
+        set: l'ensemble des positions (lig,col) des cases modifiées
+    """
+    nb_col = nouveau["nb_colonnes"]
+    modifiees = set()
+    for cle in ("murs", "couleurs", "objets", "joueurs"):
+        tab_ancien = ancien[cle]
+        tab_nouveau = nouveau[cle]
+        if tab_ancien == tab_nouveau:
+            continue
+        for debut in range(0, len(tab_nouveau), nb_col):
+            if tab_ancien[debut:debut+nb_col] != tab_nouveau[debut:debut+nb_col]:
+                for ind in range(debut, debut+nb_col):
+                    if tab_ancien[ind] != tab_nouveau[ind]:
+                        modifiees.add((ind // nb_col, ind % nb_col))
+    return modifiees
+
+
+def plateau_from_octets(nb_lignes, nb_colonnes, grille, pos_joueurs, pos_objets, precedent=None):
+    """Construit un plateau compact directement à partir d'un état reçu au format
+        binaire (voir client.decoder_jeu) sans passer par une chaine de caractères
+
+    Args:
+        nb_lignes (int): le nombre de lignes du plateau
+        nb_colonnes (int): le nombre de colonnes du plateau
+        grille (memoryview): un octet par case, avec le même codage que le plan texte
+        pos_joueurs (list): une liste de triplets (joueur,lig,col)
+        pos_objets (list): une liste de triplets (objet,lig,col)
+        precedent (dict, optional): le plateau compact de l'état précédent. S'il est fourni
+            les cases modifiées depuis cet état sont disponibles avec plateau.get_cases_modifiees
+
+    Returns:
+        dict: le plateau compact correspondant
+    """
+    plateau = plateau_vide(nb_lignes, nb_colonnes)
+    grille = bytes(grille)
+    plateau["murs"][:] = grille.translate(TRAD_MURS)
+    plateau["couleurs"][:] = grille.translate(TRAD_COULEURS)
+    joueurs = plateau["joueurs"]
+    for numj, lig, col in pos_joueurs:
+        joueurs[lig * nb_colonnes + col] |= bit_joueur(numj)
+    objets = plateau["objets"]
+    for numo, lig, col in pos_objets:
+        objets[lig * nb_colonnes + col] = numo
+    plateau["cases_modifiees"] = None
+    if precedent is not None and precedent["nb_lignes"] == nb_lignes and \
+            precedent["nb_colonnes"] == nb_colonnes:
+        plateau["cases_modifiees"] = cases_differentes(precedent, plateau)
+        # les tables calculées à partir des murs restent valables si les murs n'ont pas changé
+        if precedent["murs"] == plateau["murs"]:
+            for cle in plateau_dict.CACHES_MURS:
+                if cle in precedent:
+                    plateau[cle] = precedent[cle]
+    return plateau
+
+
+def Plateau(plan):
+    """Créer un plateau compact en respectant le plan donné en paramètre
+        (voir plateau.Plateau)
+
+    Args:
+        plan (str): le plan sous la forme d'une chaine de caractères
+
+    Returns:
+        dict: Le plateau compact correspondant au plan
+    """
+    return plateau_from_str(plan)
+
+
+def surfaces_peintes(plateau, nb_joueurs):
+    """version rapide de plateau.surfaces_peintes pour un plateau compact
+
+    Args:
+        plateau (dict): le plateau compact considéré
+        nb_joueurs (int): le nombre de joueurs total participant à la partie
+
+    Returns:
+        dict: un dictionnaire dont les clées sont les identifiants joueurs et les
+            valeurs le nombre de cases peintes par le joueur
+    """
+    couleurs = plateau["couleurs"]
+    dico = {}
+    for num in range(ord('A'), ord('Z')+1):
+        nb = couleurs.count(num)
+        if nb > 0:
+            dico[chr(num)] = nb
+    if len(dico) < nb_joueurs:
+        masque = 0
+        for masque_case in set(plateau["joueurs"]):
+            masque |= masque_case
+        for joueur in joueurs_du_masque(masque):
+            if joueur not in dico:
+                dico[joueur] = 0
+    return dico
+
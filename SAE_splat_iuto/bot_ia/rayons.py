@@ -0,0 +1,116 @@
+# coding: utf-8
+"""
+Tables des rayons de peinture d'une carte.
+
+Un tir part d'une case dans une direction et avance jusqu'au bord du plateau, au
+premier mur (sauf pour un tir qui transperce les murs) ou à la portée du tir. Ces
+rayons ne dépendent que des murs: ils sont calculés une fois par carte sous forme,
+pour chaque case et chaque direction, du nombre de cases jusqu'au bord, la case de départ
+comprise, et du nombre de ces cases qui précèdent le premier mur. Les indices
+(lig * nb_colonnes + col) des cases d'un rayon se suivent avec un pas constant: un tir se
+réduit au parcours d'un range, sans que la table ne stocke les cases de chaque rayon.
+
+Ce module est identique dans serveur/ et bot_ia/.
+"""
+
+DIRECTIONS = ['N', 'E', 'S', 'O']
+INC_DIRECTION = {'N': (-1, 0), 'E': (0, 1), 'S': (1, 0), 'O': (0, -1)}
+NUM_DIRECTION = {direction: num for num, direction in enumerate(DIRECTIONS)}
+
+
+def calculer_rayons(nb_lignes, nb_colonnes, murs):
+    """calcule les rayons partant de chaque case dans chaque direction
+
+    Args:
+        nb_lignes (int): le nombre de lignes de la carte
+        nb_colonnes (int): le nombre de colonnes de la carte
+        murs (list): pour chaque case (par indice) True si c'est un mur
+
+    Returns:
+        dict: la table des rayons: pour l'indice de case * 4 + numéro de direction, "longueurs"
+            donne le nombre de cases du rayon jusqu'au bord et "libres" le nombre de ces cases
+            précédant le premier mur; "pas" donne pour chaque direction l'écart entre les
+            indices de deux cases successives d'un rayon
+    """
+    nb_cases = nb_lignes * nb_colonnes
+    pas = [d_lig * nb_colonnes + d_col for d_lig, d_col in (INC_DIRECTION[direction] for direction in DIRECTIONS)]
+    longueurs = [0] * (nb_cases * 4)
+    libres = [0] * (nb_cases * 4)
+    # chaque rayon prolonge d'une case celui qui part de la case suivante dans la direction
+    # opposée: on parcourt les cases en partant du bord vers lequel va le rayon
+    for num_dir, direction in enumerate(DIRECTIONS):
+        d_lig, d_col = INC_DIRECTION[direction]
+        lignes = range(nb_lignes) if d_lig <= 0 else range(nb_lignes - 1, -1, -1)
+        colonnes = range(nb_colonnes) if d_col <= 0 else range(nb_colonnes - 1, -1, -1)
+        for lig in lignes:
+            for col in colonnes:
+                ind = lig * nb_colonnes + col
+                num = ind * 4 + num_dir
+                if 0 <= lig + d_lig < nb_lignes and 0 <= col + d_col < nb_colonnes:
+                    suivant = (ind + pas[num_dir]) * 4 + num_dir
+                    longueurs[num] = longueurs[suivant] + 1
+                    libres[num] = 0 if murs[ind] else libres[suivant] + 1
+                else:
+                    longueurs[num] = 1
+                    libres[num] = 0 if murs[ind] else 1
+    return {"nb_colonnes": nb_colonnes, "pas": pas, "longueurs": longueurs, "libres": libres}
+
+
+def cases_rayon(table, num, longueur=None):
+    """retourne les indices des cases d'un rayon
+
+    Args:
+        table (dict): la table des rayons de la carte
+        num (int): le rayon (indice de case * 4 + numéro de direction)
+        longueur (int, optional): le nombre maximum de cases retournées (par défaut jusqu'au bord)
+
+    Returns:
+        range: les indices des cases du rayon, la case de départ comprise
+    """
+    ind, num_dir = divmod(num, 4)
+    pas = table["pas"][num_dir]
+    if longueur is None or longueur > table["longueurs"][num]:
+        longueur = table["longueurs"][num]
+    return range(ind, ind + pas * longueur, pas)
+
+
+def rayon(table, pos, direction, distance_max, debut=True, transperce=False):
+    """retourne les indices des cases atteintes par un tir (sans tenir compte de son coût)
+
+    Args:
+        table (dict): la table des rayons de la carte
+        pos (tuple): la position du tireur
+        direction (str): la direction du tir ('N', 'E', 'S' ou 'O')
+        distance_max (int): le nombre maximum de cases atteintes
+        debut (bool, optional): si False le tir commence à la case voisine du tireur
+        transperce (bool, optional): si True le tir traverse les murs
+
+    Returns:
+        range: les indices des cases atteintes, dans l'ordre du tir
+    """
+    num_dir = NUM_DIRECTION[direction]
+    num = (pos[0] * table["nb_colonnes"] + pos[1]) * 4 + num_dir
+    if not debut:
+        # le tir est celui qui part de la case voisine
+        if table["longueurs"][num] < 2:
+            return range(0)
+        num += table["pas"][num_dir] * 4
+    fin = table["longueurs"][num] if transperce else table["libres"][num]
+    return cases_rayon(table, num, min(distance_max, fin))
+
+
+def distance_mur(table, pos, direction):
+    """retourne la distance entre une case et le premier mur dans une direction
+
+    Args:
+        table (dict): la table des rayons de la carte
+        pos (tuple): la position de départ
+        direction (str): la direction ('N', 'E', 'S' ou 'O')
+
+    Returns:
+        int: le nombre de déplacements pour atteindre le premier mur (0 si la case de départ
+            est un mur) ou None s'il n'y a pas de mur jusqu'au bord du plateau
+    """
+    num = (pos[0] * table["nb_colonnes"] + pos[1]) * 4 + NUM_DIRECTION[direction]
+    libres = table["libres"][num]
+    return libres if libres < table["longueurs"][num] else None
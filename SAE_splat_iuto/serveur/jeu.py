@@ -19,8 +19,14 @@ Module de gestion du jeu permettant de mettre à jour le plateau en fonction des
 action des joueurs.
 """
 import random
+from collections import deque
 
+from serveur import client
 from serveur import const
+from serveur import rayons
+
+# nombre d'encodages successifs du plateau dont on garde les cases modifiées pour les deltas
+NB_VERSIONS = 16
 
 
 class Case(object):
@@ -78,6 +84,23 @@ class Plateau(object):
         self.nb_lignes = nb_lignes
         self.nb_colonnes = nb_colonnes
         self.les_valeurs = [valeur_par_defaut] * (nb_lignes * nb_colonnes)
+        # nombre de cases de chaque couleur, tenu à jour à chaque changement de couleur
+        self.surfaces = {}
+        # rayons de peinture de la carte, calculés au premier tir (voir rayons.py)
+        self.rayons = None
+        # encodage de chaque ligne pour plateau_2_str, numéros des lignes modifiées depuis
+        # (None si toutes sont à réencoder) et dernière chaine produite. Les cases ne doivent
+        # être modifiées que par les méthodes du plateau qui tiennent ces informations à jour
+        self.lignes_str = None
+        self.lignes_modifiees = None
+        self.chaine = None
+        # numéro du dernier encodage, indices des cases dont la couleur a changé depuis
+        # (None si toutes) et, pour chacun des derniers encodages, celles qui avaient changé
+        # depuis le précédent: les deltas sont construits sans comparer les chaines
+        self.version = 0
+        self.cases_modifiees = None
+        self.historique = deque(maxlen=NB_VERSIONS)
+        self.fin_grille = 0
 
     def get_nb_lignes(self):
         return self.nb_lignes
@@ -89,18 +112,66 @@ class Plateau(object):
         return self.les_valeurs[pos[0] * self.nb_colonnes + pos[1]]
 
     def set_case(self, pos, valeur):
+        ancienne = self.les_valeurs[pos[0] * self.nb_colonnes + pos[1]]
+        if isinstance(ancienne, Case):
+            self.changer_couleur(ancienne.get_couleur(), None)
+        if isinstance(valeur, Case):
+            self.changer_couleur(None, valeur.get_couleur())
         self.les_valeurs[pos[0] * self.nb_colonnes + pos[1]] = valeur
+        self.rayons = None
+        self.modifier_case(pos[0] * self.nb_colonnes + pos[1])
+
+    def changer_couleur(self, ancienne, nouvelle):
+        # met à jour les compteurs de surface quand une case passe de ancienne à nouvelle
+        # (None pour une case qui disparaît ou apparaît)
+        if ancienne is not None and ancienne != ' ':
+            self.surfaces[ancienne.upper()] -= 1
+        if nouvelle is not None and nouvelle != ' ':
+            nouvelle = nouvelle.upper()
+            self.surfaces[nouvelle] = self.surfaces.get(nouvelle, 0) + 1
+
+    def compter_surfaces(self):
+        self.surfaces = {}
+        for case in self.les_valeurs:
+            self.changer_couleur(None, case.get_couleur())
+
+    def modifier_ligne(self, lig):
+        # la ligne lig sera réencodée au prochain appel de plateau_2_str
+        if self.lignes_modifiees is not None:
+            self.lignes_modifiees.add(lig)
+        self.chaine = None
+
+    def modifier_case(self, ind):
+        # la couleur de la case d'indice ind a changé
+        if self.cases_modifiees is not None:
+            self.cases_modifiees.add(ind)
+        self.modifier_ligne(ind // self.nb_colonnes)
+
+    def modifier_tout(self):
+        self.lignes_modifiees = None
+        self.cases_modifiees = None
+        self.chaine = None
+
+    def get_rayons(self):
+        if self.rayons is None:
+            self.rayons = rayons.calculer_rayons(self.nb_lignes, self.nb_colonnes,
+                                                 [case.est_mur() for case in self.les_valeurs])
+        return self.rayons
 
     def poser_joueur(self, joueur, pos):
+        self.modifier_ligne(pos[0])
         self.get_case(pos).poser_joueur(joueur)
 
     def enlever_joueur(self, joueur, pos):
+        self.modifier_ligne(pos[0])
         return self.get_case(pos).enlever_joueur(joueur)
 
     def poser_objet(self, objet, pos):
+        self.modifier_ligne(pos[0])
         self.get_case(pos).poser_objet(objet)
 
     def prendre_objet(self, pos):
+        self.modifier_ligne(pos[0])
         return self.get_case(pos).prendre_objet()
 
 
@@ -118,6 +189,9 @@ class Plateau(object):
                     self.les_valeurs.append(Case(True,car.upper()))
                 else:
                     self.les_valeurs.append(Case(False,car))
+        self.compter_surfaces()
+        self.rayons = None
+        self.modifier_tout()
         if not complet:
             return
         ind += 1
@@ -132,74 +206,133 @@ class Plateau(object):
             self.poser_objet(int(numo), (int(ligneo), int(colo)))
         return les_lignes[ind+1:]
 
+    def ligne_2_str(self, lig):
+        # retourne la ligne du plan et les lignes décrivant ses joueurs et ses objets
+        ligne = []
+        joueurs = []
+        objets = []
+        debut = lig * self.nb_colonnes
+        for col, case in enumerate(self.les_valeurs[debut:debut + self.nb_colonnes]):
+            coul = case.couleur
+            if case.mur:
+                if coul.isalpha():
+                    ligne.append(coul.lower())
+                else:
+                    ligne.append("#")
+            else:
+                ligne.append(str(coul))
+                if case.objet != const.AUCUN:
+                    objets.append(str(case.objet)+";"+str(lig)+";"+str(col)+"\n")
+                for joueur in case.joueurs_presents:
+                    joueurs.append(str(joueur)+";"+str(lig)+";"+str(col)+"\n")
+        ligne.append("\n")
+        return "".join(ligne), joueurs, objets
+
     def plateau_2_str(self):
-        res = str(self.nb_lignes)+";"+str(self.nb_colonnes)+"\n"
+        # seules les lignes modifiées depuis l'appel précédent sont réencodées
+        if self.chaine is not None:
+            return self.chaine
+        if self.lignes_modifiees is None or self.lignes_str is None or len(self.lignes_str) != self.nb_lignes:
+            self.lignes_str = [self.ligne_2_str(lig) for lig in range(self.nb_lignes)]
+        else:
+            for lig in self.lignes_modifiees:
+                self.lignes_str[lig] = self.ligne_2_str(lig)
+        self.lignes_modifiees = set()
+        self.historique.append(self.cases_modifiees)
+        self.cases_modifiees = set()
+        self.version += 1
+        morceaux = [str(self.nb_lignes)+";"+str(self.nb_colonnes)+"\n"]
+        morceaux.extend(ligne for ligne, _, _ in self.lignes_str)
+        self.fin_grille = sum(len(morceau) for morceau in morceaux)
+        joueurs = [joueur for _, joueurs_ligne, _ in self.lignes_str for joueur in joueurs_ligne]
+        morceaux.append(str(len(joueurs))+'\n')
+        morceaux.extend(joueurs)
+        objets = [objet for _, _, objets_ligne in self.lignes_str for objet in objets_ligne]
+        morceaux.append(str(len(objets))+"\n")
+        morceaux.extend(objets)
+        self.chaine = "".join(morceaux)
+        return self.chaine
+
+    def delta_2_str(self, version):
+        # partie plateau d'un delta (voir client.delta_jeu) depuis l'encodage numéro version:
+        # les cases dont la couleur a changé, puis les joueurs et objets recopiés tels quels.
+        # None si ces cases ne sont plus connues
+        chaine = self.plateau_2_str()
+        nb_versions = self.version - version
+        if nb_versions < 0 or nb_versions > len(self.historique):
+            return None
+        cases = set()
+        for modifs in list(self.historique)[len(self.historique)-nb_versions:]:
+            if modifs is None:
+                return None
+            cases |= modifs
+        morceaux = [str(len(cases))+"\n"]
+        for ind in sorted(cases):
+            lig, col = divmod(ind, self.nb_colonnes)
+            morceaux.append(str(lig)+";"+str(col)+";"+self.lignes_str[lig][0][col]+"\n")
+        morceaux.append(chaine[self.fin_grille:])
+        return "".join(morceaux)
+
+    def plateau_from_octets(self, nb_lignes, nb_colonnes, grille, pos_joueurs, pos_objets):
+        self.nb_lignes = nb_lignes
+        self.nb_colonnes = nb_colonnes
+        self.les_valeurs = []
+        for car in bytes(grille).decode("latin-1"):
+            if car == '#' or car.islower():
+                if car == '#':
+                    car=' '
+                self.les_valeurs.append(Case(True,car.upper()))
+            else:
+                self.les_valeurs.append(Case(False,car))
+        self.compter_surfaces()
+        self.rayons = None
+        self.modifier_tout()
+        for joueur, lig, col in pos_joueurs:
+            self.poser_joueur(joueur, (lig, col))
+        for objet, lig, col in pos_objets:
+            self.poser_objet(objet, (lig, col))
+
+    def plateau_2_octets(self):
+        grille = bytearray(self.nb_lignes*self.nb_colonnes)
         joueurs = []
         objets = []
-        for lig in range(self.nb_lignes):
-            ligne = ""
-            for col in range(self.nb_colonnes):
-                case = self.get_case((lig, col))
-                coul=case.get_couleur()
-                if case.est_mur():
-                    if coul.isalpha():
-                        ligne+=coul.lower()
-                    else:
-                        ligne += "#"
+        for ind, case in enumerate(self.les_valeurs):
+            coul=case.get_couleur()
+            if case.est_mur():
+                if coul.isalpha():
+                    grille[ind]=ord(coul.lower())
                 else:
-                    obj = case.get_objet()
-                    les_joueurs = case.get_joueurs()
-                    ligne += str(coul)
-                    if obj != const.AUCUN:
-                        objets.append((obj, lig, col))
-                    for joueur in les_joueurs:
-                        joueurs.append((joueur, lig, col))
-            res += ligne+"\n"
-        res += str(len(joueurs))+'\n'
-        for joueur, lig, col in joueurs:
-            res += str(joueur)+";"+str(lig)+";"+str(col)+"\n"
-        res += str(len(objets))+"\n"
-        for objet, lig, col in objets:
-            res += str(objet)+";"+str(lig)+";"+str(col)+"\n"
-        return res
+                    grille[ind]=ord('#')
+            else:
+                grille[ind]=ord(coul)
+                lig, col = divmod(ind, self.nb_colonnes)
+                obj = case.get_objet()
+                if obj != const.AUCUN:
+                    objets.append((obj, lig, col))
+                for joueur in case.get_joueurs():
+                    joueurs.append((joueur, lig, col))
+        return grille, joueurs, objets
 
     def peindre(self, pos, direction, couleur, reserve, debut, distance_max, transperce=False):
-        if direction == 'N':
-            inc = (-1, 0)
-        elif direction == 'S':
-            inc = (1, 0)
-        elif direction == 'O':
-            inc = (0, -1)
-        elif direction == 'E':
-            inc = (0, 1)
-        else:
+        if direction not in rayons.NUM_DIRECTION:
             return 0, []
-        if debut:
-            pos_actuelle = pos
-        else:
-            pos_actuelle = (pos[0]+inc[0], pos[1]+inc[1])
         cout_peinture = 0
         joueurs_touches = []
-        dist=0
-        while 0 <= pos_actuelle[0] < self.nb_lignes and\
-                0 <= pos_actuelle[1] < self.nb_colonnes and\
-                dist<distance_max:
-            dist+=1
-            la_case = self.get_case(pos_actuelle)
-            if la_case.est_mur():
-                if not transperce:
-                    return cout_peinture, joueurs_touches
-                
+        # cases jusqu'au bord, au premier mur (sauf si le tir transperce) ou à la portée
+        for ind in rayons.rayon(self.get_rayons(), pos, direction, distance_max, debut, transperce):
+            la_case = self.les_valeurs[ind]
             if la_case.get_couleur() in '# '+couleur:
                 cout=1
             else:
                 cout=2
             if cout_peinture+cout>reserve:
                 return cout_peinture, joueurs_touches
+            if la_case.get_couleur() != couleur:
+                self.modifier_case(ind)
+            self.changer_couleur(la_case.get_couleur(), couleur)
             jt = la_case.peindre(couleur)
             cout_peinture+=cout
             joueurs_touches.extend(jt)
-            pos_actuelle = (pos_actuelle[0]+inc[0], pos_actuelle[1]+inc[1])
         return cout_peinture, joueurs_touches
 
     def deplacer_joueur(self,joueur,pos,direction):
@@ -222,6 +355,8 @@ class Plateau(object):
         case_arr=self.get_case(pos_arrivee)
         if case_arr.est_mur():
             return False,0,0,None
+        self.modifier_ligne(pos[0])
+        self.modifier_ligne(pos_arrivee[0])
         case_dep.prendre_joueur(joueur)
         case_arr.poser_joueur(joueur)
         coul=case_arr.get_couleur()
@@ -232,22 +367,24 @@ class Plateau(object):
             return True,0,obj,pos_arrivee
         return True,-1,obj,pos_arrivee
         
-    def ajouter_objet_alea(self):
-        objet=random.randint(1,const.NB_OBJETS)
+    def ajouter_objet_alea(self,alea=random):
+        objet=alea.randint(1,const.NB_OBJETS)
         while True:
-            ligne=random.randint(0,self.nb_lignes-1)
-            colonne=random.randint(0,self.nb_colonnes-1)
+            ligne=alea.randint(0,self.nb_lignes-1)
+            colonne=alea.randint(0,self.nb_colonnes-1)
             case=self.get_case((ligne,colonne))
             if not case.est_mur() and case.get_joueurs() == set():
+                self.modifier_ligne(ligne)
                 case.poser_objet(objet)
                 return (ligne,colonne)
 
-    def ajouter_joueur_alea(self,couleur):
+    def ajouter_joueur_alea(self,couleur,alea=random):
         while True:
-            ligne=random.randint(0,self.nb_lignes-1)
-            colonne=random.randint(0,self.nb_colonnes-1)
+            ligne=alea.randint(0,self.nb_lignes-1)
+            colonne=alea.randint(0,self.nb_colonnes-1)
             case=self.get_case((ligne,colonne))
             if not case.est_mur() and case.get_joueurs() == set():
+                self.modifier_ligne(ligne)
                 case.poser_joueur(couleur)
                 return (ligne,colonne)
 
@@ -255,10 +392,9 @@ class Plateau(object):
         res={}
         for num_j in range(nb_joueurs):
             res[chr(ord('A')+num_j)]=0
-        for case in self.les_valeurs:
-            coul=case.get_couleur().upper()
-            if coul!=' ':
-                res[coul]+=1
+        for coul,nb_cases in self.surfaces.items():
+            if nb_cases>0:
+                res[coul]=nb_cases
         return res
     
 class Joueur(object):
@@ -336,10 +472,18 @@ class Joueur(object):
 class Jeu(object):
     def __init__(self,nom_fic="",duree_totale=200,reserve_initiale=const.CAPACITE_RESERVOIR,duree_obj=const.DUREE_VIE_OBJET,
                 penalite=const.PENALITE,bonus_recharge=const.BONUS_RECHARGE,bonus_objet=const.BONUS_OBJET, bonus_touche=const.BONUS_JOUEUR_TOUCHE, 
-                distance_max=const.PORTEE_PEINTURE):
+                distance_max=const.PORTEE_PEINTURE,alea=None,carte=None):
+        # alea est le générateur utilisé pour placer joueurs et objets et tirer l'ordre des
+        # actions (le module random par défaut): un random.Random dédié rend la partie
+        # reproductible à partir de sa graine. carte est le contenu d'un fichier de carte
+        self.alea=random if alea is None else alea
+        # version du plateau de chaque état récemment produit par jeu_2_str (voir delta_depuis)
+        self.versions={}
         if nom_fic!="":
             with open(nom_fic) as fic:
                 contenu=fic.read()
+        elif carte is not None:
+            contenu=carte
         else:
             return
         self.plateau=Plateau(0,0)
@@ -356,19 +500,70 @@ class Jeu(object):
         self.bonus_objet=bonus_objet
         self.distance_max=distance_max
 
-    def jeu_2_str(self,separateur=";"):
-        res=str(self.duree_actuelle)+separateur+str(self.duree_totale)+separateur+\
+    def param_2_str(self,separateur=";"):
+        return str(self.duree_actuelle)+separateur+str(self.duree_totale)+separateur+\
             str(self.reserve_initiale)+separateur+\
             str(self.duree_obj)+separateur+str(self.penalite)+separateur+str(self.bonus_touche)+\
             separateur+str(self.bonus_recharge)+separateur+str(self.bonus_objet)+\
                 separateur+str(self.distance_max)+'\n'
-        res+="-"*20+'\n'+self.plateau.plateau_2_str()+"-"*20+'\n'
-        for joueur in self.les_joueurs.values():
-            res+=joueur.joueur_2_str(separateur)
+
+    def joueurs_2_str(self,separateur=";"):
+        return "".join(joueur.joueur_2_str(separateur) for joueur in self.les_joueurs.values())
+
+    def jeu_2_str(self,separateur=";"):
+        plateau=self.plateau.plateau_2_str()
+        res="".join([self.param_2_str(separateur),"-"*20+'\n',plateau,"-"*20+'\n',self.joueurs_2_str(separateur)])
+        # on retient la version du plateau de cet état pour les deltas qui partiront de lui
+        self.versions.pop(res,None)
+        if len(self.versions)>=NB_VERSIONS:
+            del self.versions[next(iter(self.versions))]
+        self.versions[res]=self.plateau.version
         return res
 
+    def delta_depuis(self,ancien,separateur=";"):
+        # delta (voir client.delta_jeu) entre l'état ancien, produit par jeu_2_str, et l'état
+        # actuel, construit à partir des cases modifiées depuis. None si ancien n'est pas un
+        # état récent de ce jeu
+        version=self.versions.get(ancien)
+        if version is None:
+            return None
+        plateau=self.plateau.delta_2_str(version)
+        if plateau is None:
+            return None
+        return self.param_2_str(separateur)+"-"*20+'\n'+plateau+"-"*20+'\n'+self.joueurs_2_str(separateur)
+
+    def carac_jeu(self):
+        return [self.duree_actuelle,self.duree_totale,self.reserve_initiale,self.duree_obj,self.penalite,
+                self.bonus_touche,self.bonus_recharge,self.bonus_objet,self.distance_max]
+
+    def jeu_2_octets(self):
+        grille,pos_joueurs,pos_objets=self.plateau.plateau_2_octets()
+        joueurs=[]
+        for joueur in self.les_joueurs.values():
+            joueurs.append((joueur.couleur,joueur.reserve,joueur.surface,joueur.points,joueur.objet,
+                            joueur.duree_objet,joueur.pos[0],joueur.pos[1],joueur.nom))
+        return client.encoder_jeu(self.carac_jeu(),self.plateau.nb_lignes,self.plateau.nb_colonnes,
+                                  grille,pos_joueurs,pos_objets,joueurs)
+
+    def jeu_from_octets(self,trame):
+        etat=client.decoder_jeu(trame)
+        self.versions={}
+        self.plateau=Plateau(1,1)
+        self.plateau.plateau_from_octets(etat["nb_lignes"],etat["nb_colonnes"],etat["grille"],
+                                         etat["pos_joueurs"],etat["pos_objets"])
+        self.les_joueurs={}
+        for couleur,reserve,surface,points,objet,duree_objet,lig,col,nom in etat["joueurs"]:
+            joueur=Joueur(couleur,nom,reserve,surface,points,(lig,col))
+            joueur.objet=objet
+            joueur.duree_objet=duree_objet
+            self.les_joueurs[couleur]=joueur
+            self.plateau.poser_joueur(couleur,(lig,col))
+        self.duree_actuelle,self.duree_totale,self.reserve_initiale,self.duree_obj,self.penalite,\
+            self.bonus_touche,self.bonus_recharge,self.bonus_objet,self.distance_max=etat["carac_jeu"]
+
     def jeu_from_str(self,chaine,separateur=';'):
         param,le_plateau,les_joueurs=chaine.split("-"*20+'\n')
+        self.versions={}
         self.plateau=Plateau(1,1)
         self.plateau.plateau_from_str(le_plateau)
         self.les_joueurs={}
@@ -394,11 +589,11 @@ class Jeu(object):
     def inscrire_joueur(self,nom):
         coul=chr(ord('A')+self.nb_joueurs)
         self.nb_joueurs+=1
-        pos=self.plateau.ajouter_joueur_alea(coul)
+        pos=self.plateau.ajouter_joueur_alea(coul,self.alea)
         self.les_joueurs[coul]=Joueur(coul,nom,self.reserve_initiale,0,0,pos)
 
     def ajouter_objet(self):
-        self.plateau.ajouter_objet_alea()
+        self.plateau.ajouter_objet_alea(self.alea)
 
     def executer_peindre(self,couleur,joueur,direction):
         if direction not in 'XNSOE':
@@ -472,28 +667,24 @@ class Jeu(object):
         if self.duree_actuelle>=self.duree_totale:
             self.duree_actuelle=self.duree_totale
             return False
-        if random.randint(1,10)==1:
-            _,_=self.plateau.ajouter_objet_alea()
+        if self.alea.randint(1,10)==1:
+            _,_=self.plateau.ajouter_objet_alea(self.alea)
         return True
             
 
-    def tour_de_jeu(self,actions):
-        melange=actions.items()
-        random.shuffle(melange)
-        for couleur,act in melange:
-            self.executer_actions(couleur,act)
-            couverture=self.plateau.surfaces_peintes(self.nb_joueurs)
-            for coul,nb_cases in couverture.items():
-                self.les_joueurs[coul].set_surface(nb_cases)
-                self.les_joueurs[coul].maj_points()
-                self.les_joueurs[coul].maj_duree()
-        self.duree_actuelle+=1
-        if self.duree_actuelle>=self.duree_totale:
-            self.duree_actuelle=self.duree_totale
-            return False
-        if random.randint(1,5)==1:
-            _,_=self.plateau.ajouter_objet_alea()
-        return True
+    def tour_de_jeu(self,actions,ordre=None,apres_action=None):
+        # L'ordre d'exécution des actions des joueurs est aléatoire s'il n'est pas fourni.
+        # apres_action(couleur,actions) est appelée après l'action de chaque joueur
+        if ordre is None:
+            ordre=list(actions.keys())
+            self.alea.shuffle(ordre)
+        for couleur in ordre:
+            self.executer_actions(couleur,actions[couleur])
+            self.maj_surface()
+            self.les_joueurs[couleur].maj_points()
+            if apres_action is not None:
+                apres_action(couleur,actions[couleur])
+        return self.fin_tour()
 
     def sauver_score(self,nom_fic):
         with open(nom_fic, "w") as fic:
@@ -0,0 +1,194 @@
+# coding: utf-8
+"""
+Enregistrement et rejeu des parties.
+
+Le serveur enregistre chaque partie (sauf avec l'option --sans_rejeu) dans un fichier de
+rejeu, par défaut rejeu_AAAAMMJJ_HHMMSS.jsonl.gz (voir nom_par_defaut): une première ligne donne
+la carte (son contenu), les paramètres du jeu, les noms des joueurs dans leur ordre
+d'inscription et la graine du générateur aléatoire du jeu (Jeu.alea), puis chaque ligne
+donne les actions d'un tour dans leur ordre d'exécution [[couleur, actions], ...] et la
+dernière les points de chaque joueur en fin de partie. Chaque ligne est un objet JSON;
+le fichier est compressé si son nom se termine par .gz.
+
+Le jeu ne tirant ses nombres aléatoires que dans Jeu.alea (placement des joueurs et des
+objets, ordre des actions), une partie se rejoue exactement à partir de la graine et des
+actions: on rejoue le tirage de l'ordre de chaque tour, dont la consommation du générateur
+ne dépend que du nombre de joueurs, puis on exécute les actions dans l'ordre enregistré.
+
+Exemples:
+    python -m serveur.rejeu rejeu.jsonl.gz                 rejoue la partie à pleine vitesse
+                                                           et vérifie les points enregistrés
+    python -m serveur.rejeu rejeu.jsonl.gz --port 1111 --vitesse 4
+                                                           montre la partie aux afficheurs
+                                                           (affichage.py) à 4 tours par seconde
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import time
+
+from serveur import jeu
+
+# paramètres du jeu enregistrés (noms des paramètres du constructeur de Jeu)
+PARAMETRES = ["duree_totale", "reserve_initiale", "duree_obj", "penalite", "bonus_recharge",
+              "bonus_objet", "bonus_touche", "distance_max"]
+
+
+def ouvrir(nom_fic, mode):
+    if nom_fic.endswith(".gz"):
+        return gzip.open(nom_fic, mode+"t", encoding="utf-8")
+    return open(nom_fic, mode, encoding="utf-8")
+
+
+def nouvelle_graine():
+    return random.randrange(2**32)
+
+
+def nom_par_defaut(nom=""):
+    # nom du fichier de rejeu d'une partie, horodaté pour ne pas écraser les précédents
+    return "rejeu"+("_"+nom if nom else "")+time.strftime("_%Y%m%d_%H%M%S")+".jsonl.gz"
+
+
+class Enregistreur(object):
+    # enregistre une partie au fil des tours: chaque tour est écrit dès qu'il est fini et le
+    # fichier est vidé sur le disque tous les periode tours (et en fin de partie)
+    def __init__(self, nom_fic, map, graine, periode=1):
+        self.nom_fic = nom_fic
+        self.periode = periode
+        self.nb_tours = 0
+        with open(map) as fic:
+            self.carte = fic.read()
+        self.graine = graine
+        self.fichier = None
+        self.actions = []
+
+    def commencer(self, le_jeu):
+        # les joueurs sont inscrits: la partie peut être décrite
+        entete = {"carte": self.carte, "graine": self.graine,
+                  "parametres": {nom: getattr(le_jeu, nom) for nom in PARAMETRES},
+                  "joueurs": [le_jeu.les_joueurs[couleur].nom for couleur in sorted(le_jeu.les_joueurs)]}
+        self.fichier = ouvrir(self.nom_fic, "w")
+        self.ecrire(entete)
+        self.fichier.flush()
+
+    def ecrire(self, objet):
+        self.fichier.write(json.dumps(objet, separators=(",", ":"))+"\n")
+
+    def apres_action(self, couleur, actions):
+        self.actions.append([couleur, actions])
+
+    def fin_tour(self):
+        self.ecrire(self.actions)
+        self.actions = []
+        self.nb_tours += 1
+        if self.nb_tours % self.periode == 0:
+            self.fichier.flush()
+
+    def terminer(self, le_jeu):
+        self.ecrire({"points": {couleur: joueur.points for couleur, joueur in le_jeu.les_joueurs.items()}})
+        self.fichier.close()
+
+
+def lire_rejeu(nom_fic):
+    """lit un fichier de rejeu
+
+    Args:
+        nom_fic (str): le nom du fichier
+
+    Returns:
+        tuple: l'entête (dict), la liste des tours (chacun la liste des [couleur, actions] dans
+            l'ordre d'exécution) et les points de fin de partie (dict, None si la partie n'est
+            pas terminée)
+    """
+    tours = []
+    points = None
+    with ouvrir(nom_fic, "r") as fic:
+        entete = json.loads(fic.readline())
+        for ligne in fic:
+            objet = json.loads(ligne)
+            if isinstance(objet, dict):
+                points = objet["points"]
+            else:
+                tours.append(objet)
+    return entete, tours, points
+
+
+def preparer_jeu(entete):
+    """retourne le jeu au début de la partie décrite par l'entête d'un rejeu"""
+    le_jeu = jeu.Jeu(alea=random.Random(entete["graine"]), carte=entete["carte"], **entete["parametres"])
+    for nom in entete["joueurs"]:
+        le_jeu.inscrire_joueur(nom)
+    return le_jeu
+
+
+def rejouer_tour(le_jeu, tour, apres_action=None):
+    """rejoue un tour enregistré, retourne le résultat de Jeu.tour_de_jeu"""
+    ordre = [couleur for couleur, _ in tour]
+    # même consommation du générateur que le tirage de l'ordre fait par le serveur
+    le_jeu.alea.shuffle(list(ordre))
+    return le_jeu.tour_de_jeu(dict(tour), ordre, apres_action)
+
+
+def rejouer(nom_fic):
+    """rejoue une partie à pleine vitesse
+
+    Args:
+        nom_fic (str): le nom du fichier de rejeu
+
+    Returns:
+        tuple: le jeu en fin de partie et les points enregistrés (None si absents)
+    """
+    entete, tours, points = lire_rejeu(nom_fic)
+    le_jeu = preparer_jeu(entete)
+    for tour in tours:
+        rejouer_tour(le_jeu, tour)
+    return le_jeu, points
+
+
+async def montrer(nom_fic, ip, port, vitesse):
+    # diffuse la partie aux afficheurs à vitesse tours par seconde (0 pour ne pas attendre),
+    # à partir de la connexion du premier afficheur
+    # (import local: relais dépend du serveur, qui enregistre ses parties avec ce module)
+    from serveur import relais
+    entete, tours, _ = lire_rejeu(nom_fic)
+    le_jeu = preparer_jeu(entete)
+    spectateurs = relais.Spectateurs()
+    ecouteur = await asyncio.start_server(spectateurs.gerer_client, ip, port)
+    print("En attente d'un afficheur...")
+    async with ecouteur:
+        spectateurs.publier(le_jeu.jeu_2_str())
+        while not spectateurs.afficheurs:
+            await asyncio.sleep(0.1)
+        for tour in tours:
+            rejouer_tour(le_jeu, tour)
+            spectateurs.publier(le_jeu.jeu_2_str(), tour)
+            if vitesse > 0:
+                await asyncio.sleep(1/vitesse)
+        spectateurs.terminer()
+        await asyncio.gather(*spectateurs.taches_clients, return_exceptions=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fichier", help="fichier de rejeu")
+    parser.add_argument("--serveur", dest="serveur", help="adresse d'écoute des afficheurs", type=str, default='')
+    parser.add_argument("--port", dest="port", help="montrer la partie aux afficheurs connectés sur ce port",
+                        type=int, default=None)
+    parser.add_argument("--vitesse", dest="vitesse", help="nombre de tours montrés par seconde (0 sans pause)",
+                        type=float, default=5)
+    args = parser.parse_args()
+    if args.port is not None:
+        asyncio.run(montrer(args.fichier, args.serveur, args.port, args.vitesse))
+    else:
+        debut = time.time()
+        le_jeu, points = rejouer(args.fichier)
+        print("partie rejouée en %.2f s" % (time.time()-debut))
+        rejoues = {couleur: joueur.points for couleur, joueur in le_jeu.les_joueurs.items()}
+        for joueur in le_jeu.classement():
+            print(joueur.couleur, joueur.nom, joueur.points)
+        if points is not None:
+            print("points identiques à l'enregistrement" if rejoues == points
+                  else "points différents de l'enregistrement: "+str(points))
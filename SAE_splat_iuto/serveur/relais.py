@@ -0,0 +1,176 @@
+# coding: utf-8
+"""
+Relais de diffusion pour les spectateurs.
+
+Le relais se connecte au serveur de jeu (serveur.py ou serveur_async.py) comme un seul
+afficheur puis rediffuse chaque état reçu à autant d'afficheurs qu'il en vient: le coût
+pour le serveur de jeu est celui d'un afficheur, quel que soit le nombre de spectateurs.
+
+Les afficheurs se connectent au relais exactement comme au serveur (voir client.py), avec
+ou sans les options delta, binaire et flux. Un afficheur qui arrive en cours de partie
+reçoit aussitôt le dernier état reçu par le relais, puis les suivants; un afficheur qui ne
+lit pas assez vite reçoit seulement le plus récent quand son tampon d'envoi s'est vidé. Les options flux et
+evenements passées au relais sont demandées au serveur: les actions de chaque tour sont
+alors retransmises aux afficheurs qui les demandent.
+
+La diffusion aux afficheurs (classe Spectateurs) sert aussi à rejeu.py pour montrer une
+partie enregistrée.
+"""
+
+import argparse
+import asyncio
+
+from serveur import jeu
+from serveur import client
+from serveur.serveur import diffuser_jeu
+from serveur.serveur_async import Connexion, diffuser_sans_retard
+
+
+class EtatRecu(object):
+    """un état du jeu reçu du serveur, présenté comme un jeu à diffuser_jeu:
+       la chaine est retransmise telle quelle et codée en binaire au plus une fois
+    """
+    def __init__(self, jeu_str):
+        self.jeu_str = jeu_str
+        self.jeu_octets = None
+
+    def jeu_2_str(self):
+        return self.jeu_str
+
+    def jeu_2_octets(self):
+        if self.jeu_octets is None:
+            le_jeu = jeu.Jeu()
+            le_jeu.jeu_from_str(self.jeu_str)
+            self.jeu_octets = le_jeu.jeu_2_octets()
+        return self.jeu_octets
+
+    def delta_depuis(self, ancien):
+        # le relais ne connaît pas les cases modifiées: le delta est calculé par
+        # comparaison des chaines (client.delta_jeu)
+        return None
+
+
+class Spectateurs(object):
+    """les afficheurs connectés à qui on diffuse des états du jeu déjà codés en chaine"""
+    def __init__(self):
+        self.afficheurs = []
+        self.nb_connexions = 0
+        # dernier état publié, envoyé en premier aux afficheurs qui arrivent
+        self.etat = None
+        self.taches_clients = set()
+
+    def publier(self, jeu_str, evenements=None):
+        self.etat = EtatRecu(jeu_str)
+        self.afficheurs = [afficheur for afficheur in self.afficheurs if afficheur.actif]
+        if evenements:
+            for afficheur in self.afficheurs:
+                if afficheur.avec_evenements:
+                    afficheur.envoyer_evenements(evenements)
+        # un afficheur en retard recevra le dernier état publié quand il aura vidé son tampon
+        diffuser_sans_retard(lambda: self.etat, self.afficheurs)
+
+    async def gerer_client(self, lecteur, ecrivain):
+        tache = asyncio.current_task()
+        self.taches_clients.add(tache)
+        try:
+            await self.traiter_client(lecteur, ecrivain)
+        finally:
+            self.taches_clients.discard(tache)
+
+    async def traiter_client(self, lecteur, ecrivain):
+        connexion = Connexion(lecteur, ecrivain)
+        try:
+            msg = await connexion.lire_message()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            connexion.fermer()
+            return
+        connexion.type_client, connexion.nom = connexion.clientsocket.lire_enregistrement(msg)
+        connexion.configurer_flux()
+        if connexion.type_client != client.TYPE_AFFICHEUR:
+            print("[-] Seuls les afficheurs sont acceptés")
+            connexion.envoyer_refus()
+            connexion.fermer()
+            return
+        self.nb_connexions += 1
+        connexion.id = self.nb_connexions
+        self.afficheurs.append(connexion)
+        print("[+] Nouvel afficheur [%s] pour %s" % (connexion.nom, connexion.adresse))
+        if self.etat is not None:
+            diffuser_jeu(self.etat, [connexion])
+        # un afficheur n'envoie rien, on attend seulement sa déconnexion
+        await lecteur.read()
+        connexion.actif = False
+
+    def terminer(self):
+        for afficheur in self.afficheurs:
+            try:
+                afficheur.envoyer_quit()
+            except Exception:
+                pass
+            afficheur.fermer()
+        self.afficheurs = []
+
+
+class Relais(Spectateurs):
+    def __init__(self, serveur, port, options=None, nom="relais"):
+        super().__init__()
+        self.serveur = serveur
+        self.port = port
+        self.nom = nom
+        # le relais reçoit les deltas du serveur et reconstitue chaque état complet
+        self.options = [client.OPTION_DELTA]+[option for option in (options or [])
+                                              if option != client.OPTION_BINAIRE]
+        self.amont = client.ClientCyber(taille_chunk=65536)
+        self.evenements = self.amont.evenements
+
+    def connecter(self):
+        self.amont.creer_socket(self.serveur, self.port)
+        self.amont.enregistrement(self.nom, client.TYPE_AFFICHEUR, self.options)
+
+    def recevoir_evenements(self):
+        # prochaine_commande remplace la liste des évènements quand elle en reçoit de nouveaux
+        if self.amont.evenements is self.evenements:
+            return None
+        self.evenements = self.amont.evenements
+        return self.evenements
+
+    async def recevoir(self):
+        # la lecture sur la socket du serveur est bloquante: elle est faite dans un thread
+        while True:
+            ok, _, jeu_str = await asyncio.to_thread(self.amont.prochaine_commande)
+            if not ok:
+                break
+            self.publier(jeu_str, self.recevoir_evenements())
+        self.terminer()
+        self.amont.fermer()
+
+    async def lancer(self, ip, port):
+        self.connecter()
+        ecouteur = await asyncio.start_server(self.gerer_client, ip, port)
+        print("Relais en écoute...")
+        async with ecouteur:
+            await self.recevoir()
+            await asyncio.gather(*self.taches_clients, return_exceptions=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serveur", dest="serveur", help="serveur de jeu", type=str, default='localhost')
+    parser.add_argument("--port", dest="port", help="port du serveur de jeu", type=int, default=1111)
+    parser.add_argument("--ecoute", dest="ecoute", help="adresse d'écoute des afficheurs", type=str, default='')
+    parser.add_argument("--port_ecoute", dest="port_ecoute", help="port d'écoute des afficheurs", type=int, default=1112)
+    parser.add_argument("--partie", dest="partie", help="partie suivie sur un serveur multi-parties",
+                        type=str, default=None)
+    parser.add_argument("--flux", dest="flux", help="demander au serveur au plus un état par tour (tour) ou "
+                        "toutes les FLUX secondes", type=str, default=None)
+    parser.add_argument("--evenements", dest="evenements", help="avec --flux tour, demander aussi les actions du tour",
+                        action="store_true")
+    args = parser.parse_args()
+    options = []
+    if args.partie is not None:
+        options.append(client.OPTION_PARTIE+"="+args.partie)
+    if args.flux is not None:
+        options.append(client.OPTION_FLUX+"="+args.flux)
+    if args.evenements:
+        options.append(client.OPTION_EVENEMENTS)
+    asyncio.run(Relais(args.serveur, args.port, options).lancer(args.ecoute, args.port_ecoute))
@@ -8,9 +8,11 @@ import threading
 import time
 import random
 import queue
+import collections
 
 from serveur import jeu
 from serveur import client
+from serveur import rejeu
 
 
 
@@ -20,11 +22,60 @@ TOUS = 3
 
 NB_JOUEURS = 4
 
-TEMPO=0.3
+# pause entre deux tours (les tours s'enchaînent dès que tous les joueurs ont répondu)
+TEMPO=0
+# délai de réponse des joueurs en secondes (None pour attendre indéfiniment)
+DELAI=1.0
+# action jouée par un joueur qui n'a pas répondu à temps (ni peinture ni déplacement)
+ACTION_PAR_DEFAUT="XX"
+# temps laissé aux clients en fin de partie pour recevoir les messages en attente
+DELAI_FERMETURE=2.0
+
+
+def diffuser_jeu(le_jeu, destinataires):
+    """envoie l'état du jeu (un objet ayant les méthodes jeu_2_str, jeu_2_octets et
+        delta_depuis comme jeu.Jeu) à chaque destinataire (un objet ayant un attribut
+        clientsocket et une méthode envoyer_jeu comme ClientThread).
+        Chaque codage n'est fait qu'une fois et seulement si un client l'utilise
+    """
+    jeu_str = None
+    jeu_octets = None
+    if not all(dest_client.clientsocket.binaire for dest_client in destinataires):
+        jeu_str = le_jeu.jeu_2_str()
+    if any(dest_client.clientsocket.binaire for dest_client in destinataires):
+        jeu_octets = le_jeu.jeu_2_octets()
+    # les clients ayant reçu le même état précédent partagent le même delta, construit par
+    # le jeu à partir des cases qu'il sait modifiées (sinon par comparaison des chaines)
+    cache_deltas = {}
+    for dest_client in destinataires:
+        clientsocket = dest_client.clientsocket
+        ancien = clientsocket.dernier_jeu
+        if ancien is not None and ancien not in cache_deltas and not clientsocket.binaire and \
+                client.OPTION_DELTA in clientsocket.options:
+            delta = le_jeu.delta_depuis(ancien)
+            if delta is not None:
+                cache_deltas[ancien] = delta.encode()
+        dest_client.envoyer_jeu(jeu_str, cache_deltas, jeu_octets)
+
+def mode_flux(options):
+    """retourne le mode de diffusion demandé par un afficheur avec les options flux et
+        evenements (voir client.py): un triplet (par_tour, intervalle, avec_evenements) où
+        intervalle est la durée minimale en secondes entre deux états envoyés (0 sans limite)
+    """
+    flux = options.get(client.OPTION_FLUX)
+    par_tour = flux == client.FLUX_TOUR
+    intervalle = 0
+    if flux and not par_tour:
+        try:
+            intervalle = max(float(flux), 0)
+        except ValueError:
+            print("[-] Option flux incorrecte", flux)
+    return par_tour, intervalle, par_tour and client.OPTION_EVENEMENTS in options
 
 class Table_Clients(object):
-    def __init__(self, nb_joueurs_max, nb_afficheur_max=5):
+    def __init__(self, nb_joueurs_max, nb_afficheur_max=5, delai=DELAI):
         self.nb_joueurs_max = nb_joueurs_max
+        self.delai = delai
         self.nb_afficheur_max = nb_afficheur_max
         self.nb_joueurs = 0
         self.nb_actifs = 0
@@ -34,9 +85,15 @@ class Table_Clients(object):
         self.nb_reponses = 0
         self.verrou_ajout = threading.RLock()
         self.verrou_reponses = threading.Lock()
-        self.nouvelle_iteration = threading.Event()
+        self.nouvelle_iteration = threading.Condition()
         self.reponses_ok = threading.Event()
+        # les réponses ne sont acceptées que pour le tour courant,
+        # entre l'envoi du jeu et la fin du délai
+        self.num_tour = 0
+        self.tour_ouvert = False
         self.le_jeu = None
+        # actions exécutées depuis le dernier état de fin de tour
+        self.evenements = []
 
     def ajouter_joueur(self, joueur):
         self.verrou_ajout.acquire()
@@ -86,16 +143,36 @@ class Table_Clients(object):
         return res
 
     def envoyer_jeu(self, dest=TOUS):
+        # le verrou ne protège que la copie des listes: le codage et la mise en file
+        # se font sans bloquer les inscriptions et déconnexions
         self.verrou_ajout.acquire()
-        jeu_temp = self.le_jeu
-        jeu_str = jeu_temp.jeu_2_str()
+        destinataires = []
         if dest == JOUEUR or dest == TOUS:
-            for joueur in self.joueurs:
-                joueur.envoyer_jeu(jeu_str)
+            destinataires.extend(self.joueurs)
         if dest == AFFICHEUR or dest == TOUS:
-            for afficheur in self.afficheurs:
-                afficheur.envoyer_jeu(jeu_str)    
+            destinataires.extend(self.afficheurs)
+        self.verrou_ajout.release()
+        diffuser_jeu(self.le_jeu, destinataires)
+
+    def envoyer_action(self, couleur, actions):
+        # après l'action d'un joueur, seuls les afficheurs qui n'ont pas demandé
+        # un état par tour le reçoivent
+        self.verrou_ajout.acquire()
+        self.evenements.append((couleur, actions))
+        destinataires = [afficheur for afficheur in self.afficheurs if not afficheur.par_tour]
         self.verrou_ajout.release()
+        diffuser_jeu(self.le_jeu, destinataires)
+
+    def envoyer_evenements(self):
+        # en fin de tour, les actions du tour pour les afficheurs qui les ont demandées
+        self.verrou_ajout.acquire()
+        evenements = self.evenements
+        self.evenements = []
+        destinataires = [afficheur for afficheur in self.afficheurs if afficheur.avec_evenements]
+        self.verrou_ajout.release()
+        if evenements:
+            for afficheur in destinataires:
+                afficheur.envoyer_evenements(evenements)
 
     def envoyer_quit(self):
         self.verrou_ajout.acquire()
@@ -116,45 +193,75 @@ class Table_Clients(object):
         self.verrou_ajout.release()
 
     def commencer_nouvelle_iteration(self):
-        self.nouvelle_iteration.set()
-
-    def ajouter_reponse(self, id_joueur, msg):
+        # le tour est ouvert et numéroté d'un seul coup: une réponse en retard, marquée du
+        # numéro du tour précédent, ne peut pas être acceptée pour le nouveau tour
+        with self.nouvelle_iteration:
+            self.verrou_reponses.acquire()
+            self.reponses = {}
+            self.nb_reponses = 0
+            self.reponses_ok.clear()
+            self.num_tour += 1
+            self.tour_ouvert = True
+            self.verrou_reponses.release()
+            self.nouvelle_iteration.notify_all()
+
+    def ajouter_reponse(self, id_joueur, msg, num_tour=None):
         self.verrou_reponses.acquire()
-        self.nouvelle_iteration.clear()
-        self.reponses[id_joueur] = msg
-        self.nb_reponses += 1
-        if self.nb_reponses >= self.nb_actifs:
-            self.reponses_ok.set()
+        # une réponse arrivée après le délai concernait un tour précédent: elle est ignorée
+        accepte = self.tour_ouvert and (num_tour is None or num_tour == self.num_tour)
+        if accepte:
+            if id_joueur not in self.reponses:
+                self.nb_reponses += 1
+            self.reponses[id_joueur] = msg
+            if self.nb_reponses >= self.nb_actifs:
+                self.reponses_ok.set()
         self.verrou_reponses.release()
+        return accepte
 
     def recolter_reponses(self):
-        self.reponses_ok.wait()
-        self.reponses_ok.clear()
+        # on attend que tous les joueurs aient répondu ou que le délai soit écoulé
+        self.reponses_ok.wait(self.delai)
         self.verrou_reponses.acquire()
+        self.tour_ouvert = False
         res = self.reponses.copy()
-        self.reponses = {}
-        self.nb_reponses = 0
         self.verrou_reponses.release()
+        self.verrou_ajout.acquire()
+        for joueur in self.joueurs:
+            if joueur.id not in res:
+                res[joueur.id] = ACTION_PAR_DEFAUT
+        self.verrou_ajout.release()
         return res
 
-    def attendre_nouvelle_iteration(self):
-        self.nouvelle_iteration.wait()
+    def attendre_nouvelle_iteration(self, dernier_tour=0):
+        # attend le début d'un tour postérieur à dernier_tour et retourne son numéro
+        with self.nouvelle_iteration:
+            self.nouvelle_iteration.wait_for(lambda: self.num_tour > dernier_tour)
+            return self.num_tour
 
-    def liberer_ressources(self):
-        for joueur in self.joueurs:
-            joueur.clientsocket.fermer()
-        for afficheur in self.afficheurs:
-            afficheur.clientsocket.fermer()
+    def liberer_ressources(self, delai=DELAI_FERMETURE):
+        # les messages en attente (dont quit) sont envoyés avant de fermer les sockets
+        for le_client in self.joueurs+self.afficheurs:
+            le_client.envoi.arreter()
+        fin = time.monotonic()+delai
+        for le_client in self.joueurs+self.afficheurs:
+            le_client.envoi.attendre(max(fin-time.monotonic(), 0))
+            le_client.clientsocket.fermer()
 
 
 class JeuThread(threading.Thread):
 
-    def __init__(self, ecouteur, table_clients, duree, nom_partie='score.csv', map='/home/limet/AP/splat_iuto/source/cartes/carte.txt'):
+    def __init__(self, ecouteur, table_clients, duree, nom_partie='score.csv', map='/home/limet/AP/splat_iuto/source/cartes/carte.txt', tempo=TEMPO, nom_rejeu=None):
         super().__init__()
+        self.tempo=tempo
         self.ecouteur=ecouteur
         self.table_clients = table_clients
         self.nom_partie = nom_partie
-        table_clients.le_jeu = jeu.Jeu(map,duree)
+        # le jeu a son propre générateur aléatoire: la partie se rejoue à partir de sa graine
+        graine=rejeu.nouvelle_graine()
+        table_clients.le_jeu = jeu.Jeu(map,duree,alea=random.Random(graine))
+        self.enregistreur=None
+        if nom_rejeu:
+            self.enregistreur=rejeu.Enregistreur(nom_rejeu,map,graine)
         self.interactif=False
         self.file_commandes=queue.Queue()
 
@@ -198,6 +305,12 @@ class JeuThread(threading.Thread):
             rep =''
 
 
+    def apres_action(self,coul,actions):
+        self.traiter_commande_clavier(coul,actions)
+        if self.enregistreur is not None:
+            self.enregistreur.apres_action(coul,actions)
+        self.table_clients.envoyer_action(coul,actions)
+
     def run(self):
         # pb ici de coordination entre le start et les inscriptions
         print("On attend")
@@ -209,6 +322,8 @@ class JeuThread(threading.Thread):
         print("C'est parti!!!")
         lecteur_commande=Interaction(self.file_commandes)
         lecteur_commande.start()
+        if self.enregistreur is not None:
+            self.enregistreur.commencer(self.table_clients.le_jeu)
         self.table_clients.envoyer_jeu()
         cpt = 0
         rep=''
@@ -219,32 +334,106 @@ class JeuThread(threading.Thread):
 
             if recup != None:
                 # L'ordre d'exécution des actions des joueurs est aléatoire
-                ordre_jeu=list(recup.keys())
-                random.shuffle(ordre_jeu)
-                for id_joueur in ordre_jeu:
-                    actions=recup[id_joueur]
-                    coul=id_joueur
-                    self.table_clients.le_jeu.executer_actions(coul,actions)
-                    self.table_clients.le_jeu.maj_surface()
-                    self.table_clients.le_jeu.les_joueurs[coul].maj_points()
-                    self.traiter_commande_clavier(coul,actions)
-                    self.table_clients.envoyer_jeu(AFFICHEUR)
-
-                self.table_clients.le_jeu.fin_tour()
-                if table_clients.le_jeu.est_fini():
+                self.table_clients.le_jeu.tour_de_jeu(recup,apres_action=self.apres_action)
+                if self.enregistreur is not None:
+                    self.enregistreur.fin_tour()
+                self.table_clients.envoyer_evenements()
+                if self.table_clients.le_jeu.est_fini():
                     self.table_clients.envoyer_jeu(AFFICHEUR)
                     break
                 self.table_clients.envoyer_jeu()
                 self.table_clients.commencer_nouvelle_iteration()
-                time.sleep(TEMPO)
+                if self.tempo:
+                    time.sleep(self.tempo)
                 cpt += 1
         self.table_clients.envoyer_quit()
         self.table_clients.liberer_ressources()
-        table_clients.le_jeu.sauver_score(self.nom_partie)
+        self.table_clients.le_jeu.sauver_score(self.nom_partie)
+        if self.enregistreur is not None:
+            self.enregistreur.terminer(self.table_clients.le_jeu)
         self.ecouteur.arreter()
         print("C'est fini")
 
 
+class EnvoiThread(threading.Thread):
+    # envoie à un client les messages mis en file par le serveur: un client lent ne
+    # bloque ni la boucle de jeu ni les autres clients.
+    # Les états du jeu sont mis en file déjà codés (voir diffuser_jeu) et mis en forme
+    # pour le client au moment de l'envoi. Pour un afficheur, un état encore en file
+    # est remplacé par le suivant: seul le plus récent est envoyé, au plus un par
+    # intervalle (en secondes) si l'afficheur l'a demandé
+    def __init__(self, client_thread, remplacable=False, intervalle=0):
+        threading.Thread.__init__(self, daemon=True)
+        self.client_thread = client_thread
+        self.remplacable = remplacable
+        self.intervalle = intervalle
+        self.prochain_jeu = 0
+        self.file = collections.deque()
+        self.condition = threading.Condition()
+        self.ouvert = True
+        self.nb_abandons = 0
+
+    def ajouter_jeu(self, jeu_str, cache_deltas, jeu_octets):
+        with self.condition:
+            if not self.ouvert:
+                return
+            if self.remplacable and self.file and self.file[-1][0] == "jeu":
+                self.file.pop()
+                self.nb_abandons += 1
+            self.file.append(("jeu", (jeu_str, cache_deltas, jeu_octets)))
+            self.condition.notify()
+
+    def ajouter_message(self, message, genre="message"):
+        with self.condition:
+            if not self.ouvert:
+                return
+            self.file.append((genre, message))
+            self.condition.notify()
+
+    def arreter(self):
+        # les messages déjà en file sont envoyés, les suivants sont ignorés
+        with self.condition:
+            if self.ouvert:
+                self.ouvert = False
+                self.file.append(("fin", None))
+                self.condition.notify()
+
+    def attendre(self, delai=None):
+        if self.is_alive():
+            self.join(delai)
+
+    def run(self):
+        le_client = self.client_thread
+        while True:
+            with self.condition:
+                while True:
+                    self.condition.wait_for(lambda: self.file)
+                    attente = self.prochain_jeu-time.monotonic()
+                    if self.file[0][0] != "jeu" or attente <= 0:
+                        break
+                    # l'état attend la fin de l'intervalle, il peut être remplacé entre temps
+                    self.condition.wait(attente)
+                genre, contenu = self.file.popleft()
+            if genre == "fin":
+                break
+            try:
+                if genre == "jeu":
+                    jeu_str, cache_deltas, jeu_octets = contenu
+                    le_client.clientsocket.envoyer_jeu(jeu_str, le_client.id, cache_deltas, jeu_octets)
+                    self.prochain_jeu = time.monotonic()+self.intervalle
+                elif genre == "evenements":
+                    le_client.clientsocket.envoyer_evenements(contenu, le_client.id)
+                else:
+                    le_client.clientsocket.envoi(contenu)
+            except:
+                print(le_client.id, "est deconnecté")
+                with self.condition:
+                    self.ouvert = False
+                    self.file.clear()
+                le_client.table_clients.enlever_client(le_client)
+                break
+
+
 class ClientThread(threading.Thread):
 
     def __init__(self, ip, port, clientsocket, table_clients):
@@ -255,6 +444,9 @@ class ClientThread(threading.Thread):
         self.clientsocket.set_socket(clientsocket)
         self.table_clients = table_clients
         self.actif=True
+        self.envoi = None
+        self.par_tour = False
+        self.avec_evenements = False
 
     def maj_info_client(self, type_client, nom):
         self.nom = nom
@@ -266,9 +458,15 @@ class ClientThread(threading.Thread):
         else:
             print("[-] Type de client inconnu")
             return False
+        # les états en retard d'un afficheur sont abandonnés, pas ceux d'un joueur
+        intervalle = 0
+        if self.type_client == AFFICHEUR:
+            self.par_tour, intervalle, self.avec_evenements = mode_flux(self.clientsocket.options)
+        self.envoi = EnvoiThread(self, self.type_client == AFFICHEUR, intervalle)
+        self.envoi.start()
         res = False
         if self.type_client == JOUEUR:
-            self.id = table_clients.ajouter_joueur(self)
+            self.id = self.table_clients.ajouter_joueur(self)
             if self.id != -1:
                 print("[+] Nouveau joueur [%s] pour %s %s" %
                       (self.nom, self.ip, self.port, ))
@@ -276,7 +474,7 @@ class ClientThread(threading.Thread):
             else:
                 print("[-] Trop de joueurs déjà enregistrés")
         elif self.type_client == AFFICHEUR:
-            self.id = table_clients.ajouter_afficheur(self)
+            self.id = self.table_clients.ajouter_afficheur(self)
             if self.id != -1:
                 print("[+] Nouvel afficheur [%s] pour %s %s" %
                       (self.nom, self.ip, self.port, ))      
@@ -285,26 +483,22 @@ class ClientThread(threading.Thread):
                 print("[-] Trop d'afficheurs déjà enregistrés")
         return res
 
-    def lire_commande(self):
+    def lire_commande(self, num_tour=None):
         if not self.actif:
-            self.table_clients.ajouter_reponse(self.id, "")
+            self.table_clients.ajouter_reponse(self.id, "", num_tour)
             return True
         try:
             la_commande = self.clientsocket.recevoir_commande_client()
         except Exception as ex:
             print(ex)
             print(self.id, "semble déconnecté")
-            self.table_clients.ajouter_reponse(self.id, "")
+            self.table_clients.ajouter_reponse(self.id, "", num_tour)
             return True
-        self.table_clients.ajouter_reponse(self.id, la_commande)
+        self.table_clients.ajouter_reponse(self.id, la_commande, num_tour)
         return True
 
     def envoyer_quit(self):
-        try:
-            self.clientsocket.envoyer_quit()
-        except:
-            print(self.id,"est deconnecté") 
-            self.table_clients.enlever_client(self)
+        self.envoi.ajouter_message("quit\n")
 
     def envoyer_refus(self):
         try:
@@ -312,23 +506,20 @@ class ClientThread(threading.Thread):
         except:
             print(self.id,"est deconnecté")    
 
-    def envoyer_jeu(self,jeu_str):
+    def envoyer_jeu(self,jeu_str,cache_deltas=None,jeu_octets=None):
         if not self.actif:
             return
-        try:
-            self.clientsocket.envoyer_jeu(jeu_str,self.id)
-        except:
-            print(self.id,"est deconnecté")
-            self.table_clients.enlever_client(self)
+        self.envoi.ajouter_jeu(jeu_str,cache_deltas,jeu_octets)
 
     def envoyer_message(self, message):
         if not self.actif:
             return
-        try:
-            self.clientsocket.envoi(message)
-        except:
-            print(self.id, "est déconnecté")
-            self.table_clients.enlever_client(self)
+        self.envoi.ajouter_message(message)
+
+    def envoyer_evenements(self, evenements):
+        if not self.actif:
+            return
+        self.envoi.ajouter_message(evenements, "evenements")
 
     def run(self):
         print("Connexion de %s %s" % (self.ip, self.port, ))
@@ -337,10 +528,15 @@ class ClientThread(threading.Thread):
         if self.maj_info_client(type_cli, nom_cli):
             if self.type_client == JOUEUR:
                 continuer = True
+                num_tour = 0
                 while continuer:
-                    self.table_clients.attendre_nouvelle_iteration()
-                    continuer = self.lire_commande()
+                    # si la commande lue arrive trop tard, le nouveau tour a déjà commencé
+                    # et la commande suivante est lue immédiatement
+                    num_tour = self.table_clients.attendre_nouvelle_iteration(num_tour)
+                    continuer = self.lire_commande(num_tour)
                 print("Client déconnecté...")
+        elif self.envoi is not None:
+            self.envoi.arreter()
 
 class Ecouteur(threading.Thread):
     def __init__(self,serveur,port,table_clients):
@@ -383,11 +579,18 @@ if __name__ == '__main__':
     parser.add_argument("--nom_partie", dest="nom_partie", help="nom de la partie", type=str, default='score.csv')
     parser.add_argument("--duree", dest="duree", help="nombre de tours de la partie", type=int, default=200)
     parser.add_argument("--map", dest="map", help="fichier contenant la map", type=str, default='./cartes/carte.txt')
+    parser.add_argument("--delai", dest="delai", help="délai de réponse des joueurs en secondes (0 pour attendre indéfiniment)",
+                        type=float, default=DELAI)
+    parser.add_argument("--tempo", dest="tempo", help="pause entre deux tours en secondes", type=float, default=TEMPO)
+    parser.add_argument("--rejeu", dest="rejeu", help="fichier où enregistrer la partie (voir rejeu.py, par défaut "
+                        "rejeu_AAAAMMJJ_HHMMSS.jsonl.gz)", type=str, default=None)
+    parser.add_argument("--sans_rejeu", dest="sans_rejeu", help="ne pas enregistrer la partie", action="store_true")
     
     args = parser.parse_args()
     
-    table_clients = Table_Clients(6, 5)
+    table_clients = Table_Clients(6, 5, args.delai if args.delai > 0 else None)
     ecouteur=Ecouteur(args.serveur,args.port,table_clients)
     ecouteur.start()
-    le_jeu = JeuThread(ecouteur,table_clients,args.duree,args.nom_partie,args.map)
+    nom_rejeu = None if args.sans_rejeu else args.rejeu or rejeu.nom_par_defaut()
+    le_jeu = JeuThread(ecouteur,table_clients,args.duree,args.nom_partie,args.map,args.tempo,nom_rejeu)
     le_jeu.start()
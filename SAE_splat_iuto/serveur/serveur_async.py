@@ -0,0 +1,454 @@
+# coding: utf-8
+"""
+Serveur de jeu utilisant asyncio.
+
+Contrairement à serveur.py qui lance un thread par client, une seule boucle d'évènements
+gère l'enregistrement des clients, la collecte des commandes des joueurs et la diffusion
+de l'état du jeu. Le protocole est le même (voir client.py): les joueurs et afficheurs
+existants se connectent sans modification, avec ou sans les options delta et binaire.
+
+La partie commence dès que le nombre de joueurs attendu est atteint. A chaque tour,
+un joueur qui n'a pas répondu avant le délai imparti joue l'action par défaut; sa réponse
+en retard est ensuite ignorée.
+Un afficheur qui ne lit pas assez vite ne ralentit pas la partie: tant que son tampon
+d'envoi est plein, il ne reçoit rien puis il reçoit directement l'état le plus récent.
+
+Un même serveur peut héberger plusieurs parties indépendantes (option --partie),
+chacune avec sa carte, sa durée et son nombre de joueurs. Un client choisit sa partie
+avec l'option partie=nom lors de l'enregistrement, sinon il rejoint la première.
+"""
+
+import argparse
+import asyncio
+
+import random
+
+from serveur import jeu
+from serveur import client
+from serveur import rejeu
+from serveur.serveur import diffuser_jeu, mode_flux, NB_JOUEURS, DELAI, ACTION_PAR_DEFAUT
+
+# nombre de tours entre deux écritures du fichier de rejeu sur le disque
+PERIODE_REJEU = 20
+# taille (en octets) au-delà de laquelle le tampon d'envoi d'un afficheur est plein:
+# il ne reçoit plus de nouvel état avant de l'avoir vidé
+SEUIL_TAMPON = 256*1024
+
+
+class SocketAsync(object):
+    """adapte un StreamWriter à la partie de l'interface socket utilisée
+       par client.Client pour l'envoi
+    """
+    def __init__(self, ecrivain):
+        self.ecrivain = ecrivain
+
+    def sendall(self, donnees):
+        # écriture non bloquante: les données sont mises en attente dans le transport,
+        # Connexion.sature indique quand il faut arrêter d'en ajouter
+        self.ecrivain.write(donnees)
+
+    def close(self):
+        self.ecrivain.close()
+
+
+class Connexion(object):
+    def __init__(self, lecteur, ecrivain):
+        self.lecteur = lecteur
+        self.ecrivain = ecrivain
+        self.clientsocket = client.ClientCyber()
+        self.clientsocket.set_socket(SocketAsync(ecrivain))
+        self.adresse = ecrivain.get_extra_info("peername")
+        self.type_client = None
+        self.nom = None
+        self.id = -1
+        self.actif = True
+        # commandes reçues du joueur et pas encore jouées, chacune avec son numéro: le joueur
+        # répond à chaque état reçu, sa n-ième commande répond donc à l'état du tour n
+        self.commandes = asyncio.Queue()
+        self.nb_commandes = 0
+        # mode de diffusion d'un afficheur (voir serveur.mode_flux): l'état reçu pendant
+        # l'intervalle qui suit un envoi est mis en attente et remplacé par le suivant
+        self.par_tour = False
+        self.intervalle = 0
+        self.avec_evenements = False
+        self.prochain_jeu = 0
+        self.en_attente = None
+        # afficheur en retard (tampon d'envoi plein): fonction retournant le jeu le plus
+        # récent, qui lui sera envoyé quand son tampon se sera vidé
+        self.source_en_retard = None
+        ecrivain.transport.set_write_buffer_limits(SEUIL_TAMPON)
+
+    async def lire_message(self):
+        if self.clientsocket.binaire:
+            entete = await self.lecteur.readexactly(client.ENTETE_TRAME.size)
+            trame = await self.lecteur.readexactly(client.ENTETE_TRAME.unpack(entete)[0])
+            return trame.decode("utf-8")
+        msg = await self.lecteur.readuntil(self.clientsocket.fin_octets)
+        return msg[:-len(self.clientsocket.fin_octets)].decode("utf-8")
+
+    async def lire_commandes(self):
+        # les commandes sont lues dès leur arrivée, la partie les récupère à chaque tour
+        try:
+            while True:
+                commande = await self.lire_message()
+                self.nb_commandes += 1
+                await self.commandes.put((self.nb_commandes, commande))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        self.actif = False
+        # réveille la partie si elle attendait une commande de ce joueur
+        await self.commandes.put(None)
+
+    async def commande_du_tour(self, num_tour, echeance):
+        # retourne la commande répondant à l'état du tour num_tour, ACTION_PAR_DEFAUT si elle
+        # n'est pas arrivée à l'échéance (None pour attendre indéfiniment) et None si le joueur
+        # s'est déconnecté. Les commandes arrivées en retard, qui répondent à un tour déjà
+        # joué, sont ignorées: le joueur reste synchronisé avec la partie
+        boucle = asyncio.get_running_loop()
+        while True:
+            if not self.commandes.empty():
+                commande = self.commandes.get_nowait()
+            elif echeance is None:
+                commande = await self.commandes.get()
+            elif echeance > boucle.time():
+                try:
+                    commande = await asyncio.wait_for(self.commandes.get(), echeance-boucle.time())
+                except asyncio.TimeoutError:
+                    return ACTION_PAR_DEFAUT
+            else:
+                return ACTION_PAR_DEFAUT
+            if commande is None:
+                self.actif = False
+                return None
+            num, reponse = commande
+            if num >= num_tour:
+                return reponse
+
+    def configurer_flux(self):
+        if self.type_client == client.TYPE_AFFICHEUR:
+            self.par_tour, self.intervalle, self.avec_evenements = mode_flux(self.clientsocket.options)
+
+    def envoyer_jeu(self, jeu_str, cache_deltas=None, jeu_octets=None):
+        if not self.actif:
+            return
+        if self.intervalle:
+            boucle = asyncio.get_running_loop()
+            attente = self.prochain_jeu-boucle.time()
+            if attente > 0:
+                if self.en_attente is None:
+                    boucle.call_later(attente, self.envoyer_en_attente)
+                self.en_attente = (jeu_str, cache_deltas, jeu_octets)
+                return
+            self.prochain_jeu = boucle.time()+self.intervalle
+        try:
+            self.clientsocket.envoyer_jeu(jeu_str, self.id, cache_deltas, jeu_octets)
+        except Exception:
+            print(self.id, "est deconnecté")
+            self.actif = False
+
+    def envoyer_en_attente(self):
+        if self.en_attente is not None:
+            etat, self.en_attente = self.en_attente, None
+            self.prochain_jeu = 0
+            self.envoyer_jeu(*etat)
+
+    def sature(self):
+        # les joueurs reçoivent tous les états: la partie attend leur réponse à chacun
+        return (self.type_client != client.TYPE_JOUEUR and
+                self.ecrivain.transport.get_write_buffer_size() > SEUIL_TAMPON)
+
+    def differer(self, source):
+        # seul le dernier état en retard est gardé, les précédents sont abandonnés
+        if self.source_en_retard is None:
+            asyncio.ensure_future(self.envoyer_apres_vidage())
+        self.source_en_retard = source
+
+    async def envoyer_apres_vidage(self):
+        try:
+            await self.ecrivain.drain()
+        except Exception:
+            self.actif = False
+        self.envoyer_en_retard()
+
+    def envoyer_en_retard(self):
+        if self.source_en_retard is not None:
+            source, self.source_en_retard = self.source_en_retard, None
+            if self.actif:
+                diffuser_jeu(source(), [self])
+
+    def envoyer_evenements(self, evenements):
+        # les évènements d'un état qui ne sera pas envoyé sont abandonnés
+        if not self.actif or self.sature():
+            return
+        try:
+            self.clientsocket.envoyer_evenements(evenements, self.id)
+        except Exception:
+            print(self.id, "est deconnecté")
+            self.actif = False
+
+    def envoyer_quit(self):
+        # le dernier état en attente est envoyé avant la fin de partie
+        self.envoyer_en_retard()
+        self.envoyer_en_attente()
+        if self.actif:
+            self.clientsocket.envoyer_quit()
+
+    def envoyer_refus(self):
+        self.clientsocket.envoyer_refus()
+
+    def fermer(self):
+        self.actif = False
+        self.ecrivain.close()
+
+
+def diffuser_sans_retard(source, destinataires):
+    """diffuse le jeu retourné par source() (voir serveur.diffuser_jeu) aux destinataires
+       qui ont vidé leur tampon d'envoi; les autres le recevront, ou un plus récent, plus tard
+    """
+    prets = []
+    for dest in destinataires:
+        if dest.sature():
+            dest.differer(source)
+        else:
+            prets.append(dest)
+    if prets:
+        diffuser_jeu(source(), prets)
+
+
+class Partie(object):
+    def __init__(self, duree, nom_partie='score.csv', map='./cartes/carte.txt',
+                 nb_joueurs=NB_JOUEURS, delai=DELAI, tempo=0, nb_afficheur_max=5, nom="", nom_rejeu=None):
+        self.nom = nom
+        # le jeu a son propre générateur aléatoire: la partie se rejoue à partir de sa graine
+        graine = rejeu.nouvelle_graine()
+        self.le_jeu = jeu.Jeu(map, duree, alea=random.Random(graine))
+        self.enregistreur = None
+        if nom_rejeu:
+            # écritures groupées: la boucle d'évènements n'attend pas le disque à chaque tour
+            self.enregistreur = rejeu.Enregistreur(nom_rejeu, map, graine, PERIODE_REJEU)
+        self.nom_partie = nom_partie
+        self.nb_joueurs = nb_joueurs
+        self.nb_afficheur_max = nb_afficheur_max
+        # délai (en secondes) laissé aux joueurs pour répondre, None pour attendre indéfiniment
+        self.delai = delai
+        # pause entre deux tours pour suivre la partie sur un afficheur
+        self.tempo = tempo
+        self.joueurs = []
+        self.afficheurs = []
+        # numéro du tour dont l'état a été envoyé aux joueurs en dernier
+        self.num_tour = 0
+        self.complete = asyncio.Event()
+        self.commencee = False
+        # actions exécutées depuis le dernier état de fin de tour
+        self.evenements = []
+
+    def ajouter_joueur(self, connexion):
+        if self.commencee or len(self.joueurs) == self.nb_joueurs:
+            print("[-] Trop de joueurs déjà enregistrés")
+            return False
+        self.joueurs.append(connexion)
+        self.le_jeu.inscrire_joueur(connexion.nom)
+        connexion.id = chr(ord('A')+len(self.joueurs)-1)
+        print("[+] Nouveau joueur [%s] pour %s %s" % (connexion.nom, connexion.adresse, self.nom))
+        self.envoyer_jeu(self.afficheurs)
+        if len(self.joueurs) == self.nb_joueurs:
+            self.complete.set()
+        return True
+
+    def ajouter_afficheur(self, connexion):
+        if len(self.afficheurs) == self.nb_afficheur_max:
+            print("[-] Trop d'afficheurs déjà enregistrés")
+            return False
+        self.afficheurs.append(connexion)
+        connexion.id = len(self.afficheurs)
+        print("[+] Nouvel afficheur [%s] pour %s %s" % (connexion.nom, connexion.adresse, self.nom))
+        self.envoyer_jeu([connexion])
+        return True
+
+    def enlever_afficheur(self, connexion):
+        if connexion in self.afficheurs:
+            self.afficheurs.remove(connexion)
+            print("Afficheur", connexion.id, "déconnecté")
+
+    def envoyer_jeu(self, destinataires):
+        destinataires = [dest for dest in destinataires if dest.actif]
+        if destinataires:
+            # un afficheur en retard recevra le jeu tel qu'il sera quand son tampon se sera vidé
+            diffuser_sans_retard(lambda: self.le_jeu, destinataires)
+
+    async def recolter_reponses(self):
+        # tous les joueurs partagent la même échéance, fixée à l'envoi de l'état
+        boucle = asyncio.get_running_loop()
+        echeance = None if self.delai is None else boucle.time()+self.delai
+        reponses = {}
+        for joueur in self.joueurs:
+            reponse = ""
+            if joueur.actif:
+                reponse = await joueur.commande_du_tour(self.num_tour, echeance)
+                if reponse is None:
+                    print("Joueur", joueur.id, "déconnecté")
+                    reponse = ""
+            reponses[joueur.id] = reponse
+        return reponses
+
+    def apres_action(self, coul, actions):
+        if self.enregistreur is not None:
+            self.enregistreur.apres_action(coul, actions)
+        # les afficheurs qui ont demandé un état par tour ne reçoivent que celui de fin de tour
+        self.evenements.append((coul, actions))
+        self.envoyer_jeu([afficheur for afficheur in self.afficheurs if not afficheur.par_tour])
+
+    def envoyer_evenements(self):
+        evenements, self.evenements = self.evenements, []
+        if evenements:
+            for afficheur in self.afficheurs:
+                if afficheur.avec_evenements:
+                    afficheur.envoyer_evenements(evenements)
+
+    async def jouer(self):
+        await self.complete.wait()
+        self.commencee = True
+        print("C'est parti!!!", self.nom)
+        if self.enregistreur is not None:
+            self.enregistreur.commencer(self.le_jeu)
+        self.num_tour = 1
+        self.envoyer_jeu(self.joueurs+self.afficheurs)
+        while True:
+            reponses = await self.recolter_reponses()
+            # L'ordre d'exécution des actions des joueurs est aléatoire
+            self.le_jeu.tour_de_jeu(reponses, apres_action=self.apres_action)
+            if self.enregistreur is not None:
+                self.enregistreur.fin_tour()
+            self.envoyer_evenements()
+            if self.le_jeu.est_fini():
+                self.envoyer_jeu([afficheur for afficheur in self.afficheurs if afficheur.par_tour])
+                break
+            if self.tempo:
+                await asyncio.sleep(self.tempo)
+            self.num_tour += 1
+            self.envoyer_jeu(self.joueurs+self.afficheurs)
+        print("Partie terminée", self.nom)
+        self.terminer()
+        self.le_jeu.sauver_score(self.nom_partie)
+        if self.enregistreur is not None:
+            self.enregistreur.terminer(self.le_jeu)
+
+    def terminer(self):
+        for connexion in self.joueurs+self.afficheurs:
+            try:
+                connexion.envoyer_quit()
+            except Exception:
+                pass
+            connexion.fermer()
+
+
+def partie_from_str(description, delai=DELAI, tempo=0, enregistrer=True):
+    """crée une partie à partir de sa description nom[,map[,duree[,nb_joueurs]]].
+       Le score de la partie est sauvé dans le fichier score_nom.csv et, si enregistrer est
+       vrai, la partie est enregistrée dans rejeu_nom_AAAAMMJJ_HHMMSS.jsonl.gz
+    """
+    nom, *reste = description.split(",")
+    map = reste[0] if len(reste) > 0 and reste[0] != "" else './cartes/carte.txt'
+    duree = int(reste[1]) if len(reste) > 1 else 200
+    nb_joueurs = int(reste[2]) if len(reste) > 2 else NB_JOUEURS
+    return Partie(duree, "score_"+nom+".csv", map, nb_joueurs, delai, tempo, nom=nom,
+                  nom_rejeu=rejeu.nom_par_defaut(nom) if enregistrer else None)
+
+
+class ServeurAsync(object):
+    def __init__(self, serveur, port, parties):
+        self.serveur = serveur
+        self.port = port
+        # les parties hébergées par nom, la première est celle des clients qui n'en choisissent pas
+        if isinstance(parties, Partie):
+            parties = [parties]
+        self.parties = {partie.nom: partie for partie in parties}
+        self.partie_par_defaut = parties[0]
+        # tâches gérant les clients connectés
+        self.taches_clients = set()
+
+    async def gerer_client(self, lecteur, ecrivain):
+        tache = asyncio.current_task()
+        self.taches_clients.add(tache)
+        try:
+            await self.traiter_client(lecteur, ecrivain)
+        finally:
+            self.taches_clients.discard(tache)
+
+    async def traiter_client(self, lecteur, ecrivain):
+        connexion = Connexion(lecteur, ecrivain)
+        print("Connexion de %s" % (connexion.adresse,))
+        try:
+            msg = await connexion.lire_message()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            connexion.fermer()
+            return
+        connexion.type_client, connexion.nom = connexion.clientsocket.lire_enregistrement(msg)
+        connexion.configurer_flux()
+        partie = self.choisir_partie(connexion)
+        if partie is None:
+            print("[-] Partie inconnue", connexion.clientsocket.options.get(client.OPTION_PARTIE))
+        elif connexion.type_client == client.TYPE_JOUEUR:
+            if partie.ajouter_joueur(connexion):
+                await connexion.lire_commandes()
+                return
+        elif connexion.type_client == client.TYPE_AFFICHEUR:
+            if partie.ajouter_afficheur(connexion):
+                # un afficheur n'envoie rien, on attend seulement sa déconnexion
+                await lecteur.read()
+                connexion.actif = False
+                partie.enlever_afficheur(connexion)
+                return
+        else:
+            print("[-] Type de client inconnu")
+        connexion.envoyer_refus()
+        connexion.fermer()
+
+    def choisir_partie(self, connexion):
+        nom = connexion.clientsocket.options.get(client.OPTION_PARTIE)
+        if nom is None:
+            return self.partie_par_defaut
+        return self.parties.get(nom)
+
+    async def lancer(self):
+        ecouteur = await asyncio.start_server(self.gerer_client, self.serveur, self.port)
+        print("En écoute...")
+        async with ecouteur:
+            # les parties se déroulent en parallèle, le serveur s'arrête quand toutes sont finies
+            await asyncio.gather(*(partie.jouer() for partie in self.parties.values()))
+            # les connexions sont fermées: on laisse chaque tâche client se terminer
+            await asyncio.gather(*self.taches_clients, return_exceptions=True)
+
+
+if __name__ == '__main__':
+    print("Bienvenue dans le jeu de Splat'IUT'O")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serveur", dest="serveur", help="serveur de jeu", type=str, default='localhost')
+    parser.add_argument("--port", dest="port", help="port de connexion", type=int, default=1111)
+    parser.add_argument("--nom_partie", dest="nom_partie", help="nom de la partie", type=str, default='score.csv')
+    parser.add_argument("--duree", dest="duree", help="nombre de tours de la partie", type=int, default=200)
+    parser.add_argument("--map", dest="map", help="fichier contenant la map", type=str, default='./cartes/carte.txt')
+    parser.add_argument("--nb_joueurs", dest="nb_joueurs", help="nombre de joueurs attendus avant de commencer",
+                        type=int, default=NB_JOUEURS)
+    parser.add_argument("--delai", dest="delai", help="délai de réponse des joueurs en secondes (0 pour attendre indéfiniment)",
+                        type=float, default=DELAI)
+    parser.add_argument("--tempo", dest="tempo", help="pause entre deux tours en secondes", type=float, default=0)
+    parser.add_argument("--partie", dest="parties", help="partie hébergée sous la forme nom[,map[,duree[,nb_joueurs]]] "
+                        "(option répétable, remplace --nom_partie, --map, --duree et --nb_joueurs)",
+                        action="append", default=[])
+    parser.add_argument("--rejeu", dest="rejeu", help="fichier où enregistrer la partie (voir rejeu.py, par défaut "
+                        "rejeu_AAAAMMJJ_HHMMSS.jsonl.gz); avec --partie chaque partie est enregistrée dans "
+                        "rejeu_nom_AAAAMMJJ_HHMMSS.jsonl.gz", type=str, default=None)
+    parser.add_argument("--sans_rejeu", dest="sans_rejeu", help="ne pas enregistrer les parties", action="store_true")
+
+    args = parser.parse_args()
+
+    delai = args.delai if args.delai > 0 else None
+    if args.parties:
+        parties = [partie_from_str(description, delai, args.tempo, not args.sans_rejeu)
+                   for description in args.parties]
+    else:
+        nom_rejeu = None if args.sans_rejeu else args.rejeu or rejeu.nom_par_defaut()
+        parties = [Partie(args.duree, args.nom_partie, args.map, args.nb_joueurs, delai, args.tempo,
+                          nom_rejeu=nom_rejeu)]
+    asyncio.run(ServeurAsync(args.serveur, args.port, parties).lancer())
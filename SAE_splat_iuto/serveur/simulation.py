@@ -0,0 +1,131 @@
+# coding: utf-8
+"""
+Simulation de parties sans serveur ni sockets.
+
+Les IA sont des fonctions ayant la même signature que mon_IA de bot_ia/client_joueur.py:
+mon_IA(ma_couleur, carac_jeu, le_plateau, les_joueurs). Elles sont appelées directement
+à chaque tour avec l'état du jeu construit comme le ferait client_joueur.py: par défaut
+un plateau compact construit sans passer par une chaine de caractères, ou le plateau
+classique décodé depuis jeu_2_str avec l'option via_chaine.
+
+Exemple: python -m serveur.simulation --nb_parties 100 --ia bot_ia.client_joueur --ia mon_module:mon_IA
+"""
+
+import argparse
+import importlib
+import random
+import time
+
+from serveur import jeu
+from bot_ia import joueur as joueur_ia
+from bot_ia import plateau as plateau_ia
+from bot_ia import plateau_compact
+
+NOMS_CARACTERISTIQUES = ["duree_actuelle", "duree_totale", "reserve_initiale", "duree_obj", "penalite",
+                         "bonus_touche", "bonus_recharge", "bonus_objet", "distance_max"]
+
+
+def charger_ia(description):
+    """retourne la fonction désignée par module[:fonction] (mon_IA par défaut)"""
+    nom_module, _, nom_fonction = description.partition(":")
+    return getattr(importlib.import_module(nom_module), nom_fonction or "mon_IA")
+
+
+class Simulation(object):
+    def __init__(self, ias, map='./cartes/carte.txt', duree=200, noms=None, via_chaine=False, graine=None):
+        # générateur propre à la partie (comme JeuThread): le générateur global n'est pas réinitialisé
+        self.le_jeu = jeu.Jeu(map, duree, alea=random.Random(graine))
+        self.via_chaine = via_chaine
+        self.ias = {}
+        for ind, ia in enumerate(ias):
+            nom = noms[ind] if noms is not None else getattr(ia, "__module__", "ia")
+            self.le_jeu.inscrire_joueur(nom)
+            self.ias[chr(ord('A')+ind)] = ia
+        # plateau de chaque joueur au tour précédent (mis à jour d'un tour à l'autre)
+        self.plateaux = {}
+
+    def carac_jeu(self):
+        return dict(zip(NOMS_CARACTERISTIQUES, self.le_jeu.carac_jeu()))
+
+    def joueurs_ia(self):
+        joueurs = {}
+        for coul, le_joueur in self.le_jeu.les_joueurs.items():
+            joueurs[coul] = joueur_ia.Joueur(coul, le_joueur.nom, le_joueur.reserve, le_joueur.surface,
+                                             le_joueur.points, le_joueur.pos, le_joueur.objet,
+                                             le_joueur.duree_objet)
+        return joueurs
+
+    def actions_directes(self):
+        le_plateau = self.le_jeu.plateau
+        grille, pos_joueurs, pos_objets = le_plateau.plateau_2_octets()
+        carac_jeu = self.carac_jeu()
+        actions = {}
+        for coul, ia in self.ias.items():
+            # chaque IA reçoit sa propre copie de l'état, qu'elle peut modifier
+            self.plateaux[coul] = plateau_compact.plateau_from_octets(
+                le_plateau.nb_lignes, le_plateau.nb_colonnes, grille, pos_joueurs, pos_objets,
+                self.plateaux.get(coul))
+            actions[coul] = ia(coul, carac_jeu, self.plateaux[coul], self.joueurs_ia())
+        return actions
+
+    def actions_via_chaine(self):
+        val_carac_jeu, etat_plateau, les_joueurs = self.le_jeu.jeu_2_str().split("-"*20+"\n")
+        carac_jeu = dict(zip(NOMS_CARACTERISTIQUES, map(int, val_carac_jeu.split(";"))))
+        actions = {}
+        for coul, ia in self.ias.items():
+            joueurs = {}
+            for ligne in les_joueurs[:-1].split('\n'):
+                le_joueur = joueur_ia.joueur_from_str(ligne)
+                joueurs[joueur_ia.get_couleur(le_joueur)] = le_joueur
+            le_plateau = self.plateaux.get(coul)
+            if le_plateau is None or plateau_ia.maj_plateau(le_plateau, etat_plateau) is None:
+                le_plateau = plateau_ia.Plateau(etat_plateau)
+                self.plateaux[coul] = le_plateau
+            actions[coul] = ia(coul, dict(carac_jeu), le_plateau, joueurs)
+        return actions
+
+    def jouer_tour(self):
+        if self.via_chaine:
+            actions = self.actions_via_chaine()
+        else:
+            actions = self.actions_directes()
+        return self.le_jeu.tour_de_jeu(actions)
+
+    def jouer(self):
+        while not self.le_jeu.est_fini():
+            self.jouer_tour()
+        return self.scores()
+
+    def scores(self):
+        return {coul: le_joueur.points for coul, le_joueur in self.le_jeu.les_joueurs.items()}
+
+
+def simuler(ias, map='./cartes/carte.txt', duree=200, noms=None, graine=None, via_chaine=False):
+    """joue une partie complète et retourne le dictionnaire {couleur: points}"""
+    return Simulation(ias, map, duree, noms, via_chaine, graine).jouer()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--map", dest="map", help="fichier contenant la map", type=str, default='./cartes/carte.txt')
+    parser.add_argument("--duree", dest="duree", help="nombre de tours de la partie", type=int, default=200)
+    parser.add_argument("--nb_parties", dest="nb_parties", help="nombre de parties à jouer", type=int, default=1)
+    parser.add_argument("--graine", dest="graine", help="graine du générateur aléatoire", type=int, default=None)
+    parser.add_argument("--ia", dest="ias", help="IA sous la forme module[:fonction] (une par joueur)",
+                        action="append", default=[])
+    parser.add_argument("--via_chaine", dest="via_chaine", help="transmettre l'état aux IA sous forme de chaine",
+                        action="store_true")
+    args = parser.parse_args()
+
+    descriptions = args.ias or ["bot_ia.client_joueur"]*4
+    ias = [charger_ia(description) for description in descriptions]
+    if args.graine is not None:
+        # seules les IA tirent dans le générateur global: on le fixe une fois pour tout le script
+        random.seed(args.graine)
+    debut = time.perf_counter()
+    for num_partie in range(args.nb_parties):
+        graine = None if args.graine is None else args.graine+num_partie
+        scores = simuler(ias, args.map, args.duree, descriptions, graine, args.via_chaine)
+        print(num_partie, ";".join(str(scores[coul]) for coul in sorted(scores)))
+    duree = time.perf_counter()-debut
+    print("%d parties en %.1f s (%.0f parties par heure)" % (args.nb_parties, duree, args.nb_parties*3600/duree))
@@ -0,0 +1,138 @@
+# coding: utf-8
+"""
+Tournoi entre IA joué en parallèle sur tous les processeurs.
+
+Chaque match est une simulation sans sockets (voir simulation.py). D'un match à l'autre
+on fait tourner les cartes du répertoire cartes/, l'ordre des sièges (chaque IA joue
+successivement chaque couleur) et la graine du générateur aléatoire.
+
+Les résultats sont écrits dans deux fichiers CSV:
+ - un détail par match et par joueur (carte, graine, siège, points, surface, rang)
+ - un résumé par IA: points et surface moyens, taux de victoire et leurs intervalles
+   de confiance à 95%
+
+Exemple: python -m serveur.tournoi --nb_parties 200 --ia bot_ia.client_joueur --ia mon_module:mon_IA
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import math
+import os
+import random
+
+from serveur import simulation
+
+Z_95 = 1.96
+
+
+def liste_matchs(ias, cartes, nb_parties, graine):
+    """retourne la description de chaque match: (num, carte, graine, ias dans l'ordre des sièges)"""
+    matchs = []
+    for num in range(nb_parties):
+        decalage = num % len(ias)
+        matchs.append((num, cartes[num % len(cartes)], graine+num, ias[decalage:]+ias[:decalage]))
+    return matchs
+
+
+def jouer_match(num, carte, graine, ias, duree, via_chaine=False):
+    """joue un match (dans un processus du pool) et retourne une ligne par siège"""
+    random.seed(graine)
+    partie = simulation.Simulation([simulation.charger_ia(ia) for ia in ias], carte, duree, ias, via_chaine)
+    partie.jouer()
+    classement = [joueur.couleur for joueur in partie.le_jeu.classement()]
+    res = []
+    for coul, le_joueur in partie.le_jeu.les_joueurs.items():
+        res.append({"match": num, "carte": os.path.basename(carte), "graine": graine, "siege": coul,
+                    "ia": le_joueur.nom, "points": le_joueur.points, "surface": le_joueur.surface,
+                    "rang": classement.index(coul)+1})
+    return res
+
+
+def moyenne_ic(valeurs):
+    """retourne la moyenne des valeurs et la demi-largeur de son intervalle de confiance à 95%"""
+    nb = len(valeurs)
+    moyenne = sum(valeurs)/nb
+    if nb < 2:
+        return moyenne, 0.0
+    variance = sum((val-moyenne)**2 for val in valeurs)/(nb-1)
+    return moyenne, Z_95*math.sqrt(variance/nb)
+
+
+def resumer(resultats):
+    """regroupe les résultats par IA. Une victoire est partagée entre les ex-aequo"""
+    par_match = {}
+    for ligne in resultats:
+        par_match.setdefault(ligne["match"], []).append(ligne)
+    stats = {}
+    for lignes in par_match.values():
+        meilleur = max(ligne["points"] for ligne in lignes)
+        gagnants = [ligne for ligne in lignes if ligne["points"] == meilleur]
+        for ligne in lignes:
+            stat = stats.setdefault(ligne["ia"], {"matchs": set(), "points": [], "surface": [], "victoires": []})
+            stat["matchs"].add(ligne["match"])
+            stat["points"].append(ligne["points"])
+            stat["surface"].append(ligne["surface"])
+            stat["victoires"].append(1/len(gagnants) if ligne in gagnants else 0)
+    resume = []
+    for ia, stat in stats.items():
+        points, ic_points = moyenne_ic(stat["points"])
+        surface, ic_surface = moyenne_ic(stat["surface"])
+        victoires, ic_victoires = moyenne_ic(stat["victoires"])
+        resume.append({"ia": ia, "nb_matchs": len(stat["matchs"]), "nb_sieges": len(stat["points"]),
+                       "points": round(points, 1), "ic_points": round(ic_points, 1),
+                       "surface": round(surface, 1), "ic_surface": round(ic_surface, 1),
+                       "taux_victoire": round(victoires, 3), "ic_victoire": round(ic_victoires, 3)})
+    resume.sort(key=lambda x: x["points"], reverse=True)
+    return resume
+
+
+def sauver_csv(nom_fic, lignes, separateur=";"):
+    with open(nom_fic, "w") as fic:
+        if lignes:
+            fic.write(separateur.join(lignes[0].keys())+"\n")
+        for ligne in lignes:
+            fic.write(separateur.join(str(val) for val in ligne.values())+"\n")
+
+
+def tournoi(ias, cartes, nb_parties, duree=200, graine=0, nb_processus=None, via_chaine=False):
+    """joue tous les matchs du tournoi et retourne la liste des résultats par match et par siège"""
+    resultats = []
+    with concurrent.futures.ProcessPoolExecutor(nb_processus) as pool:
+        taches = [pool.submit(jouer_match, num, carte, graine_match, ias_match, duree, via_chaine)
+                  for num, carte, graine_match, ias_match in liste_matchs(ias, cartes, nb_parties, graine)]
+        for tache in concurrent.futures.as_completed(taches):
+            resultats.extend(tache.result())
+    resultats.sort(key=lambda x: (x["match"], x["siege"]))
+    return resultats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ia", dest="ias", help="IA sous la forme module[:fonction] (une par joueur)",
+                        action="append", default=[])
+    parser.add_argument("--cartes", dest="cartes", help="répertoire des cartes utilisées à tour de rôle",
+                        type=str, default='./cartes')
+    parser.add_argument("--nb_parties", dest="nb_parties", help="nombre de matchs", type=int, default=100)
+    parser.add_argument("--duree", dest="duree", help="nombre de tours de chaque match", type=int, default=200)
+    parser.add_argument("--graine", dest="graine", help="graine du premier match", type=int, default=0)
+    parser.add_argument("--processus", dest="processus", help="nombre de processus (tous les coeurs par défaut)",
+                        type=int, default=None)
+    parser.add_argument("--via_chaine", dest="via_chaine", help="transmettre l'état aux IA sous forme de chaine",
+                        action="store_true")
+    parser.add_argument("--sortie", dest="sortie", help="fichier CSV du détail des matchs", type=str,
+                        default='tournoi.csv')
+    parser.add_argument("--resume", dest="resume", help="fichier CSV du résumé par IA", type=str,
+                        default='tournoi_resume.csv')
+    args = parser.parse_args()
+
+    ias = args.ias or ["bot_ia.client_joueur"]*4
+    cartes = sorted(glob.glob(os.path.join(args.cartes, "*.txt")))
+    resultats = tournoi(ias, cartes, args.nb_parties, args.duree, args.graine, args.processus, args.via_chaine)
+    sauver_csv(args.sortie, resultats)
+    resume = resumer(resultats)
+    sauver_csv(args.resume, resume)
+    for ligne in resume:
+        print("%s: %d matchs, points %.1f ± %.1f, victoires %.1f%% ± %.1f%%" %
+              (ligne["ia"], ligne["nb_matchs"], ligne["points"], ligne["ic_points"],
+               100*ligne["taux_victoire"], 100*ligne["ic_victoire"]))
@@ -0,0 +1,76 @@
+import os
+import random
+
+import pytest
+
+from bot_ia import adversaires
+from bot_ia import case
+from bot_ia import const
+from bot_ia import plateau
+from bot_ia import plateau_compact
+from serveur import simulation
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+ACTIONS = [peinture + deplacement for peinture in "XNESO" for deplacement in "NESO"]
+
+
+def etat(partie, compact):
+    plan = partie.le_jeu.plateau.plateau_2_str()
+    le_plateau = plateau_compact.Plateau(plan) if compact else plateau.Plateau(plan)
+    return partie.carac_jeu(), le_plateau, partie.joueurs_ia()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_observer(compact):
+    # les actions retrouvées sont celles jouées sur le serveur
+    random.seed(3)
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    historique = adversaires.Historique('A')
+    adversaires.observer(historique, *etat(partie, compact))
+    nb_peintures = 0
+    for _ in range(40):
+        avant = partie.joueurs_ia()
+        actions = {coul: random.choice(ACTIONS) for coul in "ABCD"}
+        partie.le_jeu.tour_de_jeu(actions)
+        adversaires.observer(historique, *etat(partie, compact))
+        apres = partie.joueurs_ia()
+        for coul in "BCD":
+            position, peinture, deplacement = historique["actions"][coul][-1]
+            assert position == avant[coul]["position"]
+            assert deplacement == (actions[coul][1] if apres[coul]["position"] != position else 'X')
+            if avant[coul]["objet"] != const.BOMBE:
+                assert peinture in ('X', actions[coul][0])
+            nb_peintures += peinture != 'X'
+    assert 'A' not in historique["actions"]
+    assert len(historique["actions"]['B']) == adversaires.TAILLE_HISTORIQUE
+    assert nb_peintures > 0
+    # un tour manqué réinitialise l'historique
+    partie.le_jeu.tour_de_jeu({coul: "XN" for coul in "ABCD"})
+    partie.le_jeu.tour_de_jeu({coul: "XS" for coul in "ABCD"})
+    adversaires.observer(historique, *etat(partie, compact))
+    assert historique["actions"] == {}
+
+
+def test_predictions():
+    random.seed(4)
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    carac_jeu, le_plateau, les_joueurs = etat(partie, True)
+    historique = adversaires.Historique('A')
+    adversaires.observer(historique, carac_jeu, le_plateau, les_joueurs)
+    for _ in range(adversaires.TAILLE_HISTORIQUE + 5):
+        adversaires.ajouter_action(historique, 'B', (0, 0), 'E', 'S')
+    assert sum(historique["nb_peintures"]['B'].values()) == adversaires.TAILLE_HISTORIQUE
+    probas = adversaires.distribution_peintures(historique, 'B')
+    assert probas['E'] > 0.8 and sum(probas.values()) == pytest.approx(1)
+
+    predictions = adversaires.predictions(historique, le_plateau, carac_jeu["distance_max"])
+    assert predictions is adversaires.predictions(historique, le_plateau, carac_jeu["distance_max"])
+    for coul in "BCD":
+        assert sum(predictions["positions"][coul].values()) == pytest.approx(1)
+    lig, col = les_joueurs['B']["position"]
+    est = (lig, col + 1)
+    if plateau.est_sur_plateau(le_plateau, est) and not case.est_mur(plateau.get_case(le_plateau, est)):
+        assert adversaires.menace(historique, le_plateau, carac_jeu["distance_max"], est) > 0.8
+    for coul in "BCD":
+        assert 0 <= adversaires.presence_attendue(historique, le_plateau, carac_jeu["distance_max"],
+                                                  predictions["positions"][coul]) <= 3
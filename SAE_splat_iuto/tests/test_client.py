@@ -0,0 +1,108 @@
+import os
+import socket
+
+from bot_ia import client
+from bot_ia import plateau
+from bot_ia import plateau_compact
+from serveur import jeu
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def nouveau_jeu():
+    le_jeu = jeu.Jeu(CARTE, 50)
+    for nom in ("un", "deux", "trois"):
+        le_jeu.inscrire_joueur(nom)
+    return le_jeu
+
+
+def test_delta_jeu():
+    le_jeu = nouveau_jeu()
+    ancien = le_jeu.jeu_2_str()
+    for coul, actions in (("A", "NE"), ("B", "SO"), ("C", "EN")):
+        le_jeu.executer_actions(coul, actions)
+    le_jeu.maj_surface()
+    le_jeu.fin_tour()
+    le_jeu.ajouter_objet()
+    nouveau = le_jeu.jeu_2_str()
+    delta = client.delta_jeu(ancien, nouveau)
+    assert len(delta) < len(nouveau)
+    assert client.appliquer_delta(ancien, delta) == nouveau
+    assert client.appliquer_delta(nouveau, client.delta_jeu(nouveau, nouveau)) == nouveau
+
+
+def test_delta_dimensions_differentes():
+    ancien = nouveau_jeu().jeu_2_str()
+    autre = ancien.replace("14;14\n", "14;15\n")
+    assert client.delta_jeu(ancien, autre) is None
+
+
+def test_options():
+    assert client.options_from_str("delta,partie=finale") == {"delta": "", "partie": "finale"}
+    assert client.options_2_str({"delta": "", "partie": "finale"}) == "delta,partie=finale"
+    assert client.options_2_str(["delta"]) == "delta"
+
+
+def test_jeu_binaire():
+    le_jeu = nouveau_jeu()
+    le_jeu.executer_actions("A", "NE")
+    le_jeu.ajouter_objet()
+    le_jeu.les_joueurs["B"].nom = "un nom bien trop long pour tenir dans trente-deux octets"
+    trame = le_jeu.jeu_2_octets()
+    etat = client.decoder_jeu(trame)
+    assert etat["carac_jeu"] == tuple(le_jeu.carac_jeu())
+    assert etat["joueurs"][1][-1] == "un nom bien trop long pour tenir"
+    le_jeu.les_joueurs["B"].nom = etat["joueurs"][1][-1]
+    copie = jeu.Jeu()
+    copie.jeu_from_octets(trame)
+    assert copie.jeu_2_str() == le_jeu.jeu_2_str()
+
+    _, plan, _ = le_jeu.jeu_2_str().split(client.SEPARATEUR_JEU)
+    p_octets = plateau_compact.plateau_from_octets(etat["nb_lignes"], etat["nb_colonnes"], etat["grille"],
+                                                   etat["pos_joueurs"], etat["pos_objets"])
+    p_texte = plateau_compact.Plateau(plan)
+    for cle in ("murs", "couleurs", "objets", "joueurs"):
+        assert p_octets[cle] == p_texte[cle]
+    le_jeu.executer_actions("B", "SO")
+    etat = client.decoder_jeu(le_jeu.jeu_2_octets())
+    suivant = plateau_compact.plateau_from_octets(etat["nb_lignes"], etat["nb_colonnes"], etat["grille"],
+                                                  etat["pos_joueurs"], etat["pos_objets"], p_octets)
+    assert len(plateau.get_cases_modifiees(suivant)) > 0
+
+
+def test_reception_morcelee():
+    cote_a, cote_b = socket.socketpair()
+    emetteur = client.ClientCyber()
+    emetteur.set_socket(cote_a)
+    recepteur = client.ClientCyber(taille_chunk=7)
+    recepteur.set_socket(cote_b)
+    messages = ["jeu;A\n" + "é" * 50, "", "XN", "àççà" * 20]
+    for msg in messages:
+        emetteur.envoi(msg)
+    for msg in messages:
+        assert recepteur.reception() == msg
+    emetteur.binaire = recepteur.binaire = True
+    emetteur.envoi_octets(b"jeu;B\n", bytes(range(256)) * 3)
+    emetteur.envoi("quit\n")
+    assert recepteur.reception_octets() == b"jeu;B\n" + bytes(range(256)) * 3
+    assert recepteur.reception() == "quit\n"
+    cote_a.close()
+    assert recepteur.reception() == ""
+    cote_b.close()
+
+
+def test_evenements():
+    cote_a, cote_b = socket.socketpair()
+    emetteur = client.ClientCyber()
+    emetteur.set_socket(cote_a)
+    recepteur = client.ClientCyber()
+    recepteur.set_socket(cote_b)
+    le_jeu = nouveau_jeu()
+    evenements = [("B", "NE"), ("A", "XS"), ("C", "")]
+    emetteur.envoyer_evenements(evenements, 1)
+    emetteur.envoyer_jeu(le_jeu.jeu_2_str(), 1)
+    # les actions du tour sont lues avec l'état qui les suit
+    assert recepteur.prochaine_commande() == (True, "1", le_jeu.jeu_2_str())
+    assert recepteur.evenements == evenements
+    cote_a.close()
+    cote_b.close()
@@ -0,0 +1,77 @@
+from bot_ia import const
+from bot_ia import distances
+from bot_ia import inondation
+from bot_ia import plateau
+from bot_ia import plateau_compact
+
+from test_plateau import plateau1, plateau2
+
+
+def test_distances():
+    p1 = plateau.Plateau(plateau1)
+    table = distances.table_distances(p1)
+    assert distances.distance(table, (1, 2), (3, 1)) == 3
+    assert distances.direction(table, (1, 2), (3, 1)) == 'S'
+    assert distances.distance(table, (1, 2), (0, 0)) is None
+    assert distances.direction(table, (1, 2), (1, 2)) is None
+    assert distances.plus_proche(table, (1, 2), [(3, 1), (0, 1), (2, 2)]) == (1, (2, 2), 'S')
+    assert distances.plus_proche(table, (1, 2), [(3, 1)], 2) is None
+
+
+def test_comme_inondation():
+    for p2 in (plateau.Plateau(plateau2), plateau_compact.Plateau(plateau2)):
+        table = distances.table_distances(p2)
+        for lig in range(plateau.get_nb_lignes(p2)):
+            for col in range(plateau.get_nb_colonnes(p2)):
+                if plateau.get_case(p2, (lig, col))["mur"]:
+                    continue
+                for objet in (None, const.BOMBE, const.BIDON):
+                    for distance_max in (3, 100):
+                        res = inondation.Inondation(p2, (lig, col), distance_max, recherche='O', O_cherche=objet)
+                        proche = distances.plus_proche(table, (lig, col),
+                                                       distances.positions_objets(p2, objet), distance_max)
+                        if res:
+                            (dist, pos), infos = next(iter(res.items()))
+                            assert proche == (dist, pos, infos['Direction'])
+                        else:
+                            assert proche is None or proche[0] == 0
+
+
+def test_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(distances, "TABLES_CALCULEES", {})
+    table = distances.table_distances(plateau.Plateau(plateau2), str(tmp_path))
+    assert len(table["lignes"]) == table["nb_cases"]
+    assert len(list(tmp_path.iterdir())) == 1
+    monkeypatch.setattr(distances, "TABLES_CALCULEES", {})
+    monkeypatch.setattr(distances, "calculer_table", None)
+    assert distances.table_distances(plateau.Plateau(plateau2), str(tmp_path)) == table
+
+
+def test_lignes_a_la_demande(tmp_path, monkeypatch):
+    # au delà de TAILLE_MAX cases rien n'est sauvé: les lignes sont calculées à la demande
+    monkeypatch.setattr(distances, "TABLES_CALCULEES", {})
+    monkeypatch.setattr(distances, "TAILLE_MAX", 3)
+    monkeypatch.setattr(distances, "MEMOIRE_MAX", 5 * 2 * 16)
+    p1 = plateau.Plateau(plateau1)
+    table = distances.table_distances(p1, str(tmp_path))
+    assert list(tmp_path.iterdir()) == [] and table["lignes"] == {}
+    assert distances.distance(table, (1, 2), (3, 1)) == 3
+    assert distances.direction(table, (3, 1), (1, 2)) == 'E'
+    assert distances.plus_proche(table, (2, 2), [(3, 1)]) == (2, (3, 1), 'S')
+    # seules les lignes les plus récentes sont conservées
+    assert len(table["lignes"]) == table["nb_lignes_max"] < 3
+
+
+def test_cartes_oubliees(monkeypatch):
+    # seules les tables des NB_CARTES_MAX dernières cartes restent en mémoire
+    monkeypatch.setattr(distances, "TABLES_CALCULEES", {})
+    monkeypatch.setattr(distances, "NB_CARTES_MAX", 1)
+    table1 = distances.table_distances(plateau.Plateau(plateau1))
+    assert list(distances.TABLES_CALCULEES.values()) == [table1]
+    table2 = distances.table_distances(plateau.Plateau(plateau2))
+    assert list(distances.TABLES_CALCULEES.values()) == [table2]
+    assert distances.table_distances(plateau.Plateau(plateau1)) is not table1
+    monkeypatch.setattr(distances, "NB_CARTES_MAX", 2)
+    table2 = distances.table_distances(plateau.Plateau(plateau2))
+    assert distances.table_distances(plateau.Plateau(plateau2)) is table2
+    assert len(distances.TABLES_CALCULEES) == 2
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from bot_ia import evaluation
+from bot_ia import plateau
+from bot_ia import plateau_compact
+
+from test_plateau import plateau1, plateau2
+
+
+@pytest.mark.parametrize("avec_numpy", [True, False])
+def test_evaluer_peintures(monkeypatch, avec_numpy):
+    if not avec_numpy:
+        monkeypatch.setattr(evaluation, "numpy", None)
+    elif evaluation.numpy is None:
+        pytest.skip("numpy n'est pas installé")
+    monkeypatch.setattr(evaluation, "SEUIL_NUMPY", 0)
+    random.seed(1)
+    for plan in (plateau1, plateau2):
+        for le_plateau in (plateau.Plateau(plan), plateau_compact.Plateau(plan)):
+            tireurs = []
+            for lig in range(le_plateau["nb_lignes"]):
+                for col in range(le_plateau["nb_colonnes"]):
+                    if not plateau.get_case(le_plateau, (lig, col))["mur"]:
+                        tireurs.append(((lig, col), random.choice("ABCD"), random.randint(-2, 12),
+                                        random.random() < 0.3))
+            for distance_max in (1, 3, 5):
+                resultats = evaluation.evaluer_tireurs(le_plateau, tireurs, distance_max)
+                for (pos, couleur, reserve, transperce), res in zip(tireurs, resultats):
+                    for direction in evaluation.DIRECTIONS:
+                        attendu = plateau.peindre(le_plateau, pos, direction, couleur, reserve, distance_max,
+                                                  transperce, True)
+                        attendu["nb_joueurs_portee"] = plateau.nb_joueurs_direction(le_plateau, pos, direction,
+                                                                                    distance_max)
+                        assert res[direction] == attendu
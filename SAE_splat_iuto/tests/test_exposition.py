@@ -0,0 +1,68 @@
+import os
+import random
+
+import pytest
+
+from bot_ia import case
+from bot_ia import const
+from bot_ia import exposition
+from bot_ia import plateau
+from bot_ia import plateau_compact
+from serveur import simulation
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def exposition_attendue(le_plateau, les_joueurs, ma_couleur, distance_max):
+    # parcours des rayons case par case
+    res = {}
+    for couleur, le_joueur in les_joueurs.items():
+        if couleur == ma_couleur or le_joueur["reserve"] <= 0:
+            continue
+        atteintes = set()
+        for direction in "NESO":
+            lig, col = le_joueur["position"]
+            d_lig, d_col = plateau.INC_DIRECTION[direction]
+            for _ in range(min(distance_max, le_joueur["reserve"])):
+                if not plateau.est_sur_plateau(le_plateau, (lig, col)):
+                    break
+                if case.est_mur(plateau.get_case(le_plateau, (lig, col))) and le_joueur["objet"] != const.PISTOLET:
+                    break
+                atteintes.add((lig, col))
+                lig, col = lig + d_lig, col + d_col
+        for pos in atteintes:
+            res[pos] = res.get(pos, 0) + 1
+    return res
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_carte_exposition(compact):
+    random.seed(6)
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    for _ in range(30):
+        plan = partie.le_jeu.plateau.plateau_2_str()
+        le_plateau = plateau_compact.Plateau(plan) if compact else plateau.Plateau(plan)
+        les_joueurs = partie.joueurs_ia()
+        les_joueurs['C']["objet"] = const.PISTOLET
+        les_joueurs['D']["reserve"] = 3
+        for distance_max in (2, 5):
+            carte = exposition.carte_exposition(le_plateau, les_joueurs, 'A', distance_max)
+            attendue = exposition_attendue(le_plateau, les_joueurs, 'A', distance_max)
+            for lig in range(le_plateau["nb_lignes"]):
+                for col in range(le_plateau["nb_colonnes"]):
+                    assert carte[lig * le_plateau["nb_colonnes"] + col] == attendue.get((lig, col), 0)
+                    assert exposition.est_exposee(carte, le_plateau, (lig, col)) == ((lig, col) in attendue)
+        partie.le_jeu.tour_de_jeu({coul: random.choice("XNESO") + random.choice("NESO") for coul in "ABCD"})
+
+
+def test_cache():
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    le_plateau = plateau_compact.Plateau(partie.le_jeu.plateau.plateau_2_str())
+    les_joueurs = partie.joueurs_ia()
+    carte = exposition.carte_exposition(le_plateau, les_joueurs, 'A', 5)
+    assert exposition.carte_exposition(le_plateau, partie.joueurs_ia(), 'A', 5) is carte
+    # notre propre position n'intervient pas
+    les_joueurs['A']["position"] = (0, 0)
+    assert exposition.carte_exposition(le_plateau, les_joueurs, 'A', 5) is carte
+    les_joueurs['B']["reserve"] = 0
+    assert exposition.carte_exposition(le_plateau, les_joueurs, 'A', 5) is not carte
@@ -0,0 +1,55 @@
+from bot_ia import case
+from bot_ia import inondation
+from bot_ia import plateau
+from bot_ia import plateau_compact
+
+from test_plateau import plateau1, plateau2
+
+
+def test_inondation():
+    for p1 in (plateau.Plateau(plateau1), plateau_compact.Plateau(plateau1)):
+        assert inondation.Inondation(p1, (1, 2), 3, arret_premier=False) == \
+            {(1, (2, 2)): {'Couleur': 'A', 'Direction': 'S'}, (1, (1, 1)): {'Joueur': {'A'}, 'Direction': 'O'},
+             (2, (3, 2)): {'Couleur': 'A', 'Direction': 'S'}, (3, (3, 1)): {'Joueur': {'B'}, 'Direction': 'S'}}
+        assert inondation.Inondation(p1, (1, 2), 3, recherche='J') == \
+            {(1, (1, 1)): {'Joueur': {'A'}, 'Direction': 'O'}}
+        assert inondation.Inondation(p1, (1, 2), 5, recherche='C', C_cherche='B') == {}
+        assert inondation.Inondation(p1, (9, 9), 5) == {}
+
+
+def test_plateaux_identiques():
+    p_dict = plateau.Plateau(plateau2)
+    p_comp = plateau_compact.Plateau(plateau2)
+    for lig in range(plateau.get_nb_lignes(p_dict)):
+        for col in range(plateau.get_nb_colonnes(p_dict)):
+            for recherche in (None, 'J', 'O', 'C', 'A'):
+                assert inondation.Inondation(p_comp, (lig, col), 6, recherche, 'A') == \
+                    inondation.Inondation(p_dict, (lig, col), 6, recherche, 'A')
+
+
+def test_murs_modifies():
+    p1 = plateau.Plateau(plateau1)
+    assert (2, (3, 2)) in inondation.Inondation(p1, (1, 2), 3, arret_premier=False)
+    plateau.set_case(p1, (2, 2), case.Case(True))
+    assert (2, (3, 2)) not in inondation.Inondation(p1, (1, 2), 3, arret_premier=False)
+
+
+def test_inondation_multiple():
+    for p2 in (plateau.Plateau(plateau2), plateau_compact.Plateau(plateau2)):
+        for lig in range(plateau.get_nb_lignes(p2)):
+            for col in range(plateau.get_nb_colonnes(p2)):
+                requetes = {('C', 'A', 3): inondation.test_couleur(p2, 'A'),
+                            ('C', None, 6): inondation.test_couleur(p2),
+                            ('A', 'A', 6): inondation.test_autre_couleur(p2, 'A'),
+                            ('O', None, 5): inondation.test_objet(p2),
+                            ('J', None, 8): inondation.test_joueur(p2)}
+                res = inondation.inondation_multiple(
+                    p2, (lig, col), {cle: (test, cle[2]) for cle, test in requetes.items()})
+                for recherche, cherche, distance_max in requetes:
+                    attendu = inondation.Inondation(p2, (lig, col), distance_max, recherche, cherche)
+                    trouve = res.get((recherche, cherche, distance_max))
+                    if trouve is None or trouve[0] == 0:
+                        assert attendu == {}
+                    else:
+                        assert list(attendu) == [trouve[:2]]
+                        assert attendu[trouve[:2]]['Direction'] == trouve[2]
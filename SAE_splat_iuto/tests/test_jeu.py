@@ -0,0 +1,97 @@
+import os
+import random
+
+from serveur import client
+from serveur import jeu
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def surfaces_par_parcours(le_plateau, nb_joueurs):
+    res = {chr(ord('A')+num_j): 0 for num_j in range(nb_joueurs)}
+    for case in le_plateau.les_valeurs:
+        coul = case.get_couleur().upper()
+        if coul != ' ':
+            res[coul] += 1
+    return res
+
+
+def test_surfaces_incrementales():
+    random.seed(4)
+    le_jeu = jeu.Jeu(CARTE, 100)
+    for nom in ("un", "deux", "trois", "quatre"):
+        le_jeu.inscrire_joueur(nom)
+    while not le_jeu.est_fini():
+        actions = {coul: random.choice("NSEOX") + random.choice("NSEO") for coul in le_jeu.les_joueurs}
+        le_jeu.tour_de_jeu(actions)
+        assert le_jeu.plateau.surfaces_peintes(4) == surfaces_par_parcours(le_jeu.plateau, 4)
+    copie = jeu.Plateau(1, 1)
+    copie.plateau_from_str(le_jeu.plateau.plateau_2_str())
+    assert copie.surfaces_peintes(4) == le_jeu.plateau.surfaces_peintes(4)
+    copie.set_case((0, 0), jeu.Case(False, 'B'))
+    assert copie.surfaces_peintes(4) == surfaces_par_parcours(copie, 4)
+
+
+def plan_par_parcours(le_plateau):
+    lignes = [str(le_plateau.nb_lignes)+";"+str(le_plateau.nb_colonnes)]
+    joueurs = []
+    objets = []
+    for lig in range(le_plateau.nb_lignes):
+        ligne = ""
+        for col in range(le_plateau.nb_colonnes):
+            case = le_plateau.get_case((lig, col))
+            if case.est_mur():
+                ligne += case.get_couleur().lower() if case.get_couleur().isalpha() else "#"
+            else:
+                ligne += case.get_couleur()
+                if case.get_objet() != 0:
+                    objets.append("%d;%d;%d" % (case.get_objet(), lig, col))
+                joueurs.extend("%s;%d;%d" % (joueur, lig, col) for joueur in case.get_joueurs())
+        lignes.append(ligne)
+    return "\n".join(lignes + [str(len(joueurs))] + joueurs + [str(len(objets))] + objets) + "\n"
+
+
+def test_plateau_2_str_incremental():
+    random.seed(8)
+    le_jeu = jeu.Jeu(CARTE, 100)
+    for nom in ("un", "deux", "trois", "quatre"):
+        le_jeu.inscrire_joueur(nom)
+    plan = le_jeu.plateau.plateau_2_str()
+    assert plan == plan_par_parcours(le_jeu.plateau)
+    # sans modification la même chaine est retournée
+    assert le_jeu.plateau.plateau_2_str() is plan
+
+    def verifier(couleur, actions):
+        assert le_jeu.plateau.plateau_2_str() == plan_par_parcours(le_jeu.plateau)
+
+    while not le_jeu.est_fini():
+        actions = {coul: random.choice("NSEOX") + random.choice("NSEO") for coul in le_jeu.les_joueurs}
+        le_jeu.tour_de_jeu(actions, apres_action=verifier)
+        verifier(None, None)
+    le_jeu.plateau.set_case((0, 0), jeu.Case(False, 'B'))
+    verifier(None, None)
+
+
+def test_delta_depuis():
+    random.seed(5)
+    le_jeu = jeu.Jeu(CARTE, 100)
+    for nom in ("un", "deux", "trois", "quatre"):
+        le_jeu.inscrire_joueur(nom)
+    etats = [le_jeu.jeu_2_str()]
+
+    def verifier(couleur, actions):
+        etat = le_jeu.jeu_2_str()
+        # delta depuis chacun des états récents, identique à l'état reconstruit par le client
+        for ancien in etats[1-jeu.NB_VERSIONS:]:
+            assert client.appliquer_delta(ancien, le_jeu.delta_depuis(ancien)) == etat
+        etats.append(etat)
+
+    while not le_jeu.est_fini():
+        actions = {coul: random.choice("NSEOX") + random.choice("NSEO") for coul in le_jeu.les_joueurs}
+        le_jeu.tour_de_jeu(actions, apres_action=verifier)
+        verifier(None, None)
+    # état trop ancien ou inconnu: le delta est calculé par comparaison des chaines
+    assert le_jeu.delta_depuis(etats[0]) is None
+    assert le_jeu.delta_depuis("inconnu") is None
+    le_jeu.plateau.set_case((0, 0), jeu.Case(False, 'B'))
+    assert client.appliquer_delta(etats[-1], le_jeu.delta_depuis(etats[-1])) == le_jeu.jeu_2_str()
@@ -0,0 +1,63 @@
+import copy
+import os
+import random
+
+from bot_ia import journal
+from bot_ia import plateau
+from bot_ia import plateau_compact
+from serveur import simulation
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+ACTIONS = [peinture + deplacement for peinture in "XNESO" for deplacement in "NESO"]
+
+
+def plateaux_du_jeu(le_jeu):
+    plan = le_jeu.plateau.plateau_2_str()
+    return plateau.Plateau(plan), plateau_compact.Plateau(plan)
+
+
+def test_jouer_tour():
+    # le tour appliqué par le journal est celui joué par le serveur
+    random.seed(5)
+    partie = simulation.Simulation([None] * 4, CARTE, 300)
+    le_jeu = partie.le_jeu
+    for _ in range(300):
+        coul = random.choice("ABCD")
+        action = random.choice(ACTIONS)
+        simules = []
+        for le_plateau in plateaux_du_jeu(le_jeu):
+            les_joueurs = partie.joueurs_ia()
+            journal.jouer_tour(journal.Journal(le_plateau), les_joueurs, coul, action, partie.carac_jeu())
+            simules.append((le_plateau, les_joueurs))
+        le_jeu.executer_actions(coul, action)
+        le_jeu.maj_surface()
+        le_jeu.les_joueurs[coul].maj_points()
+        p_dict, p_comp = plateaux_du_jeu(le_jeu)
+        assert simules[0][0]["les_valeurs"] == p_dict["les_valeurs"]
+        assert simules[0][1] == partie.joueurs_ia()
+        assert [simules[1][0][cle] for cle in ("couleurs", "objets", "joueurs")] == \
+            [p_comp[cle] for cle in ("couleurs", "objets", "joueurs")]
+        assert simules[1][1] == partie.joueurs_ia()
+        le_jeu.fin_tour()
+
+
+def test_annuler():
+    random.seed(7)
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    for le_plateau in plateaux_du_jeu(partie.le_jeu):
+        les_joueurs = partie.joueurs_ia()
+        avant = copy.deepcopy((le_plateau["les_valeurs"] if "murs" not in le_plateau else
+                               (le_plateau["couleurs"], le_plateau["objets"], le_plateau["joueurs"]), les_joueurs))
+        le_journal = journal.Journal(le_plateau)
+        journal.jouer_tour(le_journal, les_joueurs, 'A', "NS", partie.carac_jeu())
+        milieu = journal.position(le_journal)
+        etat_milieu = copy.deepcopy(les_joueurs)
+        for _ in range(20):
+            journal.jouer_tour(le_journal, les_joueurs, random.choice("ABCD"), random.choice(ACTIONS),
+                               partie.carac_jeu())
+        journal.annuler(le_journal, milieu)
+        assert les_joueurs == etat_milieu
+        journal.annuler(le_journal)
+        assert journal.position(le_journal) == 0
+        assert (le_plateau["les_valeurs"] if "murs" not in le_plateau else
+                (le_plateau["couleurs"], le_plateau["objets"], le_plateau["joueurs"]), les_joueurs) == avant
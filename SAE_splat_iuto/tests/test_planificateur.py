@@ -0,0 +1,61 @@
+import os
+import random
+import time
+
+from bot_ia import planificateur
+from serveur import simulation
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def test_planifier():
+    random.seed(2)
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    le_jeu = partie.le_jeu
+    le_plateau = simulation.plateau_compact.plateau_from_octets(
+        le_jeu.plateau.nb_lignes, le_jeu.plateau.nb_colonnes, *le_jeu.plateau.plateau_2_octets())
+    les_joueurs = partie.joueurs_ia()
+    avant = (bytes(le_plateau["couleurs"]), bytes(le_plateau["objets"]), bytes(le_plateau["joueurs"]), repr(les_joueurs))
+    debut = time.perf_counter()
+    action, profondeur = planificateur.planifier('A', partie.carac_jeu(), le_plateau, les_joueurs, 0.05)
+    assert time.perf_counter() - debut < 0.5
+    # le plateau et les joueurs sont rendus intacts
+    assert avant == (bytes(le_plateau["couleurs"]), bytes(le_plateau["objets"]), bytes(le_plateau["joueurs"]),
+                     repr(les_joueurs))
+    assert profondeur >= 1
+    assert action[0] in planificateur.PEINTURES and action[1] in planificateur.DEPLACEMENTS
+
+
+def test_repli_sans_seconde_planification(monkeypatch):
+    # si le planificateur n'a pas de réponse, le repli n'utilise pas un second budget
+    from bot_ia import client_joueur
+    appels = []
+    monkeypatch.setattr(client_joueur, "BUDGET", 0.05)
+    monkeypatch.setattr(planificateur, "planifier", lambda *args: appels.append(args) or (None, 0))
+    random.seed(2)
+    partie = simulation.Simulation([None] * 4, CARTE, 100)
+    le_plateau = simulation.plateau_compact.plateau_from_octets(
+        partie.le_jeu.plateau.nb_lignes, partie.le_jeu.plateau.nb_colonnes, *partie.le_jeu.plateau.plateau_2_octets())
+    action = client_joueur.mon_IA_planifiee('A', partie.carac_jeu(), le_plateau, partie.joueurs_ia())
+    assert len(appels) == 1
+    assert len(action) == 2
+
+
+def test_une_observation_par_tour(monkeypatch):
+    # chaque point d'entrée met à jour l'historique des adversaires une seule fois par tour
+    from bot_ia import adversaires
+    from bot_ia import client_joueur
+    observations = []
+    observer = adversaires.observer
+    monkeypatch.setattr(adversaires, "observer", lambda *args: observations.append(args) or observer(*args))
+    monkeypatch.setattr(planificateur, "planifier", lambda *args: (None, 0))
+    monkeypatch.setattr(client_joueur, "HISTORIQUES", {})
+    partie = simulation.Simulation([None] * 4, CARTE, 100, graine=2)
+    le_plateau = simulation.plateau_compact.plateau_from_octets(
+        partie.le_jeu.plateau.nb_lignes, partie.le_jeu.plateau.nb_colonnes, *partie.le_jeu.plateau.plateau_2_octets())
+    for budget in (None, 0.05):
+        monkeypatch.setattr(client_joueur, "BUDGET", budget)
+        for ia in (client_joueur.mon_IA, client_joueur.mon_IA_reactive, client_joueur.mon_IA_planifiee):
+            observations.clear()
+            assert len(ia('A', partie.carac_jeu(), le_plateau, partie.joueurs_ia())) == 2
+            assert len(observations) == 1
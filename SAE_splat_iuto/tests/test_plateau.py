@@ -101,3 +101,22 @@ def test_distances_objets_joueurs():
     assert plateau.distances_objets_joueurs(p2,(8,9),20) == {4: {4}, 10: {'D'}, 14: {3}, 15: {'E'}, 17: {1, 'C'}, 18: {'A', 'B'}}
     assert plateau.distances_objets_joueurs(p2,(0,0),20) == {1: {'A'}, 2: {1}, 6: {'E'}}
     assert plateau.distances_objets_joueurs(p2,(17,1),10) == {0: {'C'}, 1: {'B'}}
+
+def test_maj_plateau():
+    p1=plateau.Plateau(plateau1)
+    assert plateau.get_cases_modifiees(p1) is None
+    nouveau=  "4;6\n"+\
+        "#A a# \n"+\
+        "  A## \n"+\
+        "##A   \n"+\
+        "  Aa##\n"+\
+        "2\nA;0;1\nB;3;1\n"+\
+        "1\n4;2;4\n"
+    assert plateau.maj_plateau(p1,nouveau) == {(0,1),(0,3),(1,1),(2,4)}
+    assert plateau.get_cases_modifiees(p1) == {(0,1),(0,3),(1,1),(2,4)}
+    attendu=plateau.Plateau(nouveau)
+    for lig in range(4):
+        for col in range(6):
+            assert plateau.get_case(p1,(lig,col)) == plateau.get_case(attendu,(lig,col))
+    assert plateau.maj_plateau(p1,nouveau) == set()
+    assert plateau.maj_plateau(p1,plateau2) is None
@@ -0,0 +1,78 @@
+from bot_ia import case
+from bot_ia import const
+from bot_ia import plateau
+from bot_ia import plateau_compact
+
+from test_plateau import plateau1, plateau2
+
+
+def test_cases_identiques():
+    for plan in (plateau1, plateau2):
+        p_dict = plateau.Plateau(plan)
+        p_comp = plateau_compact.Plateau(plan)
+        assert plateau.get_nb_lignes(p_comp) == plateau.get_nb_lignes(p_dict)
+        assert plateau.get_nb_colonnes(p_comp) == plateau.get_nb_colonnes(p_dict)
+        for lig in range(plateau.get_nb_lignes(p_dict)):
+            for col in range(plateau.get_nb_colonnes(p_dict)):
+                assert plateau.get_case(p_comp, (lig, col)) == plateau.get_case(p_dict, (lig, col))
+
+
+def test_fonctions_plateau():
+    p1 = plateau_compact.Plateau(plateau1)
+    assert plateau.directions_possibles(p1, (0, 1)) == {'S': ' ', 'E': ' '}
+    assert plateau.directions_possibles(p1, (1, 2)) == {'N': ' ', 'S': 'A', 'O': ' '}
+    assert plateau.nb_joueurs_direction(p1, (3, 2), 'O', 3) == 1
+    assert plateau.surfaces_peintes(p1, 2) == {'A': 4, 'B': 1}
+    assert plateau_compact.surfaces_peintes(p1, 2) == {'A': 4, 'B': 1}
+    assert plateau.distances_objets_joueurs(p1, (1, 2), 5) == {1: {'A'}, 3: {'B'}}
+    p2 = plateau_compact.Plateau(plateau2)
+    assert plateau.surfaces_peintes(p2, 5) == {'A': 68, 'B': 7, 'C': 7, 'D': 0, 'E': 8}
+    assert plateau_compact.surfaces_peintes(p2, 5) == {'A': 68, 'B': 7, 'C': 7, 'D': 0, 'E': 8}
+    assert plateau.distances_objets_joueurs(p2, (8, 9), 20) == \
+        {4: {4}, 10: {'D'}, 14: {3}, 15: {'E'}, 17: {1, 'C'}, 18: {'A', 'B'}}
+
+
+def test_modifications():
+    p1 = plateau_compact.Plateau(plateau1)
+    assert plateau.deplacer_joueur(p1, 'A', (1, 1), 'N') == (True, 0, const.AUCUN, (0, 1))
+    assert case.get_joueurs(plateau.get_case(p1, (1, 1))) == set()
+    assert case.get_joueurs(plateau.get_case(p1, (0, 1))) == {'A'}
+    res = plateau.peindre(p1, (0, 1), 'S', 'A', 10, 5)
+    assert res["cout"] == 2 and res["nb_repeintes"] == 2
+    assert case.get_couleur(plateau.get_case(p1, (1, 1))) == 'A'
+    plateau.poser_objet(p1, const.BIDON, (2, 4))
+    assert plateau.prendre_objet(p1, (2, 4)) == const.BIDON
+    assert plateau.prendre_objet(p1, (2, 4)) == const.AUCUN
+    plateau.set_case(p1, (0, 0), case.Case(False, 'B', const.BOMBE, {'C'}))
+    assert plateau.get_case(p1, (0, 0)) == case.Case(False, 'B', const.BOMBE, {'C'})
+
+
+def test_maj_plateau():
+    p2 = plateau_compact.Plateau(plateau2)
+    nouveau = plateau2.replace("5\nA;0;1\n", "5\nA;0;2\n").replace("b   #AA##", "bA  #AA##", 1)
+    nouveau = nouveau.replace("3\n1;0;2\n", "2\n")
+    assert plateau.maj_plateau(p2, nouveau) == {(0, 1), (0, 2)}
+    attendu = plateau.Plateau(nouveau)
+    for lig in range(plateau.get_nb_lignes(attendu)):
+        for col in range(plateau.get_nb_colonnes(attendu)):
+            assert plateau.get_case(p2, (lig, col)) == plateau.get_case(attendu, (lig, col))
+
+
+def test_vues_non_conservees():
+    p_dict = plateau.Plateau(plateau2)
+    p_comp = plateau_compact.Plateau(plateau2)
+    la_case = plateau.get_case(p_comp, (8, 9))
+    # les vues ne sont pas gardées par le plateau: une nouvelle à chaque lecture
+    assert plateau.get_case(p_comp, (8, 9)) is not la_case
+    assert not hasattr(p_comp["les_valeurs"], "cases")
+    # mais elles suivent les modifications du plateau
+    plateau.poser_joueur(p_comp, 'B', (8, 9))
+    assert 'B' in case.get_joueurs(la_case)
+    plateau.poser_joueur(p_dict, 'B', (8, 9))
+    assert plateau.distances_objets_joueurs(p_comp, (8, 9), 20) == plateau.distances_objets_joueurs(p_dict, (8, 9), 20)
+    for lig in range(plateau.get_nb_lignes(p_dict)):
+        for col in range(plateau.get_nb_colonnes(p_dict)):
+            assert plateau.directions_possibles(p_comp, (lig, col)) == plateau.directions_possibles(p_dict, (lig, col))
+            for direction in "NESO":
+                assert plateau.nb_joueurs_direction(p_comp, (lig, col), direction, 5) == \
+                    plateau.nb_joueurs_direction(p_dict, (lig, col), direction, 5)
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from bot_ia import rayons as rayons_bot
+from serveur import jeu
+from serveur import rayons
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def rayon_attendu(le_plateau, pos, direction, distance_max, debut, transperce):
+    # parcours case par case comme l'ancien Plateau.peindre du serveur
+    d_lig, d_col = rayons.INC_DIRECTION[direction]
+    lig, col = pos if debut else (pos[0] + d_lig, pos[1] + d_col)
+    res = []
+    while 0 <= lig < le_plateau.nb_lignes and 0 <= col < le_plateau.nb_colonnes and len(res) < distance_max:
+        if le_plateau.get_case((lig, col)).est_mur() and not transperce:
+            break
+        res.append(lig * le_plateau.nb_colonnes + col)
+        lig += d_lig
+        col += d_col
+    return tuple(res)
+
+
+def test_modules_identiques():
+    with open(rayons.__file__, encoding="utf-8") as fic_serveur, \
+            open(rayons_bot.__file__, encoding="utf-8") as fic_bot:
+        assert fic_serveur.read() == fic_bot.read()
+
+
+@pytest.mark.parametrize("distance_max", [1, 5, 100])
+def test_rayon(distance_max):
+    le_plateau = jeu.Jeu(CARTE, 100).plateau
+    table = le_plateau.get_rayons()
+    for lig in range(le_plateau.nb_lignes):
+        for col in range(le_plateau.nb_colonnes):
+            for direction in rayons.DIRECTIONS:
+                for debut in (True, False):
+                    for transperce in (True, False):
+                        assert tuple(rayons.rayon(table, (lig, col), direction, distance_max, debut, transperce)) == \
+                            rayon_attendu(le_plateau, (lig, col), direction, distance_max, debut, transperce)
+                libres = rayon_attendu(le_plateau, (lig, col), direction, 1000, True, False)
+                complet = rayon_attendu(le_plateau, (lig, col), direction, 1000, True, True)
+                distance = rayons.distance_mur(table, (lig, col), direction)
+                assert distance == (len(libres) if len(libres) < len(complet) else None)
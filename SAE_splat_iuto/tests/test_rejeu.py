@@ -0,0 +1,45 @@
+import os
+import random
+
+from serveur import jeu
+from serveur import rejeu
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+ACTIONS = [peinture + deplacement for peinture in "XNESO" for deplacement in "NESO"] + ["", "N"]
+
+
+def jouer_partie(nom_fic, graine, duree):
+    # une partie jouée et enregistrée comme le fait le serveur
+    le_jeu = jeu.Jeu(CARTE, duree, alea=random.Random(graine))
+    enregistreur = rejeu.Enregistreur(nom_fic, CARTE, graine)
+    for nom in ("un", "deux", "trois", "quatre"):
+        le_jeu.inscrire_joueur(nom)
+    enregistreur.commencer(le_jeu)
+    choix = random.Random(graine + 1)
+    etats = [le_jeu.jeu_2_str()]
+    while not le_jeu.est_fini():
+        couleurs = list(le_jeu.les_joueurs)
+        choix.shuffle(couleurs)
+        le_jeu.tour_de_jeu({coul: choix.choice(ACTIONS) for coul in couleurs},
+                           apres_action=enregistreur.apres_action)
+        enregistreur.fin_tour()
+        etats.append(le_jeu.jeu_2_str())
+    enregistreur.terminer(le_jeu)
+    return etats
+
+
+def test_rejeu(tmp_path):
+    for nom_fic in (str(tmp_path / "partie.jsonl"), str(tmp_path / "partie.jsonl.gz")):
+        etats = jouer_partie(nom_fic, 7, 60)
+        entete, tours, points = rejeu.lire_rejeu(nom_fic)
+        assert entete["joueurs"] == ["un", "deux", "trois", "quatre"]
+        assert len(tours) == 60 and all(len(tour) == 4 for tour in tours)
+        # la partie rejouée passe par les mêmes états, objets compris
+        le_jeu = rejeu.preparer_jeu(entete)
+        rejoues = [le_jeu.jeu_2_str()]
+        for tour in tours:
+            rejeu.rejouer_tour(le_jeu, tour)
+            rejoues.append(le_jeu.jeu_2_str())
+        assert rejoues == etats
+        le_jeu, points_enregistres = rejeu.rejouer(nom_fic)
+        assert points_enregistres == {coul: joueur.points for coul, joueur in le_jeu.les_joueurs.items()}
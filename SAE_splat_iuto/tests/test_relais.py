@@ -0,0 +1,139 @@
+import asyncio
+import os
+
+from serveur import client
+from serveur import jeu
+from serveur import relais
+from serveur import serveur_async
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+async def attendre(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+async def spectateur(port, options, recus):
+    # afficheur minimal: reconstitue chaque état à partir des jeux et deltas reçus
+    lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+    ecrivain.write(("afficheur;spectateur;" + options + "\0").encode())
+    while True:
+        msg = (await lecteur.readuntil(b"\0"))[:-1].decode()
+        entete, _, corps = msg.partition("\n")
+        if entete.startswith("quit"):
+            break
+        if entete.startswith("delta"):
+            corps = client.appliquer_delta(recus[-1], corps)
+        recus.append(corps)
+    ecrivain.close()
+
+
+async def relayer():
+    le_jeu = jeu.Jeu(CARTE, 50)
+    for nom in ("un", "deux"):
+        le_jeu.inscrire_joueur(nom)
+    # faux serveur de jeu: on envoie nous-même les états au relais
+    connexions = []
+
+    async def serveur_jeu(lecteur, ecrivain):
+        enregistrement = (await lecteur.readuntil(b"\0")).decode()
+        connexions.append((enregistrement, ecrivain))
+
+    serveur = await asyncio.start_server(serveur_jeu, "127.0.0.1", 0)
+    le_relais = relais.Relais("127.0.0.1", serveur.sockets[0].getsockname()[1])
+    ecouteur = await asyncio.start_server(le_relais.gerer_client, "127.0.0.1", 0)
+    port = ecouteur.sockets[0].getsockname()[1]
+    le_relais.connecter()
+    reception = asyncio.create_task(le_relais.recevoir())
+    await attendre(lambda: connexions)
+    enregistrement, amont = connexions[0]
+    etats = []
+
+    def envoyer_etat():
+        etats.append(le_jeu.jeu_2_str())
+        amont.write(("jeu;1\n" + etats[-1] + "\0").encode())
+
+    premier, second = [], []
+    taches = [asyncio.create_task(spectateur(port, "", premier))]
+    await attendre(lambda: len(le_relais.afficheurs) == 1)
+    envoyer_etat()
+    await attendre(lambda: len(premier) == 1)
+    le_jeu.executer_actions('A', "NE")
+    envoyer_etat()
+    await attendre(lambda: len(premier) == 2)
+    # un spectateur arrivé en cours de partie reçoit aussitôt le dernier état
+    taches.append(asyncio.create_task(spectateur(port, "delta", second)))
+    await attendre(lambda: len(second) == 1)
+    for actions in ("SO", "EN"):
+        le_jeu.executer_actions('B', actions)
+        envoyer_etat()
+    amont.write(b"quit\n\0")
+    await asyncio.wait_for(asyncio.gather(reception, *taches), 5)
+    ecouteur.close()
+    serveur.close()
+    return enregistrement, etats, premier, second
+
+
+def test_relais():
+    enregistrement, etats, premier, second = asyncio.run(relayer())
+    assert enregistrement.startswith("afficheur;relais;delta")
+    assert premier == etats
+    assert second == etats[1:]
+
+
+class EcrivainLent(object):
+    # StreamWriter dont le tampon d'envoi reste plein tant que le test ne le vide pas
+    def __init__(self):
+        self.transport = self
+        self.tampon = 0
+        self.vide = asyncio.Event()
+        self.ecrits = []
+
+    def get_extra_info(self, nom):
+        return ("127.0.0.1", 0)
+
+    def set_write_buffer_limits(self, haut):
+        pass
+
+    def get_write_buffer_size(self):
+        return self.tampon
+
+    def write(self, donnees):
+        self.ecrits.append(donnees.decode())
+
+    async def drain(self):
+        await self.vide.wait()
+
+    def close(self):
+        pass
+
+
+async def spectateur_en_retard():
+    le_jeu = jeu.Jeu(CARTE, 50)
+    le_jeu.inscrire_joueur("un")
+    spectateurs = relais.Spectateurs()
+    lent, rapide = EcrivainLent(), EcrivainLent()
+    for num, ecrivain in enumerate((lent, rapide)):
+        connexion = serveur_async.Connexion(None, ecrivain)
+        connexion.type_client, connexion.id = client.TYPE_AFFICHEUR, num+1
+        spectateurs.afficheurs.append(connexion)
+    lent.tampon = serveur_async.SEUIL_TAMPON + 1
+    etats = []
+    for actions in ("XE", "XS", "XO"):
+        le_jeu.executer_actions('A', actions)
+        etats.append(le_jeu.jeu_2_str())
+        spectateurs.publier(etats[-1])
+    nb_ecrits = len(lent.ecrits)
+    lent.tampon = 0
+    lent.vide.set()
+    await asyncio.sleep(0.01)
+    return nb_ecrits, lent.ecrits, rapide.ecrits, etats
+
+
+def test_spectateur_en_retard():
+    nb_ecrits, lent, rapide, etats = asyncio.run(spectateur_en_retard())
+    assert rapide == ["jeu;2\n" + etat + "\0" for etat in etats]
+    # le spectateur lent ne reçoit que le dernier état, une fois son tampon vidé
+    assert nb_ecrits == 0
+    assert lent == ["jeu;1\n" + etats[-1] + "\0"]
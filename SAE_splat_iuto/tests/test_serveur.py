@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+from serveur import jeu
+from serveur import serveur
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+class FauxJoueur:
+    def __init__(self, id):
+        self.id = id
+
+
+def test_delai_de_reponse():
+    table = serveur.Table_Clients(4, delai=0.05)
+    table.joueurs = [FauxJoueur('A'), FauxJoueur('B')]
+    table.nb_actifs = 2
+    table.commencer_nouvelle_iteration()
+    assert table.ajouter_reponse('A', "NE", 1)
+    assert table.recolter_reponses() == {'A': "NE", 'B': serveur.ACTION_PAR_DEFAUT}
+    # la réponse de B arrive après le délai: elle n'est pas utilisée au tour suivant
+    assert not table.ajouter_reponse('B', "SO", 1)
+    table.commencer_nouvelle_iteration()
+    assert not table.ajouter_reponse('B', "SO", 1)
+    assert table.ajouter_reponse('B', "OS", 2)
+    assert table.ajouter_reponse('A', "EE", 2)
+    assert table.reponses_ok.is_set()
+    assert table.recolter_reponses() == {'A': "EE", 'B': "OS"}
+
+
+def test_reponse_en_retard_pendant_ouverture():
+    table = serveur.Table_Clients(4, delai=0.05)
+    table.joueurs = [FauxJoueur('A')]
+    table.nb_actifs = 1
+    table.commencer_nouvelle_iteration()
+    table.recolter_reponses()
+    acceptees = []
+
+    class Condition(threading.Condition):
+        # la réponse au tour 1 arrive pendant l'ouverture du tour 2
+        def __enter__(self):
+            acceptees.append(table.ajouter_reponse('A', "SO", 1))
+            return super().__enter__()
+
+    table.nouvelle_iteration = Condition()
+    table.commencer_nouvelle_iteration()
+    assert acceptees == [False]
+    assert table.reponses == {} and table.num_tour == 2
+
+
+class FausseSocket:
+    def __init__(self, debloquee=True):
+        self.recus = []
+        self.debloquee = threading.Event()
+        if debloquee:
+            self.debloquee.set()
+
+    def sendall(self, donnees):
+        self.debloquee.wait(5)
+        self.recus.append(donnees)
+
+    def close(self):
+        pass
+
+
+def test_diffusion_sans_attente():
+    table = serveur.Table_Clients(4)
+    table.le_jeu = jeu.Jeu(CARTE, 50)
+    sockets = {"joueur": FausseSocket(), "afficheur": FausseSocket(debloquee=False)}
+    for type_client, la_socket in sockets.items():
+        le_client = serveur.ClientThread("", 0, la_socket, table)
+        assert le_client.maj_info_client(type_client, type_client)
+    table.le_jeu.inscrire_joueur("deux")
+    etats = []
+    for _ in range(5):
+        table.le_jeu.executer_actions('A', "NE")
+        table.envoyer_jeu()
+        etats.append(table.le_jeu.jeu_2_str())
+    # l'afficheur bloqué ne retarde pas le joueur
+    table.joueurs[0].envoi.arreter()
+    table.joueurs[0].envoi.attendre(5)
+    assert [msg.decode() for msg in sockets["joueur"].recus] == ["jeu;A\n" + etat + "\0" for etat in etats]
+    # les états en retard de l'afficheur sont abandonnés au profit du plus récent
+    sockets["afficheur"].debloquee.set()
+    table.envoyer_quit()
+    table.liberer_ressources()
+    recus = [msg.decode() for msg in sockets["afficheur"].recus]
+    assert recus[-2:] == ["jeu;1\n" + etats[-1] + "\0", "quit\n\0"]
+    assert len(recus) < len(etats) + 3
+    assert table.afficheurs[0].envoi.nb_abandons > 0
+
+
+def test_flux_par_intervalle():
+    table = serveur.Table_Clients(4)
+    table.le_jeu = jeu.Jeu(CARTE, 50)
+    etats = [table.le_jeu.jeu_2_str()]
+    la_socket = FausseSocket()
+    afficheur = serveur.ClientThread("", 0, la_socket, table)
+    afficheur.clientsocket.options = {"flux": "0.3"}
+    assert afficheur.maj_info_client("afficheur", "ecran")
+    while not la_socket.recus:
+        time.sleep(0.01)
+    table.le_jeu.inscrire_joueur("un")
+    for _ in range(5):
+        table.le_jeu.executer_actions('A', "NE")
+        table.envoyer_action('A', "NE")
+    # le premier état part aussitôt, les suivants attendent la fin de l'intervalle
+    # et seul le dernier est envoyé
+    etats.append(table.le_jeu.jeu_2_str())
+    table.envoyer_quit()
+    table.liberer_ressources()
+    recus = [msg.decode() for msg in la_socket.recus]
+    assert recus == ["jeu;1\n" + etat + "\0" for etat in etats] + ["quit\n\0"]
@@ -0,0 +1,208 @@
+import asyncio
+import os
+
+from serveur import rejeu
+from serveur import serveur_async
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+async def joueur(port, nom, repondre, options=""):
+    lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+    ecrivain.write(("joueur;" + nom + options + "\0").encode())
+    nb_tours = 0
+    while True:
+        msg = await lecteur.readuntil(b"\0")
+        if msg.startswith(b"quit"):
+            break
+        if msg.startswith(b"refused"):
+            return -1
+        nb_tours += 1
+        if repondre:
+            ecrivain.write(b"XN\0")
+    ecrivain.close()
+    return nb_tours
+
+
+async def partie_avec_joueur_muet(tmp_path):
+    partie = serveur_async.Partie(4, str(tmp_path / "score.csv"), CARTE, nb_joueurs=2, delai=0.1)
+    le_serveur = serveur_async.ServeurAsync("127.0.0.1", 0, partie)
+    ecouteur = await asyncio.start_server(le_serveur.gerer_client, "127.0.0.1", 0)
+    port = ecouteur.sockets[0].getsockname()[1]
+    async with ecouteur:
+        clients = asyncio.gather(joueur(port, "actif", True), joueur(port, "muet", False))
+        await asyncio.wait_for(partie.jouer(), 10)
+        return await clients, partie
+
+
+def test_delai_de_reponse(tmp_path):
+    nb_tours, partie = asyncio.run(partie_avec_joueur_muet(tmp_path))
+    # le joueur muet ne bloque pas la partie
+    assert nb_tours == [4, 4]
+    assert partie.le_jeu.est_fini()
+    assert os.path.exists(tmp_path / "score.csv")
+
+
+async def joueur_en_retard(port):
+    # répond en retard au premier état puis aussitôt aux suivants, en indiquant dans sa
+    # commande le tour auquel elle répond
+    lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+    ecrivain.write(b"joueur;lent\0")
+    premier = True
+    while True:
+        msg = await lecteur.readuntil(b"\0")
+        if msg.startswith(b"quit"):
+            break
+        if premier:
+            await asyncio.sleep(0.3)
+            premier = False
+        duree = int(msg.split(b"\n", 1)[1].split(b";")[0])
+        ecrivain.write(("X" + "NESO"[duree % 4] + "\0").encode())
+    ecrivain.close()
+
+
+async def partie_avec_joueur_en_retard(tmp_path):
+    # la réponse au premier état arrive entre la première et la seconde échéance
+    partie = serveur_async.Partie(4, str(tmp_path / "score.csv"), CARTE, nb_joueurs=1, delai=0.2)
+    recues = []
+    recolter = partie.recolter_reponses
+
+    async def espion():
+        reponses = await recolter()
+        recues.append((partie.le_jeu.duree_actuelle, reponses['A']))
+        return reponses
+    partie.recolter_reponses = espion
+    le_serveur = serveur_async.ServeurAsync("127.0.0.1", 0, partie)
+    ecouteur = await asyncio.start_server(le_serveur.gerer_client, "127.0.0.1", 0)
+    port = ecouteur.sockets[0].getsockname()[1]
+    async with ecouteur:
+        client_lent = asyncio.create_task(joueur_en_retard(port))
+        await asyncio.wait_for(partie.jouer(), 10)
+        await client_lent
+    return recues
+
+
+def test_reponse_en_retard(tmp_path):
+    recues = asyncio.run(partie_avec_joueur_en_retard(tmp_path))
+    # le premier tour est joué par défaut, la réponse en retard est ensuite ignorée et le
+    # joueur répond de nouveau à l'état de chaque tour
+    assert recues[0] == (0, serveur_async.ACTION_PAR_DEFAUT)
+    assert recues[1:] == [(duree, "X" + "NESO"[duree % 4]) for duree in range(1, 4)]
+
+
+async def deux_parties(tmp_path):
+    parties = [serveur_async.partie_from_str("p1," + CARTE + ",3,1", 1),
+               serveur_async.partie_from_str("p2," + CARTE + ",5,2", 1)]
+    le_serveur = serveur_async.ServeurAsync("127.0.0.1", 0, parties)
+    ecouteur = await asyncio.start_server(le_serveur.gerer_client, "127.0.0.1", 0)
+    port = ecouteur.sockets[0].getsockname()[1]
+    async with ecouteur:
+        clients = asyncio.gather(joueur(port, "a", True, ";partie=p2"), joueur(port, "b", True),
+                                 joueur(port, "c", True, ";partie=p2"), joueur(port, "d", True, ";partie=p3"))
+        await asyncio.wait_for(asyncio.gather(*(partie.jouer() for partie in parties)), 10)
+        return await clients, parties
+
+
+def test_plusieurs_parties(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    nb_tours, parties = asyncio.run(deux_parties(tmp_path))
+    assert nb_tours == [5, 3, 5, -1]
+    assert [partie.le_jeu.nb_joueurs for partie in parties] == [1, 2]
+    assert os.path.exists(tmp_path / "score_p1.csv") and os.path.exists(tmp_path / "score_p2.csv")
+    # chaque partie est enregistrée et se rejoue à l'identique
+    for partie in parties:
+        assert partie.enregistreur.nom_fic.startswith("rejeu_" + partie.nom + "_")
+        le_jeu, points = rejeu.rejouer(str(tmp_path / partie.enregistreur.nom_fic))
+        assert le_jeu.jeu_2_str() == partie.le_jeu.jeu_2_str()
+        assert points == {coul: joueur.points for coul, joueur in partie.le_jeu.les_joueurs.items()}
+
+
+async def afficheur(port, options):
+    lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+    ecrivain.write(("afficheur;ecran;" + options + "\0").encode())
+    messages = []
+    while True:
+        msg = (await lecteur.readuntil(b"\0")).decode()
+        if msg.startswith("quit"):
+            break
+        messages.append(msg.split(";")[0])
+    ecrivain.close()
+    return messages
+
+
+async def partie_avec_afficheurs(tmp_path):
+    partie = serveur_async.Partie(3, str(tmp_path / "score.csv"), CARTE, nb_joueurs=2, delai=0.1)
+    le_serveur = serveur_async.ServeurAsync("127.0.0.1", 0, partie)
+    ecouteur = await asyncio.start_server(le_serveur.gerer_client, "127.0.0.1", 0)
+    port = ecouteur.sockets[0].getsockname()[1]
+    async with ecouteur:
+        ecrans = asyncio.gather(afficheur(port, ""), afficheur(port, "flux=tour,evenements"))
+        while len(partie.afficheurs) < 2:
+            await asyncio.sleep(0.01)
+        clients = asyncio.gather(joueur(port, "a", True), joueur(port, "b", True))
+        await asyncio.wait_for(partie.jouer(), 10)
+        await clients
+        return await ecrans
+
+
+def test_flux_par_tour(tmp_path):
+    par_action, par_tour = asyncio.run(partie_avec_afficheurs(tmp_path))
+    # inscriptions et début de partie, puis un état par action et par fin de tour (sauf la
+    # dernière) pour l'un, un état par fin de tour précédé des actions du tour pour l'autre
+    assert par_action.count("jeu") == 1 + 2 + 1 + 3 * 2 + 2
+    assert par_tour.count("jeu") == 1 + 2 + 1 + 3
+    assert par_tour[-2:] == ["evenements", "jeu"]
+    assert par_tour.count("evenements") == 3
+
+
+class EcrivainLent(object):
+    # StreamWriter dont le tampon d'envoi reste plein tant que le test ne le vide pas
+    def __init__(self):
+        self.transport = self
+        self.tampon = 0
+        self.vide = asyncio.Event()
+        self.ecrits = []
+
+    def get_extra_info(self, nom):
+        return ("127.0.0.1", 0)
+
+    def set_write_buffer_limits(self, haut):
+        pass
+
+    def get_write_buffer_size(self):
+        return self.tampon
+
+    def write(self, donnees):
+        self.ecrits.append(donnees.decode())
+
+    async def drain(self):
+        await self.vide.wait()
+
+    def close(self):
+        pass
+
+
+async def afficheur_en_retard():
+    partie = serveur_async.Partie(10, "score.csv", CARTE, nb_joueurs=1)
+    partie.le_jeu.inscrire_joueur("seul")
+    ecrivain = EcrivainLent()
+    connexion = serveur_async.Connexion(None, ecrivain)
+    connexion.type_client, connexion.id = "afficheur", 1
+    partie.envoyer_jeu([connexion])
+    ecrivain.tampon = serveur_async.SEUIL_TAMPON + 1
+    for actions in ("XE", "XS", "XO"):
+        partie.le_jeu.executer_actions('A', actions)
+        partie.envoyer_jeu([connexion])
+    nb_ecrits = len(ecrivain.ecrits)
+    ecrivain.tampon = 0
+    ecrivain.vide.set()
+    await asyncio.sleep(0.01)
+    return nb_ecrits, ecrivain.ecrits, partie.le_jeu.jeu_2_str()
+
+
+def test_afficheur_en_retard():
+    nb_ecrits, ecrits, dernier = asyncio.run(afficheur_en_retard())
+    # rien n'est écrit tant que le tampon est plein, puis seul le dernier état est envoyé
+    assert nb_ecrits == 1
+    assert len(ecrits) == 2
+    assert ecrits[1] == "jeu;1\n" + dernier + "\0"
@@ -0,0 +1,21 @@
+import os
+
+from bot_ia import client_joueur
+from serveur import simulation
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def test_simulation():
+    ias = [client_joueur.mon_IA] * 4
+    scores = simulation.simuler(ias, CARTE, 30, graine=3)
+    assert sorted(scores) == ['A', 'B', 'C', 'D']
+    # sans passer par les chaines de caractères les IA voient le même jeu
+    assert simulation.simuler(ias, CARTE, 30, graine=3, via_chaine=True) == scores
+    assert simulation.simuler(ias, CARTE, 30, graine=3) == scores
+
+
+def test_charger_ia():
+    assert simulation.charger_ia("bot_ia.client_joueur") is client_joueur.mon_IA
+    assert simulation.charger_ia("bot_ia.client_joueur:meilleure_direction_locale") is \
+        client_joueur.meilleure_direction_locale
@@ -0,0 +1,23 @@
+import os
+
+from serveur import tournoi
+
+CARTE = os.path.join(os.path.dirname(__file__), "..", "cartes", "carte.txt")
+
+
+def test_liste_matchs():
+    matchs = tournoi.liste_matchs(["a", "b", "c"], ["c1", "c2"], 4, 10)
+    assert matchs == [(0, "c1", 10, ["a", "b", "c"]), (1, "c2", 11, ["b", "c", "a"]),
+                      (2, "c1", 12, ["c", "a", "b"]), (3, "c2", 13, ["a", "b", "c"])]
+
+
+def test_resumer():
+    lignes = tournoi.jouer_match(0, CARTE, 5, ["bot_ia.client_joueur", "bot_ia.client_joueur:mon_IA"], 20)
+    assert [ligne["siege"] for ligne in lignes] == ['A', 'B']
+    assert sorted(ligne["rang"] for ligne in lignes) == [1, 2]
+    lignes = [{"match": 0, "ia": "x", "points": 10, "surface": 1}, {"match": 0, "ia": "y", "points": 10, "surface": 3},
+              {"match": 1, "ia": "x", "points": 30, "surface": 2}, {"match": 1, "ia": "y", "points": 20, "surface": 1}]
+    resume = tournoi.resumer(lignes)
+    assert [ligne["ia"] for ligne in resume] == ["x", "y"]
+    assert resume[0]["nb_matchs"] == 2 and resume[0]["points"] == 20
+    assert resume[0]["taux_victoire"] == 0.75 and resume[1]["taux_victoire"] == 0.25